@@ -1,6 +1,12 @@
+import os
+import tempfile
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import AliasChoices, Field
 
+# Local data directory of the project (raw downloads, caches, ...)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
 
 class MongoSettings(BaseSettings):
     """Settings for the application."""
@@ -12,6 +18,41 @@ class MongoSettings(BaseSettings):
     btc_purchases_coll_name: str = Field(
         validation_alias="mongodb_collection_btc_purchases"
     )
+    sync_state_coll_name: str = Field(
+        "sync_state",
+        validation_alias="mongodb_collection_sync_state",
+        description="Collection holding the sync watermark of every entity.",
+    )
+    discovery_state_coll_name: str = Field(
+        "discovery_state",
+        validation_alias="mongodb_collection_discovery_state",
+        description="Collection holding how far each filing discovery source has been read.",
+    )
+    sync_jobs_coll_name: str = Field(
+        "sync_jobs",
+        validation_alias="mongodb_collection_sync_jobs",
+        description="Collection holding the recurring jobs of the scheduler.",
+    )
+    entity_leases_coll_name: str = Field(
+        "entity_leases",
+        validation_alias="mongodb_collection_entity_leases",
+        description="Collection holding which daemon syncs which entity.",
+    )
+    pipeline_tasks_coll_name: str = Field(
+        "pipeline_tasks",
+        validation_alias="mongodb_collection_pipeline_tasks",
+        description="Collection holding the durable work queue of the ingestion pipeline.",
+    )
+    filing_contents_bucket_name: str = Field(
+        "filing_contents",
+        validation_alias="mongodb_bucket_filing_contents",
+        description="GridFS bucket holding the compressed raw content of filings.",
+    )
+    cursor_batch_size: int = Field(
+        500,
+        validation_alias="mongodb_cursor_batch_size",
+        description="Documents fetched per round-trip when streaming query results.",
+    )
 
 
 mongosettings = MongoSettings()
@@ -28,6 +69,54 @@ class SECEdgarAPISettings(BaseSettings):
     user_agent_header: dict = Field(
         {"User-Agent": f"{sec_user_agent} - ({sec_user_agent_email})"}
     )
+    max_requests_per_second: float = Field(
+        10.0,
+        validation_alias="sec_max_requests_per_second",
+        description="SEC fair-access limit shared by all processes on this host.",
+    )
+    rate_limit_burst: float = Field(
+        1.0,
+        validation_alias="sec_rate_limit_burst",
+        description="Number of requests that may be sent back-to-back.",
+    )
+    rate_limit_state_path: str = Field(
+        os.path.join(tempfile.gettempdir(), "saylor_treasury_sec_rate_limit"),
+        validation_alias="sec_rate_limit_state_path",
+        description="File holding the shared token bucket state.",
+    )
+    http_pool_maxsize: int = Field(
+        10,
+        validation_alias="sec_http_pool_maxsize",
+        description="Keep-alive connections kept open per SEC host.",
+    )
+    http_max_retries: int = Field(
+        5,
+        validation_alias="sec_http_max_retries",
+        description="Retries on connection errors, 429 and 5xx responses.",
+    )
+    http_timeout: float = Field(
+        30.0,
+        validation_alias="sec_http_timeout",
+        description="Timeout in seconds for a single SEC request.",
+    )
+    http_cache_dir: str = Field(
+        os.path.join(DATA_DIR, "interim", "http_cache"),
+        validation_alias="sec_http_cache_dir",
+        description="Directory of cached SEC responses and their validators.",
+    )
+    efts_cache_ttl_seconds: float = Field(
+        3600.0,
+        validation_alias="sec_efts_cache_ttl_seconds",
+        description="How long cached EFTS results of windows ending today stay fresh.",
+    )
+    current_filings_feed_url: str = Field(
+        "https://www.sec.gov/cgi-bin/browse-edgar?action=getcurrent&type=8-K&company=&dateb=&owner=include&start=0&count=100&output=atom",
+        validation_alias="sec_current_filings_feed_url",
+        description="Atom feed of the latest filings, polled by the filing watcher.",
+    )
+
+    def get_user_agent_header(self) -> dict:
+        return {"User-Agent": f"{self.sec_user_agent} {self.sec_user_agent_email}"}
 
     def get_formatted_company_facts_url(self, cik: str) -> str:
         return f"{self.base_company_facts_url}CIK{cik}.json"
@@ -43,3 +132,189 @@ class SECEdgarAPISettings(BaseSettings):
 
 
 sec_edgar_settings = SECEdgarAPISettings()
+
+
+class SyncSettings(BaseSettings):
+    """Settings for syncing SEC filings into the database."""
+
+    max_concurrency: int = Field(
+        8,
+        validation_alias="sync_max_concurrency",
+        description="Maximum number of SEC requests in flight during a sync run.",
+    )
+    forms: List[str] = Field(
+        ["8-K", "8-K/A"],
+        validation_alias="sync_forms",
+        description="Form types of the filings that are synced.",
+    )
+    checkpoint_batch_size: int = Field(
+        25,
+        validation_alias="sync_checkpoint_batch_size",
+        description="Number of filings stored between two sync checkpoints of an entity.",
+    )
+    watch_poll_seconds: float = Field(
+        5.0,
+        validation_alias="sync_watch_poll_seconds",
+        description="Seconds between two polls of the latest filings feed.",
+    )
+    watch_pending_seconds: float = Field(
+        900.0,
+        validation_alias="sync_watch_pending_seconds",
+        description="How long the watcher retries a filing from the feed that the submissions do not list yet.",
+    )
+    lease_seconds: float = Field(
+        60.0,
+        validation_alias="sync_lease_seconds",
+        description="Time after which the lease of a daemon that stopped renewing it can be taken over.",
+    )
+    lease_heartbeat_seconds: float = Field(
+        15.0,
+        validation_alias="sync_lease_heartbeat_seconds",
+        description="Seconds between two renewals of the leases a daemon holds.",
+    )
+
+
+sync_settings = SyncSettings()
+
+
+class StorageSettings(BaseSettings):
+    """Settings for local storage of downloaded SEC data."""
+
+    filing_archive_dir: str = Field(
+        os.path.join(DATA_DIR, "raw", "filing_archive"),
+        validation_alias="filing_archive_dir",
+        description="Directory of the compressed archive of raw filing documents.",
+    )
+    filing_archive_max_bytes: int = Field(
+        5 * 1024**3,
+        validation_alias="filing_archive_max_bytes",
+        description="Size of the filing archive above which old documents are evicted.",
+    )
+    summary_cache_path: str = Field(
+        os.path.join(DATA_DIR, "interim", "summary_cache.sqlite3"),
+        validation_alias="summary_cache_path",
+        description="SQLite database of chunk summaries and seen boilerplate paragraphs.",
+    )
+
+
+storage_settings = StorageSettings()
+
+
+class SummarizerSettings(BaseSettings):
+    """Settings for summarizing filing text."""
+
+    model: str = Field("t5-small", validation_alias="summarizer_model")
+    batch_size: int = Field(
+        8,
+        validation_alias="summarizer_batch_size",
+        description="Number of chunks summarized in one forward pass.",
+    )
+    num_threads: Optional[int] = Field(
+        None,
+        validation_alias="summarizer_num_threads",
+        description="Torch intra-op threads for CPU inference, defaults to torch's choice.",
+    )
+    max_chunk_words: int = Field(
+        512,
+        validation_alias="summarizer_max_chunk_words",
+        description="Maximum number of words in a chunk sent to the model.",
+    )
+
+
+summarizer_settings = SummarizerSettings()
+
+
+class SchedulerSettings(BaseSettings):
+    """Settings for the job scheduler of the daemon."""
+
+    workers: int = Field(
+        4,
+        validation_alias="scheduler_workers",
+        description="Number of jobs that run at the same time.",
+    )
+    job_timeout_seconds: float = Field(
+        900.0,
+        validation_alias="scheduler_job_timeout_seconds",
+        description="Time after which a running job is cancelled and retried.",
+    )
+    retry_backoff_seconds: float = Field(
+        60.0,
+        validation_alias="scheduler_retry_backoff_seconds",
+        description="Delay before the first retry of a failed job, doubled on every failure.",
+    )
+    active_entity_days: int = Field(
+        90,
+        validation_alias="scheduler_active_entity_days",
+        description="Entities with a filing in this many days are synced as active entities.",
+    )
+    active_entity_interval_seconds: float = Field(
+        3600.0,
+        validation_alias="scheduler_active_entity_interval_seconds",
+        description="Seconds between two syncs of an active entity.",
+    )
+    inactive_entity_interval_seconds: float = Field(
+        86400.0,
+        validation_alias="scheduler_inactive_entity_interval_seconds",
+        description="Seconds between two syncs of an inactive entity.",
+    )
+    stats_interval_seconds: float = Field(
+        60.0,
+        validation_alias="scheduler_stats_interval_seconds",
+        description="Seconds between two logs of the queue statistics.",
+    )
+
+
+scheduler_settings = SchedulerSettings()
+
+
+class PipelineSettings(BaseSettings):
+    """Settings for the staged ingestion pipeline."""
+
+    fetch_workers: int = Field(
+        4,
+        validation_alias="pipeline_fetch_workers",
+        description="Number of workers downloading filing documents.",
+    )
+    parse_workers: Optional[int] = Field(
+        None,
+        validation_alias="pipeline_parse_workers",
+        description="Number of parser processes, defaults to the number of cores.",
+    )
+    extract_workers: int = Field(
+        1,
+        validation_alias="pipeline_extract_workers",
+        description="Number of workers extracting the new paragraphs of parsed filings.",
+    )
+    store_workers: int = Field(
+        1,
+        validation_alias="pipeline_store_workers",
+        description="Number of workers writing finished filings to the database.",
+    )
+    lease_seconds: float = Field(
+        300.0,
+        validation_alias="pipeline_lease_seconds",
+        description="Time after which a task claimed by a worker that died can be claimed again.",
+    )
+    max_attempts: int = Field(
+        5,
+        validation_alias="pipeline_max_attempts",
+        description="Failed attempts of a stage after which a task is dead-lettered.",
+    )
+    retry_backoff_seconds: float = Field(
+        30.0,
+        validation_alias="pipeline_retry_backoff_seconds",
+        description="Delay before the first retry of a failed stage, doubled on every failure.",
+    )
+    max_stage_backlog: int = Field(
+        1000,
+        validation_alias="pipeline_max_stage_backlog",
+        description="Tasks waiting for a stage above which the stage before it pauses.",
+    )
+    poll_seconds: float = Field(
+        1.0,
+        validation_alias="pipeline_poll_seconds",
+        description="Seconds an idle worker waits before looking for a task again.",
+    )
+
+
+pipeline_settings = PipelineSettings()
@@ -0,0 +1,25 @@
+import logging
+from datetime import date, datetime, timezone
+from pymongo.collection import Collection
+from typing import Optional
+
+
+class DiscoveryStateRepository:
+    """How far each source of new filings (daily index, current feed, ...) has been read."""
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def get_last_date(self, source: str) -> Optional[date]:
+        state = self.collection.find_one({"source": source}, {"_id": 0, "last_date": 1})
+        if state and state.get("last_date"):
+            return date.fromisoformat(state["last_date"])
+        return None
+
+    def set_last_date(self, source: str, last_date: date):
+        self.collection.update_one(
+            {"source": source},
+            {"$set": {"last_date": last_date.isoformat(), "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        logging.info(f"Discovery source {source} has been read up to {last_date}.")
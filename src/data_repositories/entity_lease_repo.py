@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError
+from typing import Iterable, List, Set
+from modeling.EntityLease import EntityLease
+
+
+class EntityLeaseRepository:
+    """
+    Leases on entities, so that daemons on different hosts never sync the same
+    entity at the same time. A lease that its owner stops renewing expires and
+    can be taken over by another daemon.
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def acquire(self, cik: str, owner: str, lease_seconds: float) -> bool:
+        """Acquires or renews the lease on an entity, returns False if another owner holds it."""
+        now = datetime.now(timezone.utc)
+        try:
+            self.collection.update_one(
+                {
+                    "cik": cik,
+                    "$or": [
+                        {"owner": owner},
+                        {"owner": None},
+                        {"lease_until": {"$lt": now}},
+                    ],
+                },
+                {
+                    "$set": {
+                        "owner": owner,
+                        "lease_until": now + timedelta(seconds=lease_seconds),
+                        "acquired_at": now,
+                    }
+                },
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The lease exists and is held by a live owner, the upsert lost
+            return False
+        return True
+
+    def renew(self, ciks: Iterable[str], owner: str, lease_seconds: float) -> Set[str]:
+        """Extends the leases of the owner on the given entities. Returns the entities whose lease was renewed."""
+        ciks = list(ciks)
+        if not ciks:
+            return set()
+        now = datetime.now(timezone.utc)
+        # An expired lease that nobody took over is still held, it is renewed as well
+        self.collection.update_many(
+            {"cik": {"$in": ciks}, "owner": owner},
+            {"$set": {"lease_until": now + timedelta(seconds=lease_seconds)}},
+        )
+        return {
+            lease["cik"]
+            for lease in self.collection.find(
+                {"cik": {"$in": ciks}, "owner": owner}, {"_id": 0, "cik": 1}
+            )
+        }
+
+    def release(self, cik: str, owner: str) -> bool:
+        result = self.collection.update_one(
+            {"cik": cik, "owner": owner},
+            {"$set": {"owner": None, "lease_until": datetime.now(timezone.utc)}},
+        )
+        return result.modified_count == 1
+
+    def release_all(self, owner: str) -> int:
+        result = self.collection.update_many(
+            {"owner": owner},
+            {"$set": {"owner": None, "lease_until": datetime.now(timezone.utc)}},
+        )
+        if result.modified_count:
+            logging.info(f"Released {result.modified_count} entity leases of {owner}.")
+        return result.modified_count
+
+    def get_leases(self) -> List[EntityLease]:
+        return [EntityLease(**lease) for lease in self.collection.find({}, {"_id": 0})]
@@ -0,0 +1,57 @@
+import logging
+from typing import Optional
+import zstandard
+from gridfs import GridFSBucket, NoFile
+
+
+class FilingContentStore:
+    """
+    GridFS store of the raw HTML of filings, compressed with zstd and keyed by
+    accession number.
+
+    Filing documents only keep a reference to their content, so metadata
+    queries do not pull megabytes of HTML and large documents stay clear of the
+    16 MB document limit. The content of a filing never changes once filed, so
+    it is only written once.
+    """
+
+    ENCODING = "zstd"
+
+    def __init__(self, bucket: GridFSBucket, compression_level: int = 10):
+        self.bucket = bucket
+        self.compression_level = compression_level
+
+    def exists(self, accession_number: str) -> bool:
+        stored_files = self.bucket.find({"filename": accession_number}).limit(1)
+        return next(stored_files, None) is not None
+
+    def get(self, accession_number: str) -> Optional[str]:
+        try:
+            with self.bucket.open_download_stream_by_name(accession_number) as stream:
+                compressed = stream.read()
+        except NoFile:
+            logging.warning(f"No content stored for filing with accession number {accession_number}.")
+            return None
+        return zstandard.ZstdDecompressor().decompress(compressed).decode("utf-8")
+
+    def put(self, accession_number: str, content_html_str: str) -> bool:
+        """Stores the content of a filing, returns False if it was stored before."""
+        if self.exists(accession_number):
+            return False
+        compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(
+            content_html_str.encode("utf-8")
+        )
+        self.bucket.upload_from_stream(
+            accession_number,
+            compressed,
+            metadata={"encoding": self.ENCODING, "size": len(content_html_str)},
+        )
+        return True
+
+    def delete(self, accession_number: str) -> int:
+        file_ids = [
+            grid_out._id for grid_out in self.bucket.find({"filename": accession_number})
+        ]
+        for file_id in file_ids:
+            self.bucket.delete(file_id)
+        return len(file_ids)
@@ -0,0 +1,212 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.collection import Collection
+from typing import Dict, Iterable, List, Optional
+from modeling.PipelineTask import (
+    DONE_STAGE,
+    FETCH_STAGE,
+    TASK_DEAD,
+    TASK_DONE,
+    TASK_LEASED,
+    TASK_PENDING,
+    PipelineTask,
+    next_stage,
+)
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+
+
+class PipelineTaskRepository:
+    """
+    Durable work queue of the ingestion pipeline, one task per filing that
+    moves from stage to stage.
+
+    A worker of a stage leases a pending task until `locked_until`, and hands
+    it to the next stage along with the output of its stage. A task whose worker
+    died is claimed again once the lease has expired. Failed attempts are
+    retried with backoff until `max_attempts`, after which the task is
+    dead-lettered for inspection. A task that cannot run yet is deferred,
+    which does not count as an attempt.
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def enqueue(self, filing_metadatas: Iterable[SEC_Filing_Metadata]) -> int:
+        """Adds a task for every filing that has none yet. Returns the number of added tasks."""
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne(
+                {"task_id": filing_metadata.accession_number},
+                {
+                    "$setOnInsert": {
+                        "task_id": filing_metadata.accession_number,
+                        "cik": filing_metadata.company_cik,
+                        "filing_metadata": filing_metadata.model_dump(),
+                        "stage": FETCH_STAGE,
+                        "status": TASK_PENDING,
+                        "attempts": 0,
+                        "available_at": now,
+                        "updated_at": now,
+                    }
+                },
+                upsert=True,
+            )
+            for filing_metadata in filing_metadatas
+        ]
+        if not operations:
+            return 0
+        result = self.collection.bulk_write(operations, ordered=False)
+        if result.upserted_count:
+            logging.info(f"Enqueued {result.upserted_count} filings for ingestion.")
+        return result.upserted_count
+
+    def get_task(self, task_id: str) -> Optional[PipelineTask]:
+        task = self.collection.find_one({"task_id": task_id}, {"_id": 0})
+        if task:
+            return PipelineTask(**task)
+        return None
+
+    def claim(self, stage: str, worker_id: str, lease_seconds: float) -> Optional[PipelineTask]:
+        """Leases the task of a stage that has been available the longest."""
+        now = datetime.now(timezone.utc)
+        task = self.collection.find_one_and_update(
+            {
+                "stage": stage,
+                "$or": [
+                    {"status": TASK_PENDING, "available_at": {"$lte": now}},
+                    {"status": TASK_LEASED, "locked_until": {"$lt": now}},
+                ],
+            },
+            {
+                "$set": {
+                    "status": TASK_LEASED,
+                    "locked_by": worker_id,
+                    "locked_until": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now,
+                }
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if task is None:
+            return None
+        task.pop("_id", None)
+        return PipelineTask(**task)
+
+    def _update_leased(self, task: PipelineTask, update: dict) -> bool:
+        update.setdefault("$set", {})["updated_at"] = datetime.now(timezone.utc)
+        # A worker whose lease expired must not overwrite the work of another one
+        result = self.collection.update_one(
+            {
+                "task_id": task.task_id,
+                "stage": task.stage,
+                "status": TASK_LEASED,
+                "locked_by": task.locked_by,
+            },
+            update,
+        )
+        if result.matched_count == 0:
+            logging.warning(f"Lease of task {task.task_id} in stage {task.stage} was lost.")
+        return result.matched_count == 1
+
+    def advance(self, task: PipelineTask, output: Optional[dict] = None) -> bool:
+        """Hands a task to the next stage, along with the output of its stage."""
+        stage = next_stage(task.stage)
+        fields = dict(output or {})
+        fields.update(
+            {
+                "stage": stage,
+                "status": TASK_DONE if stage == DONE_STAGE else TASK_PENDING,
+                "attempts": 0,
+                "available_at": datetime.now(timezone.utc),
+                "locked_by": None,
+                "locked_until": None,
+                "last_error": None,
+            }
+        )
+        return self._update_leased(task, {"$set": fields})
+
+    def fail(self, task: PipelineTask, error: str, max_attempts: int, retry_backoff_seconds: float) -> bool:
+        """Schedules a retry of the stage of a task, or dead-letters it after `max_attempts`."""
+        attempts = task.attempts + 1
+        fields = {"attempts": attempts, "last_error": error, "locked_by": None, "locked_until": None}
+        if attempts >= max_attempts:
+            fields["status"] = TASK_DEAD
+            logging.error(
+                f"Dead-lettered task {task.task_id} in stage {task.stage} after {attempts} attempts: {error}"
+            )
+        else:
+            retry_delay = retry_backoff_seconds * 2 ** (attempts - 1)
+            fields["status"] = TASK_PENDING
+            fields["available_at"] = datetime.now(timezone.utc) + timedelta(seconds=retry_delay)
+            logging.warning(
+                f"Task {task.task_id} failed in stage {task.stage}, retrying in {retry_delay:.0f}s: {error}"
+            )
+        return self._update_leased(task, {"$set": fields})
+
+    def defer(self, task: PipelineTask, delay_seconds: float) -> bool:
+        """Hands a task back to its stage, to be claimed again after `delay_seconds`."""
+        fields = {
+            "status": TASK_PENDING,
+            "available_at": datetime.now(timezone.utc) + timedelta(seconds=delay_seconds),
+            "locked_by": None,
+            "locked_until": None,
+        }
+        return self._update_leased(task, {"$set": fields})
+
+    def requeue_dead(self, stage: Optional[str] = None) -> int:
+        """Gives the dead-lettered tasks, of a stage or of all stages, a new set of attempts."""
+        query = {"status": TASK_DEAD}
+        if stage is not None:
+            query["stage"] = stage
+        now = datetime.now(timezone.utc)
+        result = self.collection.update_many(
+            query,
+            {"$set": {"status": TASK_PENDING, "attempts": 0, "available_at": now, "updated_at": now}},
+        )
+        logging.info(f"Requeued {result.modified_count} dead-lettered tasks.")
+        return result.modified_count
+
+    def count_waiting(self, stage: str) -> int:
+        return self.collection.count_documents({"stage": stage, "status": TASK_PENDING})
+
+    def count_unfinished(self, stages: List[str]) -> int:
+        """Returns the number of tasks in the given stages that still have to run."""
+        return self.collection.count_documents(
+            {"stage": {"$in": stages}, "status": {"$in": [TASK_PENDING, TASK_LEASED]}}
+        )
+
+    def has_earlier_unfinished(self, task: PipelineTask, stages: List[str]) -> bool:
+        """
+        Tells whether a filing of the entity of a task that was accepted before
+        it still has to run in one of the given stages. Dead-lettered tasks do
+        not count.
+        """
+        acceptance_date_time = task.filing_metadata.acceptance_date_time
+        earlier_task = self.collection.find_one(
+            {
+                "cik": task.cik,
+                "stage": {"$in": stages},
+                "status": {"$in": [TASK_PENDING, TASK_LEASED]},
+                # Same order as the watermark of the sync
+                "$or": [
+                    {"filing_metadata.acceptance_date_time": {"$lt": acceptance_date_time}},
+                    {
+                        "filing_metadata.acceptance_date_time": acceptance_date_time,
+                        "task_id": {"$lt": task.task_id},
+                    },
+                ],
+            },
+            {"_id": 1},
+        )
+        return earlier_task is not None
+
+    def count_by_stage(self) -> Dict[str, Dict[str, int]]:
+        """Returns the number of tasks by stage and status."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for group in self.collection.aggregate(
+            [{"$group": {"_id": {"stage": "$stage", "status": "$status"}, "count": {"$sum": 1}}}]
+        ):
+            counts.setdefault(group["_id"]["stage"], {})[group["_id"]["status"]] = group["count"]
+        return counts
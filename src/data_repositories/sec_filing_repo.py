@@ -1,67 +1,168 @@
 import logging
+import bson
+from pydantic import BaseModel
 from pymongo.collection import Collection
 from pymongo import UpdateOne, DeleteOne
-from typing import List, Optional
+from pymongo.errors import BulkWriteError
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from config import mongosettings
 from modeling.filing.SEC_Filing import SEC_Filing
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
 from data_repositories.public_entity_repo import PublicEntity
+from data_repositories.filing_content_store import FilingContentStore
 from datetime import date
 
 
+# Projections for SEC_FilingRepository.iter_filings
+METADATA_PROJECTION = {
+    "_id": 0,
+    "filing_metadata": 1,
+    "is_parsed": 1,
+    "has_raw_content": 1,
+    "is_content_external": 1,
+}
+WITHOUT_CONTENT_PROJECTION = {"content_html_str": 0}
+
+# Bulk writes are sent in chunks well below the 48 MB message limit
+MAX_BULK_WRITE_BYTES = 8 * 1024 * 1024
+MAX_BULK_WRITE_OPERATIONS = 1000
+DUPLICATE_KEY_ERROR = 11000
+
+
+class FilingWriteResult(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+
 class SEC_FilingRepository:
-    def __init__(self, collection: Collection):
+    """
+    Filings are stored with their raw content inline, unless a content store is
+    given: the content then goes to the store and is loaded lazily, on the first
+    call to `SEC_Filing.get_content_html`.
+    """
+
+    def __init__(self, collection: Collection, content_store: Optional[FilingContentStore] = None):
         self.collection = collection
+        self.content_store = content_store
 
-    def get_all_filings(self) -> List[SEC_Filing]:
-        filings = self.collection.find()
-        logging.info(
-            f"Retrieved {self.collection.count_documents({})} filings from the collection."
+    def _to_document(self, filing: SEC_Filing) -> dict:
+        document = filing.model_dump()
+        if self.content_store is not None and filing.content_html_str is not None:
+            self.content_store.put(filing.filing_metadata.accession_number, filing.content_html_str)
+            document["content_html_str"] = None
+            document["is_content_external"] = True
+        return document
+
+    def _from_document(self, document: dict) -> SEC_Filing:
+        filing = SEC_Filing(**document)
+        if self.content_store is not None and filing.is_content_external:
+            accession_number = filing.filing_metadata.accession_number
+            filing.set_content_loader(lambda: self.content_store.get(accession_number))
+        return filing
+
+    def iter_filings(
+        self,
+        query: dict,
+        projection: Optional[dict] = None,
+        sort: Optional[List[Tuple[str, int]]] = None,
+        batch_size: int = mongosettings.cursor_batch_size,
+    ) -> Iterator[SEC_Filing]:
+        """
+        Streams the filings matching the query, fetching `batch_size` documents
+        per round-trip. A projection (e.g. METADATA_PROJECTION) keeps fields such
+        as the raw HTML on the server; it has to include `filing_metadata`.
+        """
+        cursor = self.collection.find(query, projection, batch_size=batch_size)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            for filing in cursor:
+                yield self._from_document(filing)
+        finally:
+            cursor.close()
+
+    def iter_all_filings(
+        self,
+        projection: Optional[dict] = None,
+        batch_size: int = mongosettings.cursor_batch_size,
+    ) -> Iterator[SEC_Filing]:
+        return self.iter_filings({}, projection, batch_size=batch_size)
+
+    def iter_filings_for_entity(
+        self,
+        public_entity: PublicEntity,
+        projection: Optional[dict] = None,
+        batch_size: int = mongosettings.cursor_batch_size,
+    ) -> Iterator[SEC_Filing]:
+        """Streams the filings of an entity, most recent first."""
+        return self.iter_filings(
+            {"filing_metadata.company_cik": public_entity.cik},
+            projection,
+            sort=[("filing_metadata.filing_date", -1)],
+            batch_size=batch_size,
+        )
+
+    def iter_filings_for_entity_after_date(
+        self,
+        public_entity: PublicEntity,
+        date: date,
+        projection: Optional[dict] = None,
+        batch_size: int = mongosettings.cursor_batch_size,
+    ) -> Iterator[SEC_Filing]:
+        return self.iter_filings(
+            {
+                "filing_metadata.company_cik": public_entity.cik,
+                "filing_metadata.filing_date": {"$gt": date.isoformat()},
+            },
+            projection,
+            batch_size=batch_size,
         )
-        return [SEC_Filing(**filing) for filing in filings]
+
+    def get_all_filings(self, projection: Optional[dict] = None) -> List[SEC_Filing]:
+        filings = list(self.iter_all_filings(projection))
+        logging.info(f"Retrieved {len(filings)} filings from the collection.")
+        return filings
 
     def get_filing_by_id(self, filing_id: str) -> Optional[SEC_Filing]:
         filing = self.collection.find_one({"_id": filing_id})
         if filing:
             logging.info(f"Found filing with ID {filing_id}.")
-            return SEC_Filing(**filing)
+            return self._from_document(filing)
         logging.warning(f"No filing found with ID {filing_id}.")
         return None
 
-    def get_filings_for_entity(self, public_entity: PublicEntity) -> List[SEC_Filing]:
-        # Strip trailing zeros from the CIK
-        company_cik = public_entity.cik
-        filings = self.collection.find({"filing_metadata.company_cik": company_cik}).sort("filing_metadata.filing_date", -1)
+    def get_filings_for_entity(
+        self, public_entity: PublicEntity, projection: Optional[dict] = None
+    ) -> List[SEC_Filing]:
+        filings = list(self.iter_filings_for_entity(public_entity, projection))
         logging.info(
-            f"Retrieved {self.collection.count_documents({'filing_metadata.company_cik': company_cik})} filings for company CIK {company_cik}."
+            f"Retrieved {len(filings)} filings for company CIK {public_entity.cik}."
         )
-        return [SEC_Filing(**filing) for filing in filings]
+        return filings
 
     def get_filings_for_entity_after_date(
-        self, public_entity: PublicEntity, date: date
+        self, public_entity: PublicEntity, date: date, projection: Optional[dict] = None
     ) -> List[SEC_Filing]:
-        cik = public_entity.cik
-        date_str = date.isoformat()
-        # Strip trailing zeros from the CIK
-        filings = self.collection.find(
-            {
-                "filing_metadata.company_cik": cik,
-                "filing_metadata.filing_date": {"$gt": date_str},
-            }
+        filings = list(
+            self.iter_filings_for_entity_after_date(public_entity, date, projection)
         )
         logging.info(
-            f"Retrieved {self.collection.count_documents({'filing_metadata.company_cik': cik, 'filing_metadata.filing_date': {'$gt': date_str}})} filings for company CIK {cik} after {date_str}."
+            f"Retrieved {len(filings)} filings for company CIK {public_entity.cik} after {date.isoformat()}."
         )
-        return [SEC_Filing(**filing) for filing in filings]
+        return filings
     
     
     def get_latest_filing_date_for(self, public_entity: PublicEntity) -> Optional[date]:
         cik = public_entity.cik
+        # Only the date is needed, leave the rest of the filing on the server
         latest_filing = self.collection.find_one(
             {"filing_metadata.company_cik": cik},
+            {"_id": 0, "filing_metadata.filing_date": 1},
             sort=[("filing_metadata.filing_date", -1)]
         )
         if latest_filing:
-            latest_filing = SEC_Filing(**latest_filing)
-            latest_filing_date_str = latest_filing.filing_metadata.filing_date
+            latest_filing_date_str = latest_filing["filing_metadata"]["filing_date"]
             latest_filing_date = date.fromisoformat(latest_filing_date_str)
             logging.info(f"Latest filing date for company CIK {cik} is {latest_filing_date}.")
             return latest_filing_date
@@ -69,6 +170,32 @@ class SEC_FilingRepository:
         return None
     
 
+    def get_latest_filing_metadata_for(
+        self, public_entity: PublicEntity
+    ) -> Optional[SEC_Filing_Metadata]:
+        """Returns the metadata of the filing of an entity that was accepted last."""
+        latest_filing = self.collection.find_one(
+            {"filing_metadata.company_cik": public_entity.cik},
+            {"_id": 0, "filing_metadata": 1},
+            sort=[
+                ("filing_metadata.acceptance_date_time", -1),
+                ("filing_metadata.accession_number", -1),
+            ],
+        )
+        if latest_filing:
+            return SEC_Filing_Metadata(**latest_filing["filing_metadata"])
+        return None
+
+    def get_stored_accession_numbers(self, accession_numbers: Iterable[str]) -> Set[str]:
+        """Returns the given accession numbers that have a stored filing."""
+        stored_filings = self.collection.find(
+            {"filing_metadata.accession_number": {"$in": list(accession_numbers)}},
+            {"_id": 0, "filing_metadata.accession_number": 1},
+        )
+        return {
+            stored_filing["filing_metadata"]["accession_number"] for stored_filing in stored_filings
+        }
+
     def add_filing(self, filing: SEC_Filing) -> Optional[str]:
         existing_filing = self.collection.find_one(
             {
@@ -81,41 +208,144 @@ class SEC_FilingRepository:
             )
             return None
 
-        result = self.collection.insert_one(filing.model_dump())
+        result = self.collection.insert_one(self._to_document(filing))
         logging.info(
             f"Added new filing with accession number {filing.filing_metadata.accession_number}."
         )
         return str(result.inserted_id)
 
-    def add_filings(self, filings: List[SEC_Filing]) -> List[str]:
-        accession_numbers = [
-            filing.filing_metadata.accession_number for filing in filings
-        ]
-        existing_filings = self.collection.find(
-            {"filing_metadata.accession_number": {"$in": accession_numbers}}
+    def _write_operation(
+        self, filing: SEC_Filing, upsert: bool, stored_document: Optional[dict] = None
+    ) -> Tuple[Optional[UpdateOne], int]:
+        """
+        Builds the update of a filing, along with its approximate size in bytes.
+
+        The metadata of a filing never changes, so it is only written on insert.
+        Upserts only `$set` the fields that differ from their defaults, so that
+        storing a filing again without its content keeps the content stored
+        before. Updates `$set` the fields that differ from the `stored_document`,
+        and are None if there are none.
+        """
+        document = self._to_document(filing)
+        set_fields = {
+            field_name: value
+            for field_name, value in document.items()
+            if field_name != "filing_metadata"
+            and (not upsert or value != SEC_Filing.model_fields[field_name].get_default())
+            and (stored_document is None or stored_document.get(field_name) != value)
+        }
+        if not upsert and stored_document is not None and not set_fields:
+            return None, 0
+        update = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if upsert:
+            update["$setOnInsert"] = {
+                field_name: value
+                for field_name, value in document.items()
+                if field_name not in set_fields
+            }
+        operation = UpdateOne(
+            {"filing_metadata.accession_number": filing.filing_metadata.accession_number},
+            update,
+            upsert=upsert,
+        )
+        return operation, len(bson.encode(update))
+
+    def _get_stored_documents(self, filings: List[SEC_Filing]) -> Dict[str, dict]:
+        """Returns the stored documents of the given filings, without their metadata, by accession number."""
+        accession_numbers = [filing.filing_metadata.accession_number for filing in filings]
+        projection = {
+            field_name: 1 for field_name in SEC_Filing.model_fields if field_name != "filing_metadata"
+        }
+        projection.update({"_id": 0, "filing_metadata.accession_number": 1})
+        stored_documents = self.collection.find(
+            {"filing_metadata.accession_number": {"$in": accession_numbers}}, projection
         )
-        existing_accession_numbers = {
-            filing["filing_metadata"]["accession_number"] for filing in existing_filings
+        return {
+            stored_document.pop("filing_metadata")["accession_number"]: stored_document
+            for stored_document in stored_documents
         }
 
-        new_filings = [
-            filing.model_dump()
-            for filing in filings
-            if filing.filing_metadata.accession_number not in existing_accession_numbers
-        ]
+    def _bulk_write_chunk(self, operations: List[UpdateOne]) -> FilingWriteResult:
+        try:
+            result = self.collection.bulk_write(operations, ordered=False)
+            inserted, matched, modified = (
+                result.upserted_count, result.matched_count, result.modified_count
+            )
+            duplicates = 0
+        except BulkWriteError as e:
+            # Concurrent upserts of the same filing race on the unique accession
+            # number index: the losing write is a no-op, anything else is an error
+            write_errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in write_errors):
+                raise
+            inserted, matched, modified = (
+                e.details.get("nUpserted", 0), e.details.get("nMatched", 0), e.details.get("nModified", 0)
+            )
+            duplicates = len(write_errors)
+        return FilingWriteResult(
+            inserted=inserted, updated=modified, unchanged=matched - modified + duplicates
+        )
+
+    def bulk_write_filings(
+        self,
+        filings: List[SEC_Filing],
+        upsert: bool = True,
+        max_chunk_bytes: int = MAX_BULK_WRITE_BYTES,
+        max_chunk_operations: int = MAX_BULK_WRITE_OPERATIONS,
+    ) -> FilingWriteResult:
+        """
+        Writes filings with unordered bulk updates keyed on the accession number,
+        one round-trip per chunk of at most `max_chunk_operations` operations and
+        about `max_chunk_bytes` bytes. Without `upsert`, the filings are read
+        first, so that only their changed fields are written.
+        """
+        write_result = FilingWriteResult()
+        chunk: List[UpdateOne] = []
+        chunk_bytes = 0
+        for start in range(0, len(filings), max_chunk_operations):
+            filings_group = filings[start : start + max_chunk_operations]
+            # Updates are compared with the stored filings, with one read per group
+            stored_documents = {} if upsert else self._get_stored_documents(filings_group)
+            for filing in filings_group:
+                operation, operation_bytes = self._write_operation(
+                    filing, upsert, stored_documents.get(filing.filing_metadata.accession_number)
+                )
+                if operation is None:
+                    write_result.unchanged += 1
+                    continue
+                if chunk and (
+                    chunk_bytes + operation_bytes > max_chunk_bytes
+                    or len(chunk) >= max_chunk_operations
+                ):
+                    chunk_result = self._bulk_write_chunk(chunk)
+                    write_result.inserted += chunk_result.inserted
+                    write_result.updated += chunk_result.updated
+                    write_result.unchanged += chunk_result.unchanged
+                    chunk, chunk_bytes = [], 0
+                chunk.append(operation)
+                chunk_bytes += operation_bytes
+        if chunk:
+            chunk_result = self._bulk_write_chunk(chunk)
+            write_result.inserted += chunk_result.inserted
+            write_result.updated += chunk_result.updated
+            write_result.unchanged += chunk_result.unchanged
+        return write_result
 
-        if new_filings:
-            result = self.collection.insert_many(new_filings)
-            logging.info(f"Added {len(result.inserted_ids)} new filings.")
-            return [str(inserted_id) for inserted_id in result.inserted_ids]
-        else:
-            logging.info("No new filings were added.")
-            return []
+    def add_filings(self, filings: List[SEC_Filing]) -> FilingWriteResult:
+        """Upserts filings by accession number, adding new ones and completing existing ones."""
+        write_result = self.bulk_write_filings(filings, upsert=True)
+        logging.info(
+            f"Added {write_result.inserted} new filings, updated {write_result.updated} "
+            f"and left {write_result.unchanged} unchanged."
+        )
+        return write_result
 
     def update_filing(self, accession_number: str, filing: SEC_Filing) -> bool:
         result = self.collection.update_one(
             {"filing_metadata.accession_number": accession_number},
-            {"$set": filing.model_dump()},
+            {"$set": self._to_document(filing)},
         )
         if result.modified_count > 0:
             logging.info(f"Updated filing with accession number {accession_number}.")
@@ -126,23 +356,16 @@ class SEC_FilingRepository:
         return False
 
     def update_filings(self, filings: List[SEC_Filing]) -> int:
-        operations = [
-            UpdateOne(
-                {
-                    "filing_metadata.accession_number": filing.filing_metadata.accession_number
-                },
-                {"$set": filing.model_dump()},
-            )
-            for filing in filings
-        ]
-        result = self.collection.bulk_write(operations)
-        logging.info(f"Updated {result.modified_count} filings.")
-        return result.modified_count
+        write_result = self.bulk_write_filings(filings, upsert=False)
+        logging.info(f"Updated {write_result.updated} filings.")
+        return write_result.updated
 
     def delete_filing(self, accession_number: str) -> bool:
         result = self.collection.delete_one(
             {"filing_metadata.accession_number": accession_number}
         )
+        if self.content_store is not None:
+            self.content_store.delete(accession_number)
         if result.deleted_count > 0:
             logging.info(f"Deleted filing with accession number {accession_number}.")
             return True
@@ -157,6 +380,44 @@ class SEC_FilingRepository:
             for accession_number in accession_numbers
         ]
         result = self.collection.bulk_write(operations)
+        if self.content_store is not None:
+            for accession_number in accession_numbers:
+                self.content_store.delete(accession_number)
         logging.info(f"Deleted {result.deleted_count} filings.")
         return result.deleted_count
+
+    def migrate_content_to_store(self, batch_size: int = mongosettings.cursor_batch_size) -> int:
+        """
+        Moves the inline content of stored filings to the content store, one batch
+        of filings at a time. Safe to interrupt and run again.
+        """
+        if self.content_store is None:
+            raise ValueError("A content store is required to migrate filing content.")
+        cursor = self.collection.find(
+            {"content_html_str": {"$type": "string"}},
+            {"filing_metadata.accession_number": 1, "content_html_str": 1},
+            batch_size=batch_size,
+        )
+        migrated = 0
+        operations = []
+        try:
+            for filing in cursor:
+                self.content_store.put(
+                    filing["filing_metadata"]["accession_number"], filing["content_html_str"]
+                )
+                operations.append(
+                    UpdateOne(
+                        {"_id": filing["_id"]},
+                        {"$set": {"content_html_str": None, "is_content_external": True}},
+                    )
+                )
+                if len(operations) >= batch_size:
+                    migrated += self.collection.bulk_write(operations, ordered=False).modified_count
+                    operations = []
+            if operations:
+                migrated += self.collection.bulk_write(operations, ordered=False).modified_count
+        finally:
+            cursor.close()
+        logging.info(f"Moved the content of {migrated} filings to the content store.")
+        return migrated
     
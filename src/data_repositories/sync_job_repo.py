@@ -0,0 +1,197 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.collection import Collection
+from typing import Dict, Iterable, List, Optional
+from modeling.SyncJob import JOB_RUNNING, JOB_SCHEDULED, SyncJob
+
+
+class SyncJobRepository:
+    """
+    Persistent queue of the recurring jobs of the scheduler, one document per
+    job. A worker claims a due job by leasing it until `locked_until`; the job
+    of a worker that died is claimed again once its lease has expired.
+
+    A job that is made due while it runs is flagged with `rerun_requested`:
+    its current run may have started before whatever made it due, so it runs
+    again as soon as the current run completes.
+    """
+
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    @staticmethod
+    def _claimable(now: datetime) -> dict:
+        return {
+            "next_run_at": {"$lte": now},
+            "$or": [
+                {"status": JOB_SCHEDULED},
+                {"status": JOB_RUNNING, "locked_until": {"$lt": now}},
+            ],
+        }
+
+    def get_job(self, job_id: str) -> Optional[SyncJob]:
+        job = self.collection.find_one({"job_id": job_id}, {"_id": 0})
+        if job:
+            return SyncJob(**job)
+        return None
+
+    def get_jobs(self, kind: Optional[str] = None) -> Dict[str, SyncJob]:
+        query = {"kind": kind} if kind is not None else {}
+        return {job["job_id"]: SyncJob(**job) for job in self.collection.find(query, {"_id": 0})}
+
+    def schedule_jobs(self, jobs: Iterable[SyncJob]) -> int:
+        """
+        Adds the given jobs, due at their `next_run_at`, and updates the
+        priority and interval of the jobs that exist already. Returns the
+        number of added jobs.
+        """
+        operations = [
+            UpdateOne(
+                {"job_id": job.job_id},
+                {
+                    "$set": {
+                        "kind": job.kind,
+                        "cik": job.cik,
+                        "priority": job.priority,
+                        "interval_seconds": job.interval_seconds,
+                    },
+                    "$setOnInsert": {
+                        "next_run_at": job.next_run_at,
+                        "status": JOB_SCHEDULED,
+                        "attempts": 0,
+                    },
+                },
+                upsert=True,
+            )
+            for job in jobs
+        ]
+        if not operations:
+            return 0
+        result = self.collection.bulk_write(operations, ordered=False)
+        if result.upserted_count:
+            logging.info(f"Scheduled {result.upserted_count} new jobs.")
+        return result.upserted_count
+
+    def delete_jobs(self, job_ids: List[str]) -> int:
+        result = self.collection.delete_many({"job_id": {"$in": job_ids}})
+        logging.info(f"Deleted {result.deleted_count} jobs.")
+        return result.deleted_count
+
+    def run_now(self, job_ids: List[str]) -> int:
+        """
+        Makes the given jobs due right away, the running ones once their current
+        run completes. Returns the number of jobs that were found.
+        """
+        # Flagged first, so a job that starts or finishes its run in between is not missed:
+        # claims clear the flag, completions honor it
+        result = self.collection.update_many(
+            {"job_id": {"$in": job_ids}}, {"$set": {"rerun_requested": True}}
+        )
+        self.collection.update_many(
+            {"job_id": {"$in": job_ids}, "status": JOB_SCHEDULED},
+            {"$set": {"next_run_at": datetime.now(timezone.utc), "rerun_requested": False}},
+        )
+        return result.matched_count
+
+    def claim_due_job(self, worker_id: str, lease_seconds: float) -> Optional[SyncJob]:
+        """Leases the due job with the highest priority, the longest overdue first."""
+        now = datetime.now(timezone.utc)
+        job = self.collection.find_one_and_update(
+            SyncJobRepository._claimable(now),
+            {
+                "$set": {
+                    "status": JOB_RUNNING,
+                    "locked_by": worker_id,
+                    "locked_until": now + timedelta(seconds=lease_seconds),
+                    "last_started_at": now,
+                    # This run covers whatever made the job due
+                    "rerun_requested": False,
+                }
+            },
+            sort=[("priority", DESCENDING), ("next_run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return None
+        job.pop("_id", None)
+        sync_job = SyncJob(**job)
+        sync_job.last_wait_seconds = (now - sync_job.next_run_at).total_seconds()
+        return sync_job
+
+    def extend_lease(self, job: SyncJob, lease_seconds: float) -> bool:
+        """Renews the lease of a running job, returns False if the lease was taken over."""
+        result = self.collection.update_one(
+            {"job_id": job.job_id, "status": JOB_RUNNING, "locked_by": job.locked_by},
+            {"$set": {"locked_until": datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    def _release(
+        self, job: SyncJob, fields: dict, inc: Optional[dict] = None, query: Optional[dict] = None
+    ) -> bool:
+        fields.update(
+            {
+                "status": JOB_SCHEDULED,
+                "locked_by": None,
+                "locked_until": None,
+                "last_finished_at": datetime.now(timezone.utc),
+                "last_wait_seconds": job.last_wait_seconds,
+                "last_duration_seconds": job.last_duration_seconds,
+            }
+        )
+        update = {"$set": fields}
+        if inc:
+            update["$inc"] = inc
+        # A worker whose lease expired must not overwrite the run of another one
+        result = self.collection.update_one(
+            {"job_id": job.job_id, "status": JOB_RUNNING, "locked_by": job.locked_by, **(query or {})},
+            update,
+        )
+        return result.matched_count == 1
+
+    def complete_job(self, job: SyncJob, next_run_at: datetime) -> bool:
+        fields = {"attempts": 0, "last_error": None}
+        released = self._release(
+            job, {**fields, "next_run_at": next_run_at}, query={"rerun_requested": {"$ne": True}}
+        )
+        if not released:
+            # Either the job was made due while it ran, or the lease was lost
+            released = self._release(
+                job, {**fields, "next_run_at": datetime.now(timezone.utc), "rerun_requested": False}
+            )
+            if released:
+                logging.info(f"Job {job.job_id} was made due while it ran, running it again.")
+        if not released:
+            logging.warning(f"Lease of job {job.job_id} was lost before it finished.")
+        return released
+
+    def fail_job(self, job: SyncJob, error: str, retry_at: datetime) -> bool:
+        # A requested rerun is left to the retry, which starts after the request
+        released = self._release(
+            job, {"next_run_at": retry_at, "last_error": error}, inc={"attempts": 1}
+        )
+        if not released:
+            logging.warning(f"Lease of job {job.job_id} was lost before it finished.")
+        return released
+
+    def get_next_run_at(self) -> Optional[datetime]:
+        job = self.collection.find_one(
+            {"status": JOB_SCHEDULED},
+            {"_id": 0, "next_run_at": 1},
+            sort=[("next_run_at", ASCENDING)],
+        )
+        if job:
+            # MongoDB returns naive datetimes that are in UTC
+            return job["next_run_at"].replace(tzinfo=timezone.utc)
+        return None
+
+    def count_due_jobs(self) -> int:
+        return self.collection.count_documents(
+            SyncJobRepository._claimable(datetime.now(timezone.utc))
+        )
+
+    def count_running_jobs(self) -> int:
+        return self.collection.count_documents(
+            {"status": JOB_RUNNING, "locked_until": {"$gte": datetime.now(timezone.utc)}}
+        )
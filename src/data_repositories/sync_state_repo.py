@@ -0,0 +1,50 @@
+import logging
+from datetime import datetime, timezone
+from pymongo.collection import Collection
+from typing import Dict, Iterable, Optional
+from modeling.SyncState import SyncState
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+
+
+class SyncStateRepository:
+    def __init__(self, collection: Collection):
+        self.collection = collection
+
+    def get_state(self, cik: str) -> Optional[SyncState]:
+        state = self.collection.find_one({"cik": cik}, {"_id": 0})
+        if state:
+            return SyncState(**state)
+        return None
+
+    def get_states(self, ciks: Optional[Iterable[str]] = None) -> Dict[str, SyncState]:
+        """Returns the sync states of the given entities, or of all entities, by CIK."""
+        query = {"cik": {"$in": list(ciks)}} if ciks is not None else {}
+        return {
+            state["cik"]: SyncState(**state)
+            for state in self.collection.find(query, {"_id": 0})
+        }
+
+    def _set(self, cik: str, fields: dict):
+        fields["updated_at"] = datetime.now(timezone.utc)
+        self.collection.update_one({"cik": cik}, {"$set": fields}, upsert=True)
+
+    def mark_started(self, cik: str):
+        self._set(cik, {"in_progress": True})
+        logging.info(f"Started sync of company CIK {cik}.")
+
+    def checkpoint(self, cik: str, filing_metadata: SEC_Filing_Metadata):
+        """Records the last filing of a stored batch; later runs resume after it."""
+        self._set(
+            cik,
+            {
+                "last_accession_number": filing_metadata.accession_number,
+                "last_acceptance_date_time": filing_metadata.acceptance_date_time,
+            },
+        )
+        logging.info(
+            f"Checkpointed sync of company CIK {cik} at accession number {filing_metadata.accession_number}."
+        )
+
+    def mark_completed(self, cik: str):
+        self._set(cik, {"in_progress": False})
+        logging.info(f"Completed sync of company CIK {cik}.")
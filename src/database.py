@@ -2,28 +2,226 @@
 MongoDB database initialization
 """
 
+import logging
+from typing import List, Optional, Tuple
 from config import mongosettings
-from pymongo import MongoClient
+from gridfs import GridFSBucket
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
 from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
 
 
 client = MongoClient(mongosettings.uri)
 db = client[mongosettings.database_name]
 
 
+# Indexes of every collection, created idempotently at startup
+COLLECTION_INDEXES = {
+    mongosettings.entities_coll_name: [
+        IndexModel([("cik", ASCENDING)], name="cik_unique", unique=True),
+        # Many entities have no ticker, only string tickers have to be unique
+        IndexModel(
+            [("ticker", ASCENDING)],
+            name="ticker_unique",
+            unique=True,
+            partialFilterExpression={"ticker": {"$gt": ""}},
+        ),
+    ],
+    mongosettings.filings_coll_name: [
+        IndexModel(
+            [
+                ("filing_metadata.company_cik", ASCENDING),
+                ("filing_metadata.filing_date", DESCENDING),
+            ],
+            name="company_cik_filing_date",
+        ),
+        IndexModel(
+            [("filing_metadata.accession_number", ASCENDING)],
+            name="accession_number_unique",
+            unique=True,
+        ),
+    ],
+    mongosettings.btc_purchases_coll_name: [],
+    mongosettings.sync_state_coll_name: [
+        IndexModel([("cik", ASCENDING)], name="cik_unique", unique=True),
+    ],
+    mongosettings.discovery_state_coll_name: [
+        IndexModel([("source", ASCENDING)], name="source_unique", unique=True),
+    ],
+    mongosettings.sync_jobs_coll_name: [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        # Claims pick the due job with the highest priority
+        IndexModel(
+            [("status", ASCENDING), ("priority", DESCENDING), ("next_run_at", ASCENDING)],
+            name="status_priority_next_run_at",
+        ),
+        IndexModel([("status", ASCENDING), ("next_run_at", ASCENDING)], name="status_next_run_at"),
+    ],
+    mongosettings.entity_leases_coll_name: [
+        IndexModel([("cik", ASCENDING)], name="cik_unique", unique=True),
+        IndexModel([("owner", ASCENDING)], name="owner"),
+    ],
+    mongosettings.pipeline_tasks_coll_name: [
+        IndexModel([("task_id", ASCENDING)], name="task_id_unique", unique=True),
+        # Workers of a stage claim its longest available task
+        IndexModel(
+            [("stage", ASCENDING), ("status", ASCENDING), ("available_at", ASCENDING)],
+            name="stage_status_available_at",
+        ),
+        # Extraction waits for the earlier filings of the entity
+        IndexModel(
+            [("cik", ASCENDING), ("filing_metadata.acceptance_date_time", ASCENDING)],
+            name="cik_acceptance_date_time",
+        ),
+        # Finished tasks are only kept for a week, for inspection
+        IndexModel(
+            [("updated_at", ASCENDING)],
+            name="done_updated_at_ttl",
+            expireAfterSeconds=7 * 24 * 3600,
+            partialFilterExpression={"status": "done"},
+        ),
+    ],
+}
+
+# Queries issued by the repositories: (collection, description, filter, sort).
+# Each of them has to be served by an index.
+REPOSITORY_QUERIES: List[Tuple[str, str, dict, Optional[list]]] = [
+    (mongosettings.entities_coll_name, "entity by CIK", {"cik": "0000000000"}, None),
+    (mongosettings.entities_coll_name, "entity by ticker", {"ticker": "TICKER"}, None),
+    (
+        mongosettings.filings_coll_name,
+        "filings for entity",
+        {"filing_metadata.company_cik": "0000000000"},
+        [("filing_metadata.filing_date", DESCENDING)],
+    ),
+    (
+        mongosettings.filings_coll_name,
+        "filings for entity after date",
+        {
+            "filing_metadata.company_cik": "0000000000",
+            "filing_metadata.filing_date": {"$gt": "2020-01-01"},
+        },
+        None,
+    ),
+    (
+        mongosettings.filings_coll_name,
+        "latest filing for entity",
+        {"filing_metadata.company_cik": "0000000000"},
+        [
+            ("filing_metadata.acceptance_date_time", DESCENDING),
+            ("filing_metadata.accession_number", DESCENDING),
+        ],
+    ),
+    (
+        mongosettings.filings_coll_name,
+        "filing by accession number",
+        {"filing_metadata.accession_number": "000000000000000000"},
+        None,
+    ),
+    (
+        mongosettings.filings_coll_name,
+        "filings by accession numbers",
+        {"filing_metadata.accession_number": {"$in": ["000000000000000000"]}},
+        None,
+    ),
+    (mongosettings.sync_state_coll_name, "sync state by CIK", {"cik": "0000000000"}, None),
+    (mongosettings.discovery_state_coll_name, "discovery state by source", {"source": "source"}, None),
+    (mongosettings.sync_jobs_coll_name, "job by ID", {"job_id": "job"}, None),
+    (
+        mongosettings.sync_jobs_coll_name,
+        "due jobs",
+        {
+            "next_run_at": {"$lte": "2020-01-01"},
+            "$or": [
+                {"status": "scheduled"},
+                {"status": "running", "locked_until": {"$lt": "2020-01-01"}},
+            ],
+        },
+        [("priority", DESCENDING), ("next_run_at", ASCENDING)],
+    ),
+    (mongosettings.entity_leases_coll_name, "entity lease by CIK", {"cik": "0000000000"}, None),
+    (mongosettings.entity_leases_coll_name, "entity leases of an owner", {"owner": "owner"}, None),
+    (mongosettings.pipeline_tasks_coll_name, "pipeline task by ID", {"task_id": "task"}, None),
+    (
+        mongosettings.pipeline_tasks_coll_name,
+        "claimable pipeline tasks of a stage",
+        {
+            "stage": "fetch",
+            "$or": [
+                {"status": "pending", "available_at": {"$lte": "2020-01-01"}},
+                {"status": "leased", "locked_until": {"$lt": "2020-01-01"}},
+            ],
+        },
+        [("available_at", ASCENDING)],
+    ),
+    (
+        mongosettings.pipeline_tasks_coll_name,
+        "earlier unfinished pipeline tasks of an entity",
+        {
+            "cik": "0000000000",
+            "stage": {"$in": ["fetch", "parse", "extract"]},
+            "status": {"$in": ["pending", "leased"]},
+            "$or": [
+                {"filing_metadata.acceptance_date_time": {"$lt": "2020-01-01T00:00:00.000Z"}},
+                {
+                    "filing_metadata.acceptance_date_time": "2020-01-01T00:00:00.000Z",
+                    "task_id": {"$lt": "task"},
+                },
+            ],
+        },
+        None,
+    ),
+    (
+        mongosettings.sync_jobs_coll_name,
+        "next scheduled job",
+        {"status": "scheduled"},
+        [("next_run_at", ASCENDING)],
+    ),
+]
+
+
+def _plan_stages(plan: dict):
+    yield plan.get("stage")
+    for child_key in ("inputStage", "inputStages", "queryPlan"):
+        children = plan.get(child_key)
+        if isinstance(children, dict):
+            children = [children]
+        for child in children or []:
+            yield from _plan_stages(child)
+
+
+def check_query_plans():
+    """Raises if any repository query would scan a whole collection."""
+    collscans = []
+    for coll_name, description, query_filter, sort in REPOSITORY_QUERIES:
+        cursor = db[coll_name].find(query_filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            collscans.append(f"{description} on {coll_name}")
+    if collscans:
+        raise RuntimeError(f"Queries without index support (COLLSCAN): {', '.join(collscans)}")
+    logging.info(f"All {len(REPOSITORY_QUERIES)} repository queries are served by an index.")
+
+
 def init_collections():
 
     collections = db.list_collection_names()
 
-    # Initialize public_entity collection
-    if mongosettings.entities_coll_name not in db.list_collection_names():
-        db.create_collection(mongosettings.entities_coll_name)
-    # Initialize public_entity collection
-    if mongosettings.filings_coll_name not in db.list_collection_names():
-        db.create_collection(mongosettings.filings_coll_name)
-    # Initialize public_entity collection
-    if mongosettings.btc_purchases_coll_name not in db.list_collection_names():
-        db.create_collection(mongosettings.btc_purchases_coll_name)
+    for coll_name, indexes in COLLECTION_INDEXES.items():
+        # Initialize collection
+        if coll_name not in collections:
+            db.create_collection(coll_name)
+        # Creating an index that already exists with the same options is a no-op
+        if indexes:
+            try:
+                db[coll_name].create_indexes(indexes)
+            except OperationFailure as e:
+                logging.error(f"Could not create indexes on {coll_name}, check for duplicates: {e}")
+                raise
+
+    check_query_plans()
 
 
 # Initialize collections if they do not yet exist
@@ -33,3 +231,9 @@ init_collections()
 public_entity_collection: Collection = db[mongosettings.entities_coll_name]
 filings_collection: Collection = db[mongosettings.filings_coll_name]
 btc_purchases_collection: Collection = db[mongosettings.btc_purchases_coll_name]
+sync_state_collection: Collection = db[mongosettings.sync_state_coll_name]
+discovery_state_collection: Collection = db[mongosettings.discovery_state_coll_name]
+sync_jobs_collection: Collection = db[mongosettings.sync_jobs_coll_name]
+entity_leases_collection: Collection = db[mongosettings.entity_leases_coll_name]
+pipeline_tasks_collection: Collection = db[mongosettings.pipeline_tasks_coll_name]
+filing_contents_bucket = GridFSBucket(db, bucket_name=mongosettings.filing_contents_bucket_name)
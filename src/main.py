@@ -3,8 +3,9 @@ from services.update_db import (
     sync_filings_for,
 )
 from services.daemon import setup_logging
-from database import filings_collection, public_entity_collection
+from database import filings_collection, filing_contents_bucket, public_entity_collection
 from data_repositories.sec_filing_repo import SEC_FilingRepository
+from data_repositories.filing_content_store import FilingContentStore
 from data_repositories.public_entity_repo import PublicEntityRepository
 from modeling.filing.SEC_Filing import SEC_Filing
 from modeling.parsers.SECFilingParser import SEC_Filing_Parser, ItemCode
@@ -14,11 +15,13 @@ setup_logging()
 
 # Data repositories
 public_entity_repo = PublicEntityRepository(public_entity_collection)
-sec_filing_repo = SEC_FilingRepository(filings_collection)
+sec_filing_repo = SEC_FilingRepository(
+    filings_collection, FilingContentStore(filing_contents_bucket)
+)
 
 # Sync filings for
 mstr_entity = public_entity_repo.get_entity_by_ticker("MSTR")
-sync_filings_for(mstr_entity, include_content=True)
+sync_filings_for(mstr_entity)
 
 # Get latest filing
 latest_mstr_filings = sec_filing_repo.get_filings_for_entity(mstr_entity)
@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional
+
+
+class EntityLease(BaseModel):
+    cik: str = Field(..., description="The CIK of the leased entity.")
+    owner: Optional[str] = Field(None, description="Daemon that holds the lease, None once released.")
+    lease_until: datetime = Field(..., description="When the lease expires unless it is renewed.")
+    acquired_at: Optional[datetime] = Field(None, description="When the owner acquired the lease.")
+
+    @field_validator("lease_until", "acquired_at")
+    @classmethod
+    def _as_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # MongoDB returns naive datetimes that are in UTC
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+from modeling.parsers.SECFilingParser import Item
+
+# Stages of the ingestion pipeline, in order. Tasks are created from the
+# metadata of a filing and finish once the filing has been stored.
+FETCH_STAGE = "fetch"
+PARSE_STAGE = "parse"
+EXTRACT_STAGE = "extract"
+STORE_STAGE = "store"
+DONE_STAGE = "done"
+STAGES = [FETCH_STAGE, PARSE_STAGE, EXTRACT_STAGE, STORE_STAGE]
+
+# Statuses of a task within its stage
+TASK_PENDING = "pending"
+TASK_LEASED = "leased"
+TASK_DONE = "done"
+TASK_DEAD = "dead"
+
+
+def next_stage(stage: str) -> str:
+    index = STAGES.index(stage)
+    return STAGES[index + 1] if index + 1 < len(STAGES) else DONE_STAGE
+
+
+class PipelineTask(BaseModel):
+    task_id: str = Field(..., description="Accession number of the filing the task ingests.")
+    cik: str = Field(..., description="The CIK of the entity that filed.")
+    filing_metadata: SEC_Filing_Metadata = Field(..., description="Metadata of the filing.")
+    stage: str = Field(FETCH_STAGE, description="Stage the task is waiting for or running in.")
+    status: str = Field(TASK_PENDING, description="Status of the task within its stage.")
+    attempts: int = Field(0, description="Number of failed attempts of the current stage.")
+    available_at: datetime = Field(..., description="When the task can be claimed, later after a failure.")
+    locked_by: Optional[str] = Field(None, description="Worker that holds the lease of the task.")
+    locked_until: Optional[datetime] = Field(None, description="When the lease of the worker expires.")
+    items: Optional[List[Item]] = Field(None, description="Items of the filing, once parsed.")
+    new_paragraphs: Optional[List[str]] = Field(
+        None, description="Paragraphs no earlier filing of the entity contained, once extracted."
+    )
+    last_error: Optional[str] = Field(None, description="Error of the last failed attempt.")
+    updated_at: Optional[datetime] = Field(None, description="When the task was last written.")
+
+    @field_validator("available_at", "locked_until", "updated_at")
+    @classmethod
+    def _as_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # MongoDB returns naive datetimes that are in UTC
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional
+
+# Kinds of jobs run by the scheduler
+SYNC_ENTITY_JOB = "sync_entity"
+PLAN_JOBS_JOB = "plan_jobs"
+ADD_NEW_ENTITIES_JOB = "add_new_entities"
+DAILY_INDEX_JOB = "daily_index"
+
+# Statuses of a job
+JOB_SCHEDULED = "scheduled"
+JOB_RUNNING = "running"
+
+
+class SyncJob(BaseModel):
+    job_id: str = Field(..., description="Unique ID of the job, e.g. sync_entity:0001050446.")
+    kind: str = Field(..., description="What the job does, one of the job kinds.")
+    cik: Optional[str] = Field(None, description="The CIK of the entity the job is about, if any.")
+    priority: int = Field(0, description="Due jobs with a higher priority run first.")
+    interval_seconds: float = Field(..., description="Seconds between two runs of the job.")
+    next_run_at: datetime = Field(..., description="When the job is due next.")
+    status: str = Field(JOB_SCHEDULED, description="Whether the job waits for its next run or is running.")
+    locked_by: Optional[str] = Field(None, description="Worker that runs the job.")
+    locked_until: Optional[datetime] = Field(
+        None, description="When the lease of the worker expires and the job can be claimed again."
+    )
+    attempts: int = Field(0, description="Number of failed runs since the last successful one.")
+    last_started_at: Optional[datetime] = Field(None, description="When the last run started.")
+    last_finished_at: Optional[datetime] = Field(None, description="When the last run finished.")
+    last_wait_seconds: Optional[float] = Field(
+        None, description="How long the last run waited in the queue after it was due."
+    )
+    last_duration_seconds: Optional[float] = Field(None, description="How long the last run took.")
+    last_error: Optional[str] = Field(None, description="Error of the last run, if it failed.")
+    rerun_requested: bool = Field(
+        False, description="Whether the job runs again right after its current run, which started too early."
+    )
+
+    @field_validator("next_run_at", "locked_until", "last_started_at", "last_finished_at")
+    @classmethod
+    def _as_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # MongoDB returns naive datetimes that are in UTC
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
+    def next_run_after(self, now: datetime) -> datetime:
+        """
+        The next run keeps to the schedule of the job. Runs missed while the
+        daemon was down are caught up by a single run, not one run per interval.
+        """
+        next_run_at = self.next_run_at + timedelta(seconds=self.interval_seconds)
+        if next_run_at <= now:
+            return now + timedelta(seconds=self.interval_seconds)
+        return next_run_at
+
+
+def entity_job_id(cik: str) -> str:
+    return f"{SYNC_ENTITY_JOB}:{cik}"
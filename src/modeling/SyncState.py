@@ -0,0 +1,33 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Optional, Tuple
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+
+
+class SyncState(BaseModel):
+    cik: str = Field(..., description="The CIK of the synced entity.")
+    last_accession_number: Optional[str] = Field(
+        None, description="Accession number of the last filing that was stored."
+    )
+    last_acceptance_date_time: Optional[str] = Field(
+        None, description="Acceptance timestamp of the last filing that was stored."
+    )
+    in_progress: bool = Field(
+        False, description="Whether a sync of the entity started and has not completed yet."
+    )
+    updated_at: Optional[datetime] = Field(
+        None, description="When the state was last written."
+    )
+
+    @staticmethod
+    def watermark_of(filing_metadata: SEC_Filing_Metadata) -> Tuple[str, str]:
+        # Acceptance timestamps order filings within a day, accession numbers break ties
+        return (filing_metadata.acceptance_date_time, filing_metadata.accession_number)
+
+    def is_new(self, filing_metadata: SEC_Filing_Metadata) -> bool:
+        if self.last_acceptance_date_time is None or self.last_accession_number is None:
+            return True
+        return SyncState.watermark_of(filing_metadata) > (
+            self.last_acceptance_date_time,
+            self.last_accession_number,
+        )
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import Callable, Optional
+import zstandard
+from config import storage_settings
+
+
+class FilingArchive:
+    """
+    Local archive of raw filing documents, compressed with zstd.
+
+    Documents are addressed by a hash of their accession number and primary
+    document, which never change once filed. Writes go to a temporary file that
+    is renamed into place, so concurrent processes can fill the archive safely.
+    When the archive grows beyond `max_bytes`, the least recently used documents
+    are evicted.
+    """
+
+    SUFFIX = ".zst"
+
+    def __init__(
+        self,
+        archive_dir: str,
+        max_bytes: Optional[int] = None,
+        compression_level: int = 10,
+    ):
+        self.archive_dir = archive_dir
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._size_lock = threading.Lock()
+        self._approx_size: Optional[int] = None
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+    def _path(self, accession_number: str, primary_document: str) -> str:
+        key = f"{accession_number.replace('-', '')}/{primary_document}"
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.archive_dir, digest[:2], digest[2:4], digest + self.SUFFIX)
+
+    def get(self, accession_number: str, primary_document: str) -> Optional[bytes]:
+        path = self._path(accession_number, primary_document)
+        try:
+            with open(path, "rb") as archived_file:
+                compressed = archived_file.read()
+        except FileNotFoundError:
+            return None
+        try:
+            # Bump the modification time so eviction keeps recently used documents
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return zstandard.ZstdDecompressor().decompress(compressed)
+
+    def put(self, accession_number: str, primary_document: str, content: bytes):
+        path = self._path(accession_number, primary_document)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = zstandard.ZstdCompressor(level=self.compression_level).compress(content)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(compressed)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._track_size(len(compressed))
+
+    def get_or_fetch(
+        self, accession_number: str, primary_document: str, fetch: Callable[[], bytes]
+    ) -> bytes:
+        content = self.get(accession_number, primary_document)
+        if content is not None:
+            logging.debug("Archive hit for %s/%s", accession_number, primary_document)
+            return content
+        content = fetch()
+        self.put(accession_number, primary_document, content)
+        return content
+
+    def _archived_files(self):
+        for dir_path, _, file_names in os.walk(self.archive_dir):
+            for file_name in file_names:
+                if file_name.endswith(self.SUFFIX):
+                    path = os.path.join(dir_path, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def size_bytes(self) -> int:
+        return sum(size for _, size, _ in self._archived_files())
+
+    def _track_size(self, added_bytes: int):
+        if not self.max_bytes:
+            return
+        with self._size_lock:
+            if self._approx_size is None:
+                self._approx_size = self.size_bytes()
+            else:
+                self._approx_size += added_bytes
+            over_limit = self._approx_size > self.max_bytes
+        if over_limit:
+            # Evict below the limit so that the next few writes do not evict again
+            self.evict(int(self.max_bytes * 0.9))
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Removes least recently used documents until the archive fits in `max_bytes`."""
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        files = sorted(self._archived_files(), key=lambda archived: archived[2])
+        total_size = sum(size for _, size, _ in files)
+        evicted = 0
+        for path, size, _ in files:
+            if total_size <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass  # Evicted by another process
+            total_size -= size
+        with self._size_lock:
+            self._approx_size = total_size
+        if evicted:
+            logging.info(f"Evicted {evicted} documents from the filing archive.")
+        return evicted
+
+
+filing_archive = FilingArchive(
+    storage_settings.filing_archive_dir,
+    max_bytes=storage_settings.filing_archive_max_bytes,
+)
@@ -1,10 +1,10 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Callable, Optional
 from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
 from modeling.parsers.SECFilingParser import *
 import logging
-from sec_downloader import Downloader
-from config import sec_edgar_settings as ses
+from modeling.filing.FilingArchive import FilingArchive, filing_archive
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
 
 class SEC_Filing(BaseModel):
     filing_metadata: SEC_Filing_Metadata = Field(description="Metadata of the given filing")
@@ -12,9 +12,58 @@ class SEC_Filing(BaseModel):
     is_parsed: bool = Field(default=False, description="Whether the content has been parsed")
     has_raw_content: bool = Field(default=False, description="Whether the content has been retrieved")
     items: Optional[List[Item]] = Field(default=[], description="Items extracted from the filing")
+    is_content_external: bool = Field(default=False, description="Whether the content is kept in the filing content store")
+    new_paragraphs: List[str] = Field(default=[], description="Paragraphs of the items that no earlier filing of the entity contained")
+    _content_loader: Optional[Callable[[], Optional[str]]] = PrivateAttr(default=None)
+
+    def set_content_loader(self, content_loader: Callable[[], Optional[str]]):
+        self._content_loader = content_loader
+
+    def get_content_html(self) -> Optional[str]:
+        """Returns the content of the filing, loading it from the content store on first access."""
+        if self.content_html_str is None and self._content_loader is not None:
+            self.content_html_str = self._content_loader()
+        return self.content_html_str
+
+    @staticmethod
+    def download_content(
+        filing_metadata: SEC_Filing_Metadata,
+        client: Optional[SEC_Client] = None,
+        archive: Optional[FilingArchive] = filing_archive,
+    ) -> str:
+        """Returns the primary document of a filing, from the local archive if possible."""
+        client = client or sec_client
+
+        def fetch() -> bytes:
+            response = client.get(filing_metadata.document_url)
+            response.raise_for_status()
+            return response.content
+
+        if archive is None:
+            content = fetch()
+        else:
+            content = archive.get_or_fetch(
+                filing_metadata.accession_number, filing_metadata.primary_document, fetch
+            )
+        return SEC_Filing.decode_content(content)
+
+    @staticmethod
+    def decode_content(content: bytes) -> str:
+        # Older EDGAR documents are often windows-1252 rather than UTF-8
+        try:
+            return content.decode("utf-8")
+        except UnicodeDecodeError:
+            return content.decode("cp1252", errors="replace")
 
     @classmethod
-    def from_metadata(cls, filing_metadata: SEC_Filing_Metadata, include_content: bool = False):
+    def from_metadata(
+        cls,
+        filing_metadata: SEC_Filing_Metadata,
+        include_content: bool = False,
+        client: Optional[SEC_Client] = None,
+        archive: Optional[FilingArchive] = filing_archive,
+        parse: bool = True,
+    ):
         content_html_str = None    
         items = []
         is_parsed = False
@@ -22,15 +71,19 @@ class SEC_Filing(BaseModel):
         if include_content:
             try:
                 # Retrieve raw html content
-                dl = Downloader(ses.user_agent_header, ses.sec_user_agent_email)
                 filing_url = filing_metadata.document_url
-                content_html_str = dl.download_filing(url=filing_url).__str__()
+                content_html_str = SEC_Filing.download_content(
+                    filing_metadata, client=client, archive=archive
+                )
                 has_raw_content = True
                 logging.info(f"Successfully retrieved content for URL: {filing_url}")
                 # Parse raw html content into list of items
-                items = SEC_Filing_Parser.parse_filing_via_lib(content_html_str)
-                is_parsed = True
-                logging.info(f"Successfully parsed content for URL: {filing_url}")
+                if parse:
+                    items = SEC_Filing_Parser.parse_filing_content(
+                        content_html_str, filing_metadata.form, filing_metadata.items
+                    )
+                    is_parsed = True
+                    logging.info(f"Successfully parsed content for URL: {filing_url}")
             except Exception as e:
                 logging.info(f"Error retrieving content from {filing_url}: {e}")
         
@@ -0,0 +1,138 @@
+import io
+import re
+from typing import ClassVar, Dict, List, Optional
+from lxml import etree
+from pydantic import BaseModel
+from modeling.parsers.SECFilingParser import Item, ItemCode, ItemExtractor
+
+
+class _ItemSection:
+    def __init__(self, code: ItemCode):
+        self.code = code
+        self.subtitles: List[str] = []
+        self.text_elements: List[str] = []
+        self.expects_title = False
+
+
+class EightK_Segmenter(BaseModel):
+    """
+    Fast path for 8-K filings: splits the HTML into Item sections in a single
+    streaming lxml pass, without building a semantic tree.
+
+    Block elements are handled when they close and are cleared right away, so
+    memory stays flat. A block starting with "Item x.xx" opens a section; the
+    paragraphs that follow, up to the next item or the signature block, make up
+    its text. Blocks inside tables only count as item headers.
+    """
+
+    BLOCK_TAGS: ClassVar[frozenset] = frozenset(
+        {"p", "div", "td", "th", "li", "h1", "h2", "h3", "h4", "h5", "h6"}
+    )
+    EMPHASIS_TAGS: ClassVar[frozenset] = frozenset({"b", "strong", "i", "em", "u"})
+    ITEM_HEADER_PATTERN: ClassVar[re.Pattern] = re.compile(
+        r"^Item\s*(\d+\.\d+)\.?\s*(.*)$", re.IGNORECASE | re.DOTALL
+    )
+    EMPHASIS_STYLE_PATTERN: ClassVar[re.Pattern] = re.compile(
+        r"font-weight:\s*(bold|[6-9]00)|font-style:\s*italic|text-decoration:\s*underline",
+        re.IGNORECASE,
+    )
+    END_PATTERN: ClassVar[re.Pattern] = re.compile(r"^SIGNATURES?$", re.IGNORECASE)
+    MAX_HEADER_LENGTH: ClassVar[int] = 250
+    MAX_SUBTITLE_LENGTH: ClassVar[int] = 120
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    @staticmethod
+    def _is_emphasized(element, text: str) -> bool:
+        """Whether all text of a block is bold, italic or underlined."""
+        if EightK_Segmenter.EMPHASIS_STYLE_PATTERN.search(element.get("style", "")):
+            return True
+        emphasized = "".join(
+            "".join(child.itertext())
+            for child in element.iter()
+            if child is not element
+            and (
+                child.tag in EightK_Segmenter.EMPHASIS_TAGS
+                or EightK_Segmenter.EMPHASIS_STYLE_PATTERN.search(child.get("style", ""))
+            )
+        )
+        return EightK_Segmenter._normalize(emphasized) == text
+
+    @staticmethod
+    def segment(html: str, item_hints: Optional[List[str]] = None) -> Optional[List[Item]]:
+        """
+        Returns the items of an 8-K, or None when the fast path cannot find them:
+        either not every hinted item code (e.g. ["8.01", "9.01"], as listed in
+        the submissions metadata) has a header, or no item was found at all.
+        """
+        sections: Dict[ItemCode, _ItemSection] = {}
+        current: Optional[_ItemSection] = None
+        table_depth = 0
+
+        events = etree.iterparse(
+            io.BytesIO(html.encode("utf-8")),
+            events=("start", "end"),
+            html=True,
+            recover=True,
+            encoding="utf-8",
+        )
+        for event, element in events:
+            if not isinstance(element.tag, str):
+                continue  # Comments and processing instructions
+            tag = element.tag.lower()
+            if tag == "table":
+                table_depth += 1 if event == "start" else -1
+                continue
+            if event == "start" or tag not in EightK_Segmenter.BLOCK_TAGS:
+                continue
+
+            text = EightK_Segmenter._normalize("".join(element.itertext()))
+            emphasized = bool(text) and EightK_Segmenter._is_emphasized(element, text)
+            # Nested blocks have been handled already, keep only the text after them
+            element.clear(keep_tail=True)
+            if not text:
+                continue
+
+            header = EightK_Segmenter.ITEM_HEADER_PATTERN.match(text)
+            if header and len(text) <= EightK_Segmenter.MAX_HEADER_LENGTH:
+                item_code = ItemExtractor.ITEM_CODES_BY_NUMBER.get(header.group(1))
+                if item_code is not None:
+                    current = sections.get(item_code)
+                    if current is None:
+                        current = sections[item_code] = _ItemSection(item_code)
+                    # "Item 8.01." followed by a separate "Other Events." block
+                    current.expects_title = not header.group(2)
+                    continue
+
+            if current is None:
+                continue
+            if EightK_Segmenter.END_PATTERN.match(text):
+                current = None
+                continue
+            if current.expects_title:
+                current.expects_title = False
+                if emphasized and len(text) <= EightK_Segmenter.MAX_SUBTITLE_LENGTH:
+                    continue
+            if table_depth:
+                continue
+            if emphasized and len(text) <= EightK_Segmenter.MAX_SUBTITLE_LENGTH:
+                current.subtitles.append(text)
+            else:
+                current.text_elements.append(text)
+
+        if not sections:
+            return None
+        if item_hints:
+            found_codes = {
+                number for number, item_code in ItemExtractor.ITEM_CODES_BY_NUMBER.items()
+                if item_code in sections
+            }
+            if not {hint.strip() for hint in item_hints} <= found_codes:
+                return None
+
+        return [
+            Item(code=section.code, subtitles=section.subtitles, summary=section.text_elements)
+            for section in sections.values()
+        ]
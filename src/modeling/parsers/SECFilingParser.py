@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import List, Optional
+from typing import ClassVar, Dict, List, Optional
 import warnings
 from pydantic import BaseModel
 import sec_parser as sp
@@ -12,7 +12,6 @@ from sec_parser.processing_steps import (
 )
 from sec_parser.semantic_elements import *
 import re
-from transformers import pipeline
 
 
 class ItemCode(Enum):
@@ -76,88 +75,75 @@ class Item(BaseModel):
 
 class ItemExtractor(BaseModel):
 
+    ITEM_CODE_PATTERN: ClassVar[re.Pattern] = re.compile(r"Item\s*(\d+\.\d+)", re.IGNORECASE)
+    # "1.01" -> ItemCode.ITEM_1_01
+    ITEM_CODES_BY_NUMBER: ClassVar[Dict[str, ItemCode]] = {
+        item_code.name[len("ITEM_"):].replace("_", "."): item_code
+        for item_code in ItemCode
+    }
+    ITEM_TITLE_ELEMENTS: ClassVar[tuple] = (TopSectionTitle, TitleElement, IrrelevantElement)
+
     @staticmethod
     def extract_items(tree: SemanticTree) -> List[Item]:
-        items = []
-        for node in tree.nodes:
-            ItemExtractor._extract_items_recursive(node, items)
-
-        if len(items) == 0:
-            for node in tree.nodes:
-                ItemExtractor._extract_items_recursive(
-                    node, items, extensive_search=True
+        """
+        Extracts the items of a filing in a single, iterative pre-order pass.
+
+        Every title node mentioning an item opens an item, unless an item with
+        the same code was opened before; the text elements below it are
+        collected while the traversal passes through its subtree.
+        """
+        log_nodes = logging.getLogger().isEnabledFor(logging.DEBUG)
+        item_codes = set()
+        # (code, text elements, subtitles) per item, in document order
+        extracted_items = []
+        # Nodes still to visit, with the text lists of the items they belong to
+        # Iterating the tree yields its root nodes, `tree.nodes` their descendants too
+        stack = [(node, ()) for node in reversed(list(tree))]
+
+        while stack:
+            node, item_texts = stack.pop()
+            semantic_element = node.semantic_element
+            if log_nodes:
+                logging.debug(
+                    "Processing %s [%s] : %s",
+                    semantic_element.__class__.__name__,
+                    semantic_element.html_tag.name,
+                    semantic_element.text,
                 )
-        return items
-
-    @staticmethod
-    def _extract_items_recursive(
-        node: TreeNode, items: List[Item], extensive_search: bool = False
-    ):
-
-        def extract_item_code(text: str) -> Optional[ItemCode]:
-            match = re.search(r"Item\s*(\d+\.\d+)", text, re.IGNORECASE)
-            if match:
-                item_code_str = match.group(1).replace(".", "_")
-                item_code_enum = f"ITEM_{item_code_str}"
-                if item_code_enum in ItemCode.__members__:
-                    return ItemCode[item_code_enum]
-            return None
-
-        semantic_element = node.semantic_element
-        class_name = semantic_element.__class__.__name__
-        logging.info(
-            f"Processing {class_name} [{semantic_element.html_tag.name}] : {semantic_element.text}"
-        )
-        # Check for Item codes in Titles
-        if isinstance(
-            semantic_element, (TopSectionTitle, TitleElement, IrrelevantElement)
-        ):
-            if "item" in semantic_element.text.lower():
-                item_code = extract_item_code(semantic_element.text)
-                if item_code not in [item.code for item in items]:
-                    item_text = ItemExtractor._extract_item_text(node)
-                    # Item subtitles
-                    item_subtitles = [
-                        child.semantic_element.text
-                        for child in node.children
-                        if isinstance(child.semantic_element, TitleElement)
-                    ]
-                    items.append(
-                        Item(
-                            code=item_code, summary=item_text, subtitles=item_subtitles
-                        )
-                    )
-
-        # # Check for Item codes in Text Elements
-        # if True:
-        #     if isinstance(semantic_element, (TextElement)):
-        #         item_code = extract_item_code(semantic_element.text)
-        #         # if item_code and not any(item.code == item_code for item in items):
-        #             # Check whether the item code is already in the list
-        #         items.append(Item(code=item_code, summary=[semantic_element.text[:2000]], subtitles=[]))
-
-        if node.has_child:
-            for child in node.children:
-                ItemExtractor._extract_items_recursive(child, items)
 
-    @staticmethod
-    def _extract_item_text(node: TreeNode) -> List[str]:
-        text_elements: List[str] = []
-        for child in node.children:
-            ItemExtractor._extract_item_text_rec(child, text_elements)
-
-        return text_elements
+            if isinstance(semantic_element, TextElement):
+                for text_elements in item_texts:
+                    text_elements.append(semantic_element.text)
+
+            # Check for Item codes in Titles
+            if isinstance(semantic_element, ItemExtractor.ITEM_TITLE_ELEMENTS):
+                if "item" in semantic_element.text.lower():
+                    item_code = ItemExtractor._extract_item_code(semantic_element.text)
+                    if item_code not in item_codes:
+                        text_elements: List[str] = []
+                        item_subtitles = [
+                            child.semantic_element.text
+                            for child in node.children
+                            if isinstance(child.semantic_element, TitleElement)
+                        ]
+                        extracted_items.append((item_code, text_elements, item_subtitles))
+                        item_codes.add(item_code)
+                        item_texts = item_texts + (text_elements,)
+
+            if node.has_child:
+                stack.extend((child, item_texts) for child in reversed(node.children))
+
+        return [
+            Item(code=item_code, summary=text_elements, subtitles=item_subtitles)
+            for item_code, text_elements, item_subtitles in extracted_items
+        ]
 
     @staticmethod
-    def _extract_item_text_rec(node: TreeNode, text_elements: List[str]):
-        semantic_element = node.semantic_element
-
-        if isinstance(semantic_element, (TextElement)):
-            text_elements.append(semantic_element.text)
-
-        if node.has_child:
-            for child in node.children:
-                ItemExtractor._extract_item_text_rec(child, text_elements)
+    def _extract_item_code(text: str) -> Optional[ItemCode]:
+        match = ItemExtractor.ITEM_CODE_PATTERN.search(text)
+        if match:
+            return ItemExtractor.ITEM_CODES_BY_NUMBER.get(match.group(1))
+        return None
 
 
 class SEC_Filing_Parser(BaseModel):
@@ -181,66 +167,91 @@ class SEC_Filing_Parser(BaseModel):
         return items
 
     @staticmethod
-    def get_summary(html: str) -> str:
-        def split_text(text, max_length=512):
-            """
-            Splits text into chunks with a maximum token length to avoid exceeding model limits.
-            """
-            sentences = text.split(". ")
-            chunks = []
-            current_chunk = []
-            current_length = 0
-
-            for sentence in sentences:
-                sentence_length = len(sentence.split())
-                if current_length + sentence_length <= max_length:
-                    current_chunk.append(sentence)
-                    current_length += sentence_length
-                else:
-                    chunks.append(". ".join(current_chunk))
-                    current_chunk = [sentence]
-                    current_length = sentence_length
-
-            if current_chunk:
-                chunks.append(". ".join(current_chunk))
-
-            return chunks
-
-        summary = ""
-        items = SEC_Filing_Parser.parse_filing_via_lib(html)
-        if items:
-            # Step 1: Extract and clean summaries
-            summaries = []
-            for item in items:
-                for summary_text in item.summary:
-                    cleaned_summary = (
-                        summary_text.strip()
-                    )  # Remove leading/trailing spaces or newlines
-                    if (
-                        cleaned_summary and cleaned_summary not in summaries
-                    ):  # Avoid duplicates
-                        summaries.append(cleaned_summary)
+    def parse_8k(html: str, item_hints: Optional[List[str]] = None) -> Optional[List[Item]]:
+        """
+        Parses an 8-K with the streaming segmenter and falls back to the
+        sec_parser pipeline when the segmenter cannot find the (hinted) items.
+        """
+        from modeling.parsers.EightKSegmenter import EightK_Segmenter
+
+        items = EightK_Segmenter.segment(html, item_hints)
+        if items is None:
+            logging.info(f"8-K fast path found no items for hints {item_hints}, using sec_parser.")
+            items = SEC_Filing_Parser.parse_filing_content(html, forms[i] if forms else "8-K")
+        return items
 
-            # Join summaries into a single text blob
-            full_text = "\n\n".join(summaries)
+    @staticmethod
+    def parse_filing_content(
+        html: str, form: Optional[str] = None, item_hints: Optional[List[str]] = None
+    ) -> Optional[List[Item]]:
+        if form in ("8-K", "8-K/A"):
+            return SEC_Filing_Parser.parse_8k(html, item_hints)
+        return SEC_Filing_Parser.parse_filing_via_lib(html)
 
-            # Step 2: Split the text into manageable chunks
-            chunks = split_text(full_text, max_length=512)
+    @staticmethod
+    def get_summary_paragraphs(items: List[Item]) -> List[str]:
+        # Extract and clean summaries
+        summaries = []
+        for item in items:
+            for summary_text in item.summary:
+                cleaned_summary = (
+                    summary_text.strip()
+                )  # Remove leading/trailing spaces or newlines
+                if (
+                    cleaned_summary and cleaned_summary not in summaries
+                ):  # Avoid duplicates
+                    summaries.append(cleaned_summary)
+        return summaries
 
-            # Step 3: Initialize the summarization model
-            summarizer = pipeline("summarization", model="t5-small", device=-1)
+    @staticmethod
+    def get_summary(
+        html: str,
+        summarizer=None,
+        cik: Optional[str] = None,
+        accession_number: Optional[str] = None,
+        form: str = "8-K",
+    ) -> str:
+        accession_numbers = [accession_number] if accession_number else None
+        return SEC_Filing_Parser.get_summaries(
+            [html], summarizer=summarizer, cik=cik, accession_numbers=accession_numbers, forms=[form]
+        )[0]
 
-            # Step 4: Summarize each chunk
-            chunk_summaries = []
-            for chunk in chunks:
-                compressed_summary = summarizer(
-                    chunk, max_length=150, min_length=50, do_sample=False
+    @staticmethod
+    def get_summaries(
+        htmls: List[str],
+        summarizer=None,
+        cik: Optional[str] = None,
+        accession_numbers: Optional[List[str]] = None,
+        forms: Optional[List[str]] = None,
+    ) -> List[str]:
+        """
+        Summarizes many filings at once. `summarizer` is a SummarizationService
+        or SummarizationWorker and defaults to the shared in-process service;
+        chunks of all filings are batched into as few model passes as possible.
+        Filings are parsed like in the ingestion pipeline, as 8-Ks unless their
+        `forms` are given.
+
+        Given the entity's CIK and the filings' accession numbers, paragraphs the
+        entity already used in earlier filings (safe-harbor and other
+        boilerplate) are left out, so only new text reaches the model.
+        """
+        from modeling.parsers.Summarizer import summarization_service
+        from modeling.parsers.SummaryCache import summary_cache
+
+        summarizer = summarizer or summarization_service
+        texts = []
+        for i, html in enumerate(htmls):
+            items = SEC_Filing_Parser.parse_filing_content(html, forms[i] if forms else "8-K")
+            paragraphs = SEC_Filing_Parser.get_summary_paragraphs(items) if items else []
+            if cik and accession_numbers:
+                new_paragraphs = summary_cache.remove_seen_paragraphs(
+                    cik, accession_numbers[i], paragraphs
                 )
-                chunk_summaries.append(compressed_summary[0]["summary_text"])
                 logging.info(
-                    f"Compressed original chunk : {chunk} to \n \n [Compressed] {compressed_summary[0]['summary_text']}"
+                    f"Dropped {len(paragraphs) - len(new_paragraphs)} of {len(paragraphs)} paragraphs "
+                    f"already seen for CIK {cik} from filing {accession_numbers[i]}."
                 )
-            # Step 5: Combine all chunk summaries into the final summary
-            summary = " ".join(chunk_summaries)
-
-        return summary
+                paragraphs = new_paragraphs
+            # Join summaries into a single text blob
+            texts.append("\n\n".join(paragraphs))
+        return summarizer.summarize_texts(texts)
@@ -0,0 +1,175 @@
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Optional
+from config import summarizer_settings
+from modeling.parsers.SummaryCache import SummaryCache, summary_cache
+
+
+def split_text(text: str, max_length: int = 512) -> List[str]:
+    """
+    Splits text into chunks with a maximum token length to avoid exceeding model limits.
+    """
+    sentences = text.split(". ")
+    chunks = []
+    current_chunk = []
+    current_length = 0
+
+    for sentence in sentences:
+        sentence_length = len(sentence.split())
+        if current_length + sentence_length <= max_length:
+            current_chunk.append(sentence)
+            current_length += sentence_length
+        else:
+            chunks.append(". ".join(current_chunk))
+            current_chunk = [sentence]
+            current_length = sentence_length
+
+    if current_chunk:
+        chunks.append(". ".join(current_chunk))
+
+    return chunks
+
+
+class SummarizationService:
+    """
+    Long-lived summarizer: the model is loaded once, on first use, and chunks of
+    many documents are summarized together in batched forward passes. Chunks
+    summarized before are served from the summary cache.
+    """
+
+    def __init__(
+        self,
+        model: str = summarizer_settings.model,
+        batch_size: int = summarizer_settings.batch_size,
+        num_threads: Optional[int] = summarizer_settings.num_threads,
+        max_chunk_words: int = summarizer_settings.max_chunk_words,
+        cache: Optional[SummaryCache] = summary_cache,
+    ):
+        self.model = model
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.max_chunk_words = max_chunk_words
+        self.cache = cache
+        self._pipeline = None
+        self._lock = threading.Lock()
+
+    def _get_pipeline(self):
+        with self._lock:
+            if self._pipeline is None:
+                from transformers import pipeline
+
+                if self.num_threads:
+                    import torch
+
+                    torch.set_num_threads(self.num_threads)
+                logging.info(f"Loading summarization model {self.model}.")
+                self._pipeline = pipeline("summarization", model=self.model, device=-1)
+            return self._pipeline
+
+    def summarize_chunks(self, chunks: List[str]) -> List[str]:
+        if self.cache is None:
+            return self._run_model(chunks)
+        chunk_hashes = [SummaryCache.text_hash(chunk) for chunk in chunks]
+        cached_summaries = self.cache.get_summaries(self.model, list(set(chunk_hashes)))
+        # Summarize each uncached text once, even if several chunks share it
+        uncached = {
+            chunk_hash: chunk
+            for chunk_hash, chunk in zip(chunk_hashes, chunks)
+            if chunk_hash not in cached_summaries
+        }
+        new_summaries = dict(zip(uncached, self._run_model(list(uncached.values()))))
+        if new_summaries:
+            self.cache.put_summaries(self.model, new_summaries)
+        logging.info(f"Summarized {len(new_summaries)} chunks, {len(chunks) - len(uncached)} came from the cache.")
+        return [
+            cached_summaries[chunk_hash] if chunk_hash in cached_summaries else new_summaries[chunk_hash]
+            for chunk_hash in chunk_hashes
+        ]
+
+    def _run_model(self, chunks: List[str]) -> List[str]:
+        if not chunks:
+            return []
+        summarizer = self._get_pipeline()
+        compressed_summaries = summarizer(
+            chunks,
+            batch_size=self.batch_size,
+            max_length=150,
+            min_length=50,
+            do_sample=False,
+            truncation=True,
+        )
+        chunk_summaries = [summary["summary_text"] for summary in compressed_summaries]
+        for chunk, chunk_summary in zip(chunks, chunk_summaries):
+            logging.debug("Compressed original chunk : %s to \n \n [Compressed] %s", chunk, chunk_summary)
+        return chunk_summaries
+
+    def summarize_texts(self, texts: List[str]) -> List[str]:
+        """
+        Summarizes every text by summarizing its chunks and joining the chunk
+        summaries. The chunks of all texts go through the model together.
+        """
+        chunks_per_text = [
+            split_text(text, max_length=self.max_chunk_words) if text else [] for text in texts
+        ]
+        chunk_summaries = self.summarize_chunks(
+            [chunk for chunks in chunks_per_text for chunk in chunks]
+        )
+        summaries = []
+        offset = 0
+        for chunks in chunks_per_text:
+            summaries.append(" ".join(chunk_summaries[offset : offset + len(chunks)]))
+            offset += len(chunks)
+        return summaries
+
+
+_worker_service: Optional[SummarizationService] = None
+
+
+def _init_worker(model: str, batch_size: int, num_threads: Optional[int], max_chunk_words: int):
+    global _worker_service
+    _worker_service = SummarizationService(model, batch_size, num_threads, max_chunk_words)
+    # Load the model up front, so the first request does not pay for it
+    _worker_service._get_pipeline()
+
+
+def _summarize_in_worker(texts: List[str]) -> List[str]:
+    return _worker_service.summarize_texts(texts)
+
+
+class SummarizationWorker:
+    """
+    Runs a SummarizationService in a separate local process, keeping the model
+    and its threads out of the calling process.
+    """
+
+    def __init__(
+        self,
+        model: str = summarizer_settings.model,
+        batch_size: int = summarizer_settings.batch_size,
+        num_threads: Optional[int] = summarizer_settings.num_threads,
+        max_chunk_words: int = summarizer_settings.max_chunk_words,
+    ):
+        self._executor = ProcessPoolExecutor(
+            max_workers=1,
+            initializer=_init_worker,
+            initargs=(model, batch_size, num_threads, max_chunk_words),
+        )
+
+    def submit(self, texts: List[str]) -> Future:
+        return self._executor.submit(_summarize_in_worker, texts)
+
+    def summarize_texts(self, texts: List[str]) -> List[str]:
+        return self.submit(texts).result()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+summarization_service = SummarizationService()
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import Dict, Iterator, List
+from config import storage_settings
+
+
+class SummaryCache:
+    """
+    SQLite store of chunk summaries and of the paragraphs each entity has used
+    before, keyed by a hash of the normalized text.
+
+    Chunk summaries are reused whenever the same text is summarized again with
+    the same model. Seen paragraphs let the summarizer drop boilerplate, such as
+    forward-looking statements, that an entity repeats in every filing.
+    """
+
+    # Hashes per IN (...) query, below SQLite's limit of 999 variables in older builds
+    QUERY_BATCH_SIZE = 500
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._initialized = False
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split()).lower()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        return hashlib.sha256(SummaryCache.normalize(text).encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call: safe across threads and processes
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as connection:
+            if not self._initialized:
+                self._create_tables(connection)
+            with connection:
+                yield connection
+
+    def _create_tables(self, connection: sqlite3.Connection):
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_summaries ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, summary TEXT NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen_paragraphs ("
+            "cik TEXT NOT NULL, paragraph_hash TEXT NOT NULL, accession_number TEXT NOT NULL, "
+            "PRIMARY KEY (cik, paragraph_hash))"
+        )
+        connection.commit()
+        self._initialized = True
+
+    @staticmethod
+    def _batches(hashes: List[str]) -> Iterator[List[str]]:
+        for start in range(0, len(hashes), SummaryCache.QUERY_BATCH_SIZE):
+            yield hashes[start : start + SummaryCache.QUERY_BATCH_SIZE]
+
+    def get_summaries(self, model: str, text_hashes: List[str]) -> Dict[str, str]:
+        if not text_hashes:
+            return {}
+        summaries = {}
+        with self._connect() as connection:
+            for batch in SummaryCache._batches(text_hashes):
+                placeholders = ",".join("?" * len(batch))
+                summaries.update(
+                    connection.execute(
+                        f"SELECT text_hash, summary FROM chunk_summaries "
+                        f"WHERE model = ? AND text_hash IN ({placeholders})",
+                        [model, *batch],
+                    ).fetchall()
+                )
+        return summaries
+
+    def put_summaries(self, model: str, summaries: Dict[str, str]):
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO chunk_summaries (model, text_hash, summary) VALUES (?, ?, ?)",
+                [(model, text_hash, summary) for text_hash, summary in summaries.items()],
+            )
+
+    def remove_seen_paragraphs(
+        self, cik: str, accession_number: str, paragraphs: List[str]
+    ) -> List[str]:
+        """
+        Returns the paragraphs that no earlier filing of the entity contained, and
+        records them as seen in this filing. Summarizing the same filing again
+        keeps its own paragraphs.
+        """
+        paragraph_hashes = [SummaryCache.text_hash(paragraph) for paragraph in paragraphs]
+        if not paragraph_hashes:
+            return []
+        seen_in = {}
+        with self._connect() as connection:
+            for batch in SummaryCache._batches(paragraph_hashes):
+                placeholders = ",".join("?" * len(batch))
+                seen_in.update(
+                    connection.execute(
+                        f"SELECT paragraph_hash, accession_number FROM seen_paragraphs "
+                        f"WHERE cik = ? AND paragraph_hash IN ({placeholders})",
+                        [cik, *batch],
+                    ).fetchall()
+                )
+            connection.executemany(
+                "INSERT OR IGNORE INTO seen_paragraphs (cik, paragraph_hash, accession_number) "
+                "VALUES (?, ?, ?)",
+                [(cik, paragraph_hash, accession_number) for paragraph_hash in paragraph_hashes],
+            )
+        return [
+            paragraph
+            for paragraph, paragraph_hash in zip(paragraphs, paragraph_hashes)
+            if seen_in.get(paragraph_hash, accession_number) == accession_number
+        ]
+
+
+summary_cache = SummaryCache(storage_settings.summary_cache_path)
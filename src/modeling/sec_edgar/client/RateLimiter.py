@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+from pydantic import BaseModel, Field
+from config import sec_edgar_settings as ses
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+class RateLimiterStats(BaseModel):
+    acquisitions: int = Field(default=0, description="Number of tokens handed out by this process")
+    waited_acquisitions: int = Field(default=0, description="Number of acquisitions that had to wait")
+    total_wait_seconds: float = Field(default=0.0, description="Total time spent waiting for tokens")
+    max_wait_seconds: float = Field(default=0.0, description="Longest single wait for a token")
+    last_wait_seconds: float = Field(default=0.0, description="Wait of the most recent acquisition")
+    current_wait_seconds: float = Field(default=0.0, description="Wait a new request would incur right now")
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        return self.total_wait_seconds / self.acquisitions if self.acquisitions else 0.0
+
+
+class RateLimiter:
+    """
+    Token bucket shared by threads, asyncio tasks and processes on the same host.
+
+    The bucket state (tokens, timestamp) lives in a small file guarded by an
+    exclusive flock. Every caller reserves a token up front, allowing the bucket to
+    go negative, and then sleeps until its reservation is due. Requests are
+    therefore spaced at most `rate` per second across every process that shares
+    `state_path`.
+    """
+
+    _STATE = struct.Struct("dd")
+
+    def __init__(self, rate: float, burst: float = 1.0, state_path: Optional[str] = None):
+        self.rate = rate
+        self.burst = burst
+        self.state_path = state_path if fcntl is not None else None
+        self._thread_lock = threading.Lock()
+        self._local_state = (burst, time.time())
+        self._stats = RateLimiterStats()
+
+    @contextmanager
+    def _locked_state(self):
+        with self._thread_lock:
+            if self.state_path is None:
+                yield self._read_local, self._write_local
+                return
+            # Open per call: a file description inherited across fork() would
+            # not exclude the parent and child from each other.
+            fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                yield (lambda: self._read_file(fd)), (lambda state: self._write_file(fd, state))
+            finally:
+                os.close(fd)
+
+    def _read_local(self):
+        return self._local_state
+
+    def _write_local(self, state):
+        self._local_state = state
+
+    def _read_file(self, fd: int):
+        data = os.pread(fd, self._STATE.size, 0)
+        if len(data) < self._STATE.size:
+            return self.burst, time.time()
+        return self._STATE.unpack(data)
+
+    def _write_file(self, fd: int, state):
+        os.pwrite(fd, self._STATE.pack(*state), 0)
+
+    def _refill(self, tokens: float, updated_at: float, now: float) -> float:
+        return min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+
+    def _reserve(self) -> float:
+        """Takes one token and returns how long the caller has to wait before using it."""
+        with self._locked_state() as (read, write):
+            now = time.time()
+            tokens = self._refill(*read(), now) - 1.0
+            write((tokens, now))
+        return max(0.0, -tokens / self.rate)
+
+    def _record(self, wait: float):
+        with self._thread_lock:
+            self._stats.acquisitions += 1
+            self._stats.total_wait_seconds += wait
+            self._stats.max_wait_seconds = max(self._stats.max_wait_seconds, wait)
+            self._stats.last_wait_seconds = wait
+            if wait > 0:
+                self._stats.waited_acquisitions += 1
+
+    def acquire(self) -> float:
+        """Blocks until a request may be sent. Returns the time spent waiting."""
+        wait = self._reserve()
+        self._record(wait)
+        if wait > 0:
+            logging.debug("Rate limited SEC request, waiting %.3fs", wait)
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Asyncio variant of `acquire` that does not block the event loop."""
+        wait = await asyncio.to_thread(self._reserve)
+        self._record(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def current_wait(self) -> float:
+        """Returns how long a request made right now would wait, without taking a token."""
+        with self._locked_state() as (read, _):
+            tokens = self._refill(*read(), time.time())
+        return max(0.0, (1.0 - tokens) / self.rate)
+
+    def stats(self) -> RateLimiterStats:
+        current_wait = self.current_wait()
+        with self._thread_lock:
+            return self._stats.model_copy(update={"current_wait_seconds": current_wait})
+
+
+sec_rate_limiter = RateLimiter(
+    rate=ses.max_requests_per_second,
+    burst=ses.rate_limit_burst,
+    state_path=ses.rate_limit_state_path,
+)
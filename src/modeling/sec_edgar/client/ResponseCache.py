@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+from pydantic import BaseModel, Field
+from config import sec_edgar_settings as ses
+
+
+class CachedResponse(BaseModel):
+    url: str = Field(description="URL of the cached response")
+    etag: Optional[str] = Field(default=None, description="ETag validator sent by the server")
+    last_modified: Optional[str] = Field(
+        default=None, description="Last-Modified validator sent by the server"
+    )
+    stored_at: float = Field(description="Unix timestamp at which the response was stored")
+
+    def get_conditional_headers(self) -> dict:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk cache of response bodies and their validators, keyed by URL.
+
+    Every entry is a `<key>.json` metadata file next to a `<key>.body` file. Both
+    are written to a temporary file first and moved into place, so concurrent
+    processes never observe a partially written entry.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url: str, suffix: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def _write_atomic(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        try:
+            with open(self._path(url, ".json"), "rb") as meta_file:
+                return CachedResponse(**json.load(meta_file))
+        except FileNotFoundError:
+            return None
+        except (ValueError, OSError) as e:
+            logging.warning(f"Ignoring unreadable cache entry for {url}: {e}")
+            return None
+
+    def read_body(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._path(url, ".body"), "rb") as body_file:
+                return body_file.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, headers: dict, body: bytes) -> CachedResponse:
+        entry = CachedResponse(
+            url=url,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            stored_at=time.time(),
+        )
+        # Body first: a metadata file always points at a complete body
+        self._write_atomic(self._path(url, ".body"), body)
+        self._write_atomic(self._path(url, ".json"), entry.model_dump_json().encode("utf-8"))
+        return entry
+
+    def touch(self, url: str):
+        """Marks an entry as revalidated by the server."""
+        entry = self.get(url)
+        if entry is not None:
+            entry.stored_at = time.time()
+            self._write_atomic(self._path(url, ".json"), entry.model_dump_json().encode("utf-8"))
+
+    def invalidate(self, url: str):
+        for suffix in (".json", ".body"):
+            try:
+                os.remove(self._path(url, suffix))
+            except FileNotFoundError:
+                pass
+
+
+submissions_cache = ResponseCache(os.path.join(ses.http_cache_dir, "submissions"))
+# Older submissions pages never change once published
+submissions_history_cache = ResponseCache(os.path.join(ses.http_cache_dir, "submissions_history"))
+# The latest filings feed, revalidated on every poll of the filing watcher
+current_feed_cache = ResponseCache(os.path.join(ses.http_cache_dir, "current_feed"))
@@ -0,0 +1,137 @@
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel, Field
+from modeling.sec_edgar.client.RateLimiter import RateLimiter, sec_rate_limiter
+from modeling.sec_edgar.client.ResponseCache import ResponseCache
+from config import sec_edgar_settings as ses
+
+
+class HostStats(BaseModel):
+    requests: int = Field(default=0, description="Number of HTTP requests sent to the host")
+    retries: int = Field(default=0, description="Number of requests that were retried")
+    errors: int = Field(default=0, description="Number of connection errors and timeouts")
+    bytes_received: int = Field(default=0, description="Decoded response bytes received")
+    total_latency_seconds: float = Field(default=0.0, description="Summed request latency")
+    max_latency_seconds: float = Field(default=0.0, description="Slowest single request")
+
+    @property
+    def avg_latency_seconds(self) -> float:
+        return self.total_latency_seconds / self.requests if self.requests else 0.0
+
+
+class SEC_Client:
+    """
+    Shared HTTP client for sec.gov, data.sec.gov and efts.sec.gov.
+
+    Keeps a pool of keep-alive connections per host, asks for gzip responses,
+    sends every attempt through the SEC rate limiter and retries connection
+    errors, 429 and 5xx responses with jittered exponential backoff.
+    """
+
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        headers: Optional[dict] = None,
+        rate_limiter: RateLimiter = sec_rate_limiter,
+        max_retries: int = ses.http_max_retries,
+        pool_maxsize: int = ses.http_pool_maxsize,
+        timeout: float = ses.http_timeout,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+    ):
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers or ses.get_user_agent_header())
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self._stats: Dict[str, HostStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.backoff_max, float(retry_after))
+        # Full jitter: spreads out retries of concurrent callers
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _record(self, host: str, **deltas):
+        with self._stats_lock:
+            host_stats = self._stats.setdefault(host, HostStats())
+            latency = deltas.pop("latency", None)
+            if latency is not None:
+                host_stats.total_latency_seconds += latency
+                host_stats.max_latency_seconds = max(host_stats.max_latency_seconds, latency)
+            for name, delta in deltas.items():
+                setattr(host_stats, name, getattr(host_stats, name) + delta)
+
+    def get(
+        self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None
+    ) -> requests.Response:
+        host = urlparse(url).netloc
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.get(
+                    url, params=params, headers=headers, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, requests=1, errors=1, latency=time.perf_counter() - start)
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logging.warning(f"Request to {url} failed ({e}), retrying in {delay:.2f}s.")
+                self._record(host, retries=1)
+                time.sleep(delay)
+                continue
+
+            self._record(
+                host,
+                requests=1,
+                bytes_received=len(response.content),
+                latency=time.perf_counter() - start,
+            )
+            if response.status_code in self.RETRY_STATUS_CODES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                logging.warning(
+                    f"Request to {url} returned {response.status_code}, retrying in {delay:.2f}s."
+                )
+                self._record(host, retries=1)
+                time.sleep(delay)
+                continue
+            return response
+
+    def get_conditional(self, url: str, cache: ResponseCache) -> requests.Response:
+        """
+        GET that revalidates the cached copy of `url` with If-None-Match /
+        If-Modified-Since. A 200 response is stored in the cache; on a 304 the
+        caller can read the unchanged body from the cache if it needs it.
+        """
+        cached = cache.get(url)
+        headers = cached.get_conditional_headers() if cached is not None else None
+        response = self.get(url, headers=headers)
+        if response.status_code == 200:
+            cache.put(url, response.headers, response.content)
+        elif response.status_code == 304:
+            cache.touch(url)
+        return response
+
+    def stats(self) -> Dict[str, HostStats]:
+        with self._stats_lock:
+            return {host: host_stats.model_copy() for host, host_stats in self._stats.items()}
+
+
+sec_client = SEC_Client()
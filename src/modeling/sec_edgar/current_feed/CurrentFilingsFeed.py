@@ -0,0 +1,76 @@
+import re
+from typing import ClassVar, List, Optional
+from lxml import etree
+from pydantic import BaseModel, Field
+from modeling.sec_edgar.client.ResponseCache import ResponseCache
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+
+
+class CurrentFilingEntry(BaseModel):
+    cik: str = Field(description="CIK of the entity, padded to 10 digits")
+    company_name: str = Field(description="Name of the entity")
+    form: str = Field(description="Form type of the filing")
+    accession_number: str = Field(description="Accession number, with dashes")
+    updated: Optional[str] = Field(default=None, description="When the entry was published")
+
+
+class CurrentFilingsFeed(BaseModel):
+    """
+    EDGAR's "latest filings" Atom feed, which lists filings within moments of
+    their acceptance. A filing shows up once per entity involved, e.g. as
+    (Filer) and as (Subject).
+    """
+
+    ATOM_NAMESPACE: ClassVar[dict] = {"atom": "http://www.w3.org/2005/Atom"}
+    TITLE_PATTERN: ClassVar[re.Pattern] = re.compile(
+        r"^(?P<form>.+?) - (?P<company_name>.+) \((?P<cik>\d+)\) \([^)]*\)$"
+    )
+    ACCESSION_PATTERN: ClassVar[re.Pattern] = re.compile(r"(\d{10}-\d{2}-\d{6})")
+
+    entries: List[CurrentFilingEntry] = Field(default=[], description="Entries of the feed")
+
+    @staticmethod
+    def parse_entries(content: bytes) -> List[CurrentFilingEntry]:
+        root = etree.fromstring(content, parser=etree.XMLParser(recover=True))
+        ns = CurrentFilingsFeed.ATOM_NAMESPACE
+        entries = []
+        for entry in root.iterfind("atom:entry", ns):
+            title = CurrentFilingsFeed.TITLE_PATTERN.match(
+                (entry.findtext("atom:title", "", ns) or "").strip()
+            )
+            accession = CurrentFilingsFeed.ACCESSION_PATTERN.search(
+                entry.findtext("atom:id", "", ns) or ""
+            )
+            if title is None or accession is None:
+                continue
+            entries.append(
+                CurrentFilingEntry(
+                    cik=title.group("cik").zfill(10),
+                    company_name=title.group("company_name").strip(),
+                    form=title.group("form").strip(),
+                    accession_number=accession.group(1),
+                    updated=entry.findtext("atom:updated", None, ns),
+                )
+            )
+        return entries
+
+    @classmethod
+    def fetch(
+        cls,
+        feed_url: str,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[ResponseCache] = None,
+    ) -> Optional["CurrentFilingsFeed"]:
+        """
+        Fetches the feed, conditionally when a cache is given. Returns None when
+        the feed is unchanged since the last fetch.
+        """
+        client = client or sec_client
+        if cache is None:
+            response = client.get(feed_url)
+        else:
+            response = client.get_conditional(feed_url, cache)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        return cls(entries=CurrentFilingsFeed.parse_entries(response.content))
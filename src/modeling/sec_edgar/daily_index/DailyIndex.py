@@ -0,0 +1,77 @@
+import logging
+from datetime import date
+from typing import ClassVar, Iterator, List, Optional
+from pydantic import BaseModel, Field
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+
+
+class DailyIndexEntry(BaseModel):
+    cik: str = Field(description="CIK of the filer, padded to 10 digits")
+    company_name: str = Field(description="Name of the filer")
+    form: str = Field(description="Form type of the filing")
+    date_filed: str = Field(description="Filing date, YYYY-MM-DD")
+    filename: str = Field(description="Path of the full submission text file in the EDGAR archive")
+
+    @property
+    def accession_number(self) -> str:
+        # edgar/data/1050446/0001193125-24-001234.txt
+        return self.filename.rsplit("/", 1)[-1].removesuffix(".txt")
+
+
+class DailyIndex(BaseModel):
+    """
+    EDGAR's master index of a single business day, listing every filing
+    accepted that day. SEC publishes it in the evening; weekends and holidays
+    have no index.
+    """
+
+    BASE_URL: ClassVar[str] = "https://www.sec.gov/Archives/edgar/daily-index"
+
+    day: date = Field(description="Day the index covers")
+    entries: List[DailyIndexEntry] = Field(default=[], description="Filings of the day")
+
+    @staticmethod
+    def get_url(day: date) -> str:
+        quarter = (day.month - 1) // 3 + 1
+        return f"{DailyIndex.BASE_URL}/{day.year}/QTR{quarter}/master.{day.strftime('%Y%m%d')}.idx"
+
+    @staticmethod
+    def parse_entries(text: str) -> Iterator[DailyIndexEntry]:
+        """Parses the `CIK|Company Name|Form Type|Date Filed|Filename` rows of a master index."""
+        in_rows = False
+        for line in text.splitlines():
+            if not in_rows:
+                # The rows start after the dashed line below the header
+                in_rows = line.startswith("-----")
+                continue
+            fields = line.split("|")
+            if len(fields) != 5:
+                continue
+            cik, company_name, form, date_filed, filename = fields
+            if len(date_filed) == 8 and date_filed.isdigit():
+                # Older indices use YYYYMMDD dates
+                date_filed = f"{date_filed[:4]}-{date_filed[4:6]}-{date_filed[6:]}"
+            yield DailyIndexEntry(
+                cik=cik.strip().zfill(10),
+                company_name=company_name.strip(),
+                form=form.strip(),
+                date_filed=date_filed.strip(),
+                filename=filename.strip(),
+            )
+
+    @classmethod
+    def fetch(cls, day: date, client: Optional[SEC_Client] = None) -> Optional["DailyIndex"]:
+        """
+        Returns the index of a day, or None if SEC has not published one for it.
+        Raises on any other error, 403 included: SEC answers throttled or
+        blocked clients with a 403, and skipping that day would lose its filings.
+        """
+        client = client or sec_client
+        url = DailyIndex.get_url(day)
+        response = client.get(url)
+        if response.status_code == 404:
+            logging.info(f"No daily index published for {day}.")
+            return None
+        response.raise_for_status()
+        text = response.content.decode("latin-1")
+        return cls(day=day, entries=list(DailyIndex.parse_entries(text)))
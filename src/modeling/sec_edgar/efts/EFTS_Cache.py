@@ -0,0 +1,66 @@
+import json
+import os
+import time
+from datetime import date
+from typing import Optional
+from urllib.parse import urlencode
+from config import sec_edgar_settings as ses
+from modeling.sec_edgar.client.ResponseCache import ResponseCache
+
+
+class EFTS_Cache:
+    """
+    Cache of raw EFTS responses, keyed by the normalized query parameters.
+
+    EFTS does not revalidate, so entries expire after `ttl_seconds` instead. The
+    results of a date window no longer change once the window has ended: entries
+    stored after that are kept for good, and only windows ending today are
+    queried again.
+    """
+
+    def __init__(self, cache: ResponseCache, ttl_seconds: float = ses.efts_cache_ttl_seconds):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def normalize_query(query: dict) -> dict:
+        normalized = {}
+        for key, value in query.items():
+            if value is None:
+                continue
+            if isinstance(value, date):
+                value = value.isoformat()
+            elif isinstance(value, str):
+                value = " ".join(value.split())
+            normalized[key] = value
+        return dict(sorted(normalized.items()))
+
+    @staticmethod
+    def _key(query: dict) -> str:
+        return "efts:" + urlencode(EFTS_Cache.normalize_query(query), doseq=True)
+
+    @staticmethod
+    def _end_date(query: dict) -> Optional[date]:
+        end_date = query.get("enddt")
+        if end_date is None or isinstance(end_date, date):
+            return end_date
+        return date.fromisoformat(str(end_date))
+
+    def get(self, query: dict) -> Optional[dict]:
+        key = EFTS_Cache._key(query)
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        end_date = EFTS_Cache._end_date(query)
+        # Results stored after their window ended are final
+        is_permanent = end_date is not None and date.fromtimestamp(entry.stored_at) > end_date
+        if not is_permanent and time.time() - entry.stored_at > self.ttl_seconds:
+            return None
+        body = self.cache.read_body(key)
+        return json.loads(body) if body is not None else None
+
+    def put(self, query: dict, response_json: dict):
+        self.cache.put(EFTS_Cache._key(query), {}, json.dumps(response_json).encode("utf-8"))
+
+
+efts_cache = EFTS_Cache(ResponseCache(os.path.join(ses.http_cache_dir, "efts")))
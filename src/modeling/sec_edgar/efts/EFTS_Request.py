@@ -2,7 +2,8 @@ from typing import List, Optional
 from pydantic import BaseModel, Field, ValidationError
 from modeling.sec_edgar.efts.EFTS_Response import EFTS_Response
 from modeling.PublicEntity import PublicEntity
-import requests
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+from modeling.sec_edgar.efts.EFTS_Cache import EFTS_Cache
 import logging
 
 
@@ -16,29 +17,46 @@ class EFTS_Request(BaseModel):
         None, description="The response from the Edgar Full Text Search."
     )
 
-    def __init__(self, **data):
+    def __init__(
+        self,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[EFTS_Cache] = None,
+        **data,
+    ):
         super().__init__(**data)  # Let Pydantic handle validation and initialization
+        client = client or sec_client
 
         # Automatically fetch and set the efts_response during initialization
-        if self.query:
-            first_response = requests.get(
+        cached_response = cache.get(self.query) if cache is not None and self.query else None
+        if cached_response is not None:
+            self.efts_response = EFTS_Response(**cached_response)
+        elif self.query:
+            first_response = client.get(
                 self.base_url, params=self.query, headers=self.headers
             )
             if first_response.status_code == 200:
-                self.efts_response = EFTS_Response(**first_response.json())
+                response_json = first_response.json()
+                self.efts_response = EFTS_Response(**response_json)
+                if cache is not None:
+                    cache.put(self.query, response_json)
             else:
-                logging.error("Error:", first_response.status_code, first_response.text)
+                logging.error(f"Error: {first_response.status_code} {first_response.text}")
                 self.efts_response = None
         else:
             logging.error("No query provided. Cannot fetch EFTS response.")
             self.efts_response = None
 
     @classmethod
-    def from_query(cls, query: dict):
+    def from_query(
+        cls,
+        query: dict,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[EFTS_Cache] = None,
+    ):
         """
         Helper method for initialization using only a query.
         """
-        return cls(query=query)
+        return cls(query=query, client=client, cache=cache)
     
     def get_entities(self) -> List[PublicEntity]:
         if self.efts_response is not None:
@@ -85,6 +85,13 @@ class EFTS_Response(BaseModel):
             return self.hits.hits
         return []
 
+    def get_total_hits(self) -> int:
+        return self.hits.total.get("value", 0)
+
+    def is_total_exact(self) -> bool:
+        # Past a threshold, EFTS only reports a lower bound ("gte")
+        return self.hits.total.get("relation", "eq") == "eq"
+
     def get_entities(self) -> List[PublicEntity]:
         
         entity_full_names: List[str] = [bucket['key'] for bucket in self.aggregations["entity_filter"]["buckets"]]
@@ -0,0 +1,143 @@
+import logging
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from config import sync_settings
+from modeling.PublicEntity import PublicEntity
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+from modeling.sec_edgar.efts.EFTS_Cache import EFTS_Cache, efts_cache
+from modeling.sec_edgar.efts.EFTS_Request import EFTS_Request
+from modeling.sec_edgar.efts.EFTS_Response import EFTS_Hit, EFTS_Response
+
+# A page of an EFTS search: start and end of its date window, and its offset
+Page = Tuple[date, date, int]
+
+
+class EFTS_Search:
+    """
+    Streams every hit of an EFTS query, where a single EFTS request only returns
+    one page of 100 hits.
+
+    EFTS does not page past its first 10,000 hits, so the date range of the
+    query is split in half, recursively, until every window holds fewer hits.
+    The pages of each window are then fetched concurrently on worker threads,
+    with the SEC client enforcing the rate limit, and hits are yielded as soon
+    as their page arrives.
+
+    With a cache, the search starts from one window per calendar month, so that
+    windows stay the same from one run to the next: past months are served from
+    the cache and only the current month is queried again.
+    """
+
+    PAGE_SIZE = 100
+    MAX_HITS = 10000
+
+    def __init__(
+        self,
+        query: dict,
+        client: Optional[SEC_Client] = None,
+        max_concurrency: int = sync_settings.max_concurrency,
+        max_hits: int = MAX_HITS,
+        cache: Optional[EFTS_Cache] = efts_cache,
+    ):
+        self.query = query
+        self.client = client or sec_client
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_hits = max_hits
+        self.start_date = EFTS_Search._to_date(query["startdt"])
+        self.end_date = EFTS_Search._to_date(query.get("enddt") or date.today())
+
+    @staticmethod
+    def _to_date(value) -> date:
+        return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+    def _page_query(self, page: Page) -> dict:
+        start_date, end_date, offset = page
+        query = dict(self.query)
+        query.update(
+            {"dateRange": "custom", "startdt": start_date.isoformat(), "enddt": end_date.isoformat()}
+        )
+        if offset:
+            query["from"] = offset
+        return query
+
+    def _fetch_page(self, page: Page) -> EFTS_Response:
+        efts_request = EFTS_Request(
+            query=self._page_query(page), client=self.client, cache=self.cache
+        )
+        if efts_request.efts_response is None:
+            raise RuntimeError(f"EFTS search failed for page {page}.")
+        return efts_request.efts_response
+
+    def _first_pages(self) -> List[Page]:
+        if self.cache is None:
+            return [(self.start_date, self.end_date, 0)]
+        first_pages = []
+        month_start = self.start_date
+        while month_start <= self.end_date:
+            next_month = (month_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+            first_pages.append((month_start, min(next_month - timedelta(days=1), self.end_date), 0))
+            month_start = next_month
+        return first_pages
+
+    def _plan_window(self, page: Page, first_page: EFTS_Response) -> Tuple[List[Page], bool]:
+        """
+        Returns the pages still to fetch for a window, given its first page, and
+        whether the window was split.
+        """
+        start_date, end_date, _ = page
+        total_hits = first_page.get_total_hits()
+        is_capped = not first_page.is_total_exact() or total_hits >= self.max_hits
+        if is_capped and start_date < end_date:
+            middle_date = start_date + (end_date - start_date) // 2
+            logging.info(f"Splitting EFTS window {start_date} - {end_date} with {total_hits} hits.")
+            return [(start_date, middle_date, 0), (middle_date + timedelta(days=1), end_date, 0)], True
+        if is_capped:
+            logging.warning(
+                f"EFTS window {start_date} has more than {self.max_hits} hits, only the first ones are returned."
+            )
+        last_offset = min(total_hits, self.max_hits)
+        return [
+            (start_date, end_date, offset)
+            for offset in range(self.PAGE_SIZE, last_offset, self.PAGE_SIZE)
+        ], False
+
+    def iter_hits(self) -> Iterator[EFTS_Hit]:
+        seen_hit_ids = set()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            pending: Dict[Future, Page] = {
+                executor.submit(self._fetch_page, first_page): first_page
+                for first_page in self._first_pages()
+            }
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page = pending.pop(future)
+                        efts_response = future.result()
+                        if page[2] == 0:
+                            next_pages, is_split = self._plan_window(page, efts_response)
+                            for next_page in next_pages:
+                                pending[executor.submit(self._fetch_page, next_page)] = next_page
+                            if is_split:
+                                # The halves of the window return these hits again
+                                continue
+                        for hit in efts_response.get_hits():
+                            if hit.id not in seen_hit_ids:
+                                seen_hit_ids.add(hit.id)
+                                yield hit
+            finally:
+                for future in pending:
+                    future.cancel()
+        logging.info(f"Retrieved {len(seen_hit_ids)} EFTS hits for query {self.query.get('q')}.")
+
+    def iter_entities(self) -> Iterator[PublicEntity]:
+        """Streams the distinct entities behind the hits of the query."""
+        seen_ciks = set()
+        for hit in self.iter_hits():
+            for display_name in hit.source.display_names:
+                entity = PublicEntity.map_to_entity(display_name)
+                if entity.cik and entity.cik not in seen_ciks:
+                    seen_ciks.add(entity.cik)
+                    yield entity
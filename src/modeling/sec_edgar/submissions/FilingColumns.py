@@ -0,0 +1,102 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+from config import sec_edgar_settings as ses
+
+
+class FilingColumns:
+    """
+    Column-oriented list of filings, as found under `filings.recent` in a
+    submissions payload: one list per field, all of the same length.
+
+    Filters on form and filing date run over the columns and only return row
+    indices; SEC_Filing_Metadata objects are only built for the selected rows.
+    """
+
+    COLUMNS = (
+        "accessionNumber",
+        "filingDate",
+        "reportDate",
+        "acceptanceDateTime",
+        "act",
+        "form",
+        "fileNumber",
+        "filmNumber",
+        "items",
+        "size",
+        "isXBRL",
+        "isInlineXBRL",
+        "primaryDocument",
+        "primaryDocDescription",
+    )
+
+    def __init__(self, columns: Optional[Dict[str, list]] = None):
+        columns = columns or {}
+        row_count = len(columns.get("accessionNumber") or [])
+        # Columns missing from the payload are filled once, not looked up per row
+        self.columns: Dict[str, list] = {
+            name: columns.get(name) or [None] * row_count for name in FilingColumns.COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["accessionNumber"])
+
+    def concat(self, *others: "FilingColumns") -> "FilingColumns":
+        return FilingColumns(
+            {
+                name: [value for columns in (self, *others) for value in columns.columns[name]]
+                for name in FilingColumns.COLUMNS
+            }
+        )
+
+    def select(
+        self, forms: Optional[Iterable[str]] = None, filed_since: Optional[date] = None
+    ) -> List[int]:
+        """Returns the rows with one of the given forms, filed on or after `filed_since`."""
+        rows = range(len(self))
+        if forms is not None:
+            form_set = set(forms)
+            form_column = self.columns["form"]
+            rows = [row for row in rows if form_column[row] in form_set]
+        if filed_since is not None:
+            # ISO dates compare in calendar order
+            since_str = filed_since.isoformat()
+            filing_date_column = self.columns["filingDate"]
+            rows = [row for row in rows if filing_date_column[row] >= since_str]
+        return list(rows)
+
+    def to_filing_metadatas(
+        self, cik: str, rows: Optional[List[int]] = None
+    ) -> List[SEC_Filing_Metadata]:
+        if rows is None:
+            rows = range(len(self))
+        (
+            accession_numbers, filing_dates, report_dates, acceptance_date_times, acts,
+            forms, file_numbers, film_numbers, items, sizes, is_xbrls, is_inline_xbrls,
+            primary_documents, primary_doc_descriptions,
+        ) = (self.columns[name] for name in FilingColumns.COLUMNS)
+        return [
+            SEC_Filing_Metadata(
+                document_url=ses.get_document_url(
+                    cik=cik,
+                    accession_number=accession_numbers[row],
+                    primary_document=primary_documents[row],
+                ),
+                company_cik=cik,
+                accession_number=accession_numbers[row].replace("-", ""),
+                filing_date=filing_dates[row],
+                report_date=report_dates[row] or None,
+                acceptance_date_time=acceptance_date_times[row],
+                act=acts[row] or None,
+                form=forms[row],
+                file_number=file_numbers[row] or None,
+                film_number=film_numbers[row] or None,
+                items=items[row].split(",") if items[row] else None,
+                size=sizes[row],
+                is_xbrl=is_xbrls[row],
+                is_inline_xbrl=is_inline_xbrls[row],
+                primary_document=primary_documents[row],
+                primary_doc_description=primary_doc_descriptions[row] or None,
+            )
+            for row in rows
+        ]
@@ -1,9 +1,21 @@
 # FILE: src/modeling/sec_edgar/submissions/SubmissionsRequest.py
 
+import json
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Optional
 from pydantic import BaseModel, Field
+from modeling.sec_edgar.submissions.FilingColumns import FilingColumns
 from modeling.sec_edgar.submissions.SubmissionsResponse import SubmissionsResponse
-from config import sec_edgar_settings as ses
-import requests
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+from modeling.sec_edgar.client.ResponseCache import (
+    ResponseCache,
+    submissions_cache,
+    submissions_history_cache,
+)
+from config import sec_edgar_settings as ses, sync_settings
 
 
 class SubmissionsRequest(BaseModel):
@@ -14,25 +26,130 @@ class SubmissionsRequest(BaseModel):
     resp_content: SubmissionsResponse = Field(
         description="Content of the Edgar API submissions response"
     )
+    not_modified: bool = Field(
+        default=False,
+        description="Whether the submissions are unchanged since they were last fetched",
+    )
 
     class Config:
         arbitrary_types_allowed = True
 
     @classmethod
-    def from_cik(cls, cik: str):
+    def from_cik(
+        cls,
+        cik: str,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[ResponseCache] = submissions_cache,
+        skip_unmodified: bool = False,
+        include_history: bool = False,
+        history_since: Optional[date] = None,
+    ):
+        """
+        Retrieves the submissions of an entity. With a cache, the request is
+        conditional: if SEC answers 304 the cached JSON is parsed instead, or,
+        when `skip_unmodified` is set, nothing is parsed at all and an empty
+        response with `not_modified=True` is returned.
+
+        With `include_history`, the pages with older filings are merged into the
+        response as well, except those with only filings before `history_since`.
+
+        Any other status, once the client has used up its retries, raises a
+        requests.HTTPError.
+        """
+        client = client or sec_client
         url_str = ses.get_formatted_entity_submissions_url(cik=cik)
-        request_header = ses.user_agent_header
+        empty_response = SubmissionsResponse(cik=cik, entity_name="")
         # Make request
-        response = requests.get(url=url_str, headers=request_header)
+        if cache is None:
+            response = client.get(url_str)
+        else:
+            response = client.get_conditional(url_str, cache)
+
+        if response.status_code == 304:
+            if skip_unmodified:
+                return cls(url=url_str, cik=cik, resp_content=empty_response, not_modified=True)
+            cached_body = cache.read_body(url_str)
+            if cached_body is not None:
+                submissions_response = SubmissionsResponse.from_dict(json.loads(cached_body))
+                if include_history:
+                    submissions_response = cls.merge_history(
+                        submissions_response, client=client, filed_since=history_since
+                    )
+                return cls(url=url_str, cik=cik, resp_content=submissions_response)
+            # Validators without a body, fetch the full document again
+            cache.invalidate(url_str)
+            response = client.get(url_str)
 
         if response.status_code == 200:
             result = response.json()
             submissions_response = SubmissionsResponse.from_dict(result)
+            if include_history:
+                submissions_response = cls.merge_history(
+                    submissions_response, client=client, filed_since=history_since
+                )
             return cls(url=url_str, cik=cik, resp_content=submissions_response)
-        else:
-            # Handle the case where the request fails
-            return cls(
-                url=url_str,
-                cik=cik,
-                resp_content=SubmissionsResponse(cik=cik, entity_name="", filing_metadatas=[]),
+        # A failed request must fail the sync, so that it is retried, rather than look like no filings
+        response.raise_for_status()
+        raise requests.HTTPError(
+            f"Unexpected status {response.status_code} for {url_str}", response=response
+        )
+
+    @staticmethod
+    def fetch_history_page(
+        name: str,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[ResponseCache] = submissions_history_cache,
+    ) -> FilingColumns:
+        client = client or sec_client
+        url_str = f"{ses.base_entity_submissions_url}{name}"
+        body = cache.read_body(url_str) if cache is not None else None
+        if body is None:
+            response = client.get(url_str)
+            response.raise_for_status()
+            body = response.content
+            if cache is not None:
+                cache.put(url_str, response.headers, body)
+        return FilingColumns(json.loads(body))
+
+    @staticmethod
+    def merge_history(
+        submissions_response: SubmissionsResponse,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[ResponseCache] = submissions_history_cache,
+        filed_since: Optional[date] = None,
+        max_concurrency: int = sync_settings.max_concurrency,
+    ) -> SubmissionsResponse:
+        """
+        Fetches the pages with older filings concurrently and appends them to the
+        recent filings. Pages with only filings before `filed_since` are skipped.
+        """
+        history_files = [
+            history_file
+            for history_file in submissions_response.history_files
+            if filed_since is None or history_file.filing_to >= filed_since.isoformat()
+        ]
+        if not history_files:
+            return submissions_response
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(history_files))) as executor:
+            pages = list(
+                executor.map(
+                    lambda history_file: SubmissionsRequest.fetch_history_page(
+                        history_file.name, client=client, cache=cache
+                    ),
+                    history_files,
+                )
             )
+        filings = submissions_response.filings.concat(*pages)
+        logging.info(
+            f"Merged {len(history_files)} history pages with {len(filings) - len(submissions_response.filings)} "
+            f"filings for company CIK {submissions_response.cik}."
+        )
+        return submissions_response.model_copy(update={"filings": filings, "history_files": []})
+
+    @staticmethod
+    def invalidate_cache(cik: str, cache: ResponseCache = submissions_cache):
+        """
+        Forgets the validators of an entity's submissions, so the next request
+        downloads them in full. Used when a sync fails after a 200 response.
+        """
+        cache.invalidate(ses.get_formatted_entity_submissions_url(cik=cik))
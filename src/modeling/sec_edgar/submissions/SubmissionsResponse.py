@@ -1,51 +1,59 @@
 # FILE: src/modeling/sec_edgar/submissions/SubmissionsResponse.py
 
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from datetime import date
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Iterable, List, Optional
 from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
-from config import sec_edgar_settings as ses
+from modeling.sec_edgar.submissions.FilingColumns import FilingColumns
+
+
+class SubmissionsHistoryFile(BaseModel):
+    name: str = Field(description="File name of the page, e.g. CIK0001050446-submissions-001.json")
+    filing_count: int = Field(description="Number of filings in the page")
+    filing_from: str = Field(description="Filing date of the oldest filing in the page")
+    filing_to: str = Field(description="Filing date of the most recent filing in the page")
+
+
 class SubmissionsResponse(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     cik: str
     entity_name: str
-    filing_metadatas: List[SEC_Filing_Metadata]
+    filings: FilingColumns = Field(
+        default_factory=FilingColumns, description="Filings of the entity, column by column"
+    )
+    history_files: List[SubmissionsHistoryFile] = Field(
+        default=[], description="Pages with older filings, not merged into `filings`"
+    )
+
+    @property
+    def filing_metadatas(self) -> List[SEC_Filing_Metadata]:
+        return self.filings.to_filing_metadatas(self.cik)
+
+    def select_filing_metadatas(
+        self, forms: Optional[Iterable[str]] = None, filed_since: Optional[date] = None
+    ) -> List[SEC_Filing_Metadata]:
+        """Builds the metadata of the filings with one of the given forms, filed on or after `filed_since`."""
+        rows = self.filings.select(forms=forms, filed_since=filed_since)
+        return self.filings.to_filing_metadatas(self.cik, rows)
 
     @classmethod
     def from_dict(cls, data: dict):
         recent_filings = data.get("filings", {}).get("recent", {})
         cik = data.get("cik", "").zfill(10)
         entity_name = data.get("entityName", "")
-        filing_metadatas = [
-            SEC_Filing_Metadata(
-                document_url=ses.get_document_url(cik=cik, 
-                                                  accession_number=recent_filings["accessionNumber"][i],
-                                                  primary_document=recent_filings["primaryDocument"][i] ),
-                company_cik=cik,
-                accession_number=recent_filings["accessionNumber"][i].replace("-", ""),
-                filing_date=recent_filings["filingDate"][i],
-                report_date=recent_filings.get("reportDate", [None])[i] or None,
-                acceptance_date_time=recent_filings["acceptanceDateTime"][i],
-                act=recent_filings.get("act", [None])[i] or None,
-                form=recent_filings["form"][i],
-                file_number=recent_filings.get("fileNumber", [None])[i] or None,
-                film_number=recent_filings.get("filmNumber", [None])[i] or None,
-                items=(
-                    recent_filings.get("items", [""])[i].split(",")
-                    if recent_filings.get("items", [""])[i]
-                    else None
-                ),
-                size=recent_filings.get("size", [None])[i],
-                is_xbrl=recent_filings.get("isXBRL", [None])[i],
-                is_inline_xbrl=recent_filings.get("isInlineXBRL", [None])[i],
-                primary_document=recent_filings["primaryDocument"][i],
-                primary_doc_description=recent_filings.get(
-                    "primaryDocDescription", [None]
-                )[i]
-                or None,
+        history_files = [
+            SubmissionsHistoryFile(
+                name=history_file["name"],
+                filing_count=history_file.get("filingCount", 0),
+                filing_from=history_file.get("filingFrom", ""),
+                filing_to=history_file.get("filingTo", ""),
             )
-            for i in range(len(recent_filings["accessionNumber"]))
+            for history_file in data.get("filings", {}).get("files", [])
         ]
         return cls(
             cik=cik,
             entity_name=entity_name,
-            filing_metadatas=filing_metadatas
+            filings=FilingColumns(recent_filings),
+            history_files=history_files,
         )
@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import re
+import time
+import zipfile
+from typing import Iterator, Optional, Set, Tuple
+from pydantic import BaseModel, Field
+from data_repositories.public_entity_repo import PublicEntityRepository
+from data_repositories.sec_filing_repo import SEC_FilingRepository
+from data_repositories.filing_content_store import FilingContentStore
+from data_repositories.sync_state_repo import SyncStateRepository
+from data_repositories.pipeline_task_repo import PipelineTaskRepository
+from modeling.PublicEntity import PublicEntity
+from modeling.filing.SEC_Filing import SEC_Filing
+from modeling.sec_edgar.submissions.FilingColumns import FilingColumns
+from modeling.sec_edgar.submissions.SubmissionsResponse import SubmissionsResponse
+from services.sync_engine import select_new_filing_metadatas
+from services.entity_leases import entity_lease_manager
+from database import (
+    public_entity_collection,
+    filings_collection,
+    filing_contents_bucket,
+    sync_state_collection,
+    pipeline_tasks_collection,
+)
+
+# SEC rebuilds this archive every night, download it once to ingest it locally
+SUBMISSIONS_ZIP_URL = "https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip"
+SUBMISSIONS_MEMBER_PATTERN = re.compile(r"^CIK(\d{10})\.json$")
+
+
+class BulkIngestStats(BaseModel):
+    entities: int = Field(default=0, description="Number of entities read from the archive")
+    untracked_entities: int = Field(
+        default=0, description="Number of entities with new filings that are not tracked"
+    )
+    filings: int = Field(default=0, description="Number of new filings that were stored")
+    elapsed_seconds: float = Field(default=0.0, description="Wall-clock duration of the ingestion")
+
+
+def iter_submissions_zip(
+    zip_path: str, ciks: Optional[Set[str]] = None
+) -> Iterator[Tuple[SubmissionsResponse, PublicEntity]]:
+    """
+    Streams the submissions of every entity in a local copy of SEC's
+    submissions.zip, or only of the given CIKs, along with the entity itself.
+
+    Members are decompressed one at a time straight from the archive. The pages
+    with older filings that the archive holds as well are merged in.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        member_names = set(archive.namelist())
+        for member_name in sorted(member_names):
+            match = SUBMISSIONS_MEMBER_PATTERN.match(member_name)
+            if match is None:
+                continue
+            cik = match.group(1)
+            if ciks is not None and cik not in ciks:
+                continue
+            with archive.open(member_name) as member:
+                data = json.load(member)
+            submissions_response = SubmissionsResponse.from_dict(data)
+            history_pages = []
+            for history_file in submissions_response.history_files:
+                if history_file.name not in member_names:
+                    logging.warning(f"History page {history_file.name} is missing from {zip_path}.")
+                    continue
+                with archive.open(history_file.name) as member:
+                    history_pages.append(FilingColumns(json.load(member)))
+            submissions_response = submissions_response.model_copy(
+                update={"filings": submissions_response.filings.concat(*history_pages), "history_files": []}
+            )
+            public_entity = PublicEntity(
+                name=data.get("name") or submissions_response.entity_name,
+                ticker=(data.get("tickers") or [None])[0],
+                cik=cik,
+            )
+            yield submissions_response, public_entity
+
+
+def ingest_submissions_zip(zip_path: str, tracked_only: bool = True) -> BulkIngestStats:
+    """
+    Stores the filing metadata of a local submissions.zip, for the tracked
+    entities only or for every entity with filings of the synced forms.
+    Filings after each entity's sync watermark are bulk-written and the
+    watermark is moved forward, so the daily sync picks up where the archive
+    stops. Like those of a sync, the new filings are enqueued on the ingestion
+    pipeline for their content.
+
+    Entities are never tracked by the ingestion: the filings of untracked ones
+    are stored, but the syncs keep covering the curated entities only.
+    """
+    public_entity_repo = PublicEntityRepository(public_entity_collection)
+    filing_repo = SEC_FilingRepository(
+        filings_collection, FilingContentStore(filing_contents_bucket)
+    )
+    sync_state_repo = SyncStateRepository(sync_state_collection)
+    task_repo = PipelineTaskRepository(pipeline_tasks_collection)
+    tracked_ciks = {entity.cik for entity in public_entity_repo.get_all_entities()}
+    sync_states = sync_state_repo.get_states(tracked_ciks if tracked_only else None)
+
+    stats = BulkIngestStats()
+    start = time.perf_counter()
+    for submissions_response, public_entity in iter_submissions_zip(
+        zip_path, ciks=tracked_ciks if tracked_only else None
+    ):
+        stats.entities += 1
+        filing_metadatas = select_new_filing_metadatas(
+            submissions_response, sync_states.get(public_entity.cik)
+        )
+        if not filing_metadatas:
+            continue
+        if not entity_lease_manager.acquire(public_entity.cik):
+            # A daemon syncs the entity right now, it picks up these filings itself
+            logging.info(f"Company CIK {public_entity.cik} is synced by another worker, skipping it.")
+            continue
+        try:
+            # A daemon may have moved the watermark since the states were loaded
+            filing_metadatas = select_new_filing_metadatas(
+                submissions_response, sync_state_repo.get_state(public_entity.cik)
+            )
+            if not filing_metadatas:
+                continue
+            if public_entity.cik not in tracked_ciks:
+                stats.untracked_entities += 1
+            write_result = filing_repo.add_filings(
+                [SEC_Filing(filing_metadata=filing_metadata) for filing_metadata in filing_metadatas]
+            )
+            # Enqueued before the checkpoint, so a crash in between enqueues them on the next run
+            task_repo.enqueue(filing_metadatas)
+            sync_state_repo.checkpoint(public_entity.cik, filing_metadatas[-1])
+            stats.filings += write_result.inserted
+        finally:
+            entity_lease_manager.release(public_entity.cik)
+
+    stats.elapsed_seconds = time.perf_counter() - start
+    logging.info(
+        f"Ingested {stats.filings} filings of {stats.entities} entities from {zip_path} "
+        f"in {stats.elapsed_seconds:.1f}s, {stats.untracked_entities} of them are not tracked."
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    from services.daemon import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description=f"Ingest filing metadata from a local copy of {SUBMISSIONS_ZIP_URL}"
+    )
+    parser.add_argument("zip_path", help="Path of the downloaded submissions.zip")
+    parser.add_argument(
+        "--all-entities",
+        action="store_true",
+        help="Store the filings of every entity in the archive, without tracking the untracked ones",
+    )
+    args = parser.parse_args()
+    setup_logging()
+    ingest_submissions_zip(args.zip_path, tracked_only=not args.all_entities)
@@ -1,8 +1,5 @@
-import schedule
-import time
 import logging
 import colorlog
-from services.update_db import add_new_entities, update_sec_filings_for_all_companies
 
 
 def setup_logging():
@@ -32,11 +29,10 @@ def setup_logging():
 
 
 def run_daemon():
-    schedule.every().day.at("01:00").do(update_sec_filings_for_all_companies)
+    # Imported here, so that other entry points can reuse setup_logging on its own
+    from services.scheduler import JobScheduler
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    JobScheduler().run()
 
 
 if __name__ == "__main__":
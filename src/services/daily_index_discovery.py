@@ -0,0 +1,41 @@
+import logging
+from datetime import date, timedelta
+from typing import Iterable, Optional, Set, Tuple
+from config import sync_settings
+from modeling.sec_edgar.client.SEC_Client import SEC_Client
+from modeling.sec_edgar.daily_index.DailyIndex import DailyIndex
+
+DAILY_INDEX_SOURCE = "daily_index"
+
+
+def discover_ciks_from_daily_indices(
+    tracked_ciks: Set[str],
+    since: date,
+    until: date,
+    forms: Iterable[str] = sync_settings.forms,
+    client: Optional[SEC_Client] = None,
+) -> Tuple[Set[str], Optional[date]]:
+    """
+    Reads the daily indices of the business days after `since`, up to and
+    including `until`. Returns the tracked CIKs that filed one of the given
+    forms, and the last day that had a published index.
+    """
+    form_set = set(forms)
+    discovered_ciks: Set[str] = set()
+    last_published_day = None
+    day = since + timedelta(days=1)
+    while day <= until:
+        if day.weekday() < 5:
+            daily_index = DailyIndex.fetch(day, client=client)
+            if daily_index is not None:
+                last_published_day = day
+                discovered_ciks.update(
+                    entry.cik
+                    for entry in daily_index.entries
+                    if entry.form in form_set and entry.cik in tracked_ciks
+                )
+        day += timedelta(days=1)
+    logging.info(
+        f"Found filings of {len(discovered_ciks)} tracked entities in the daily indices after {since}."
+    )
+    return discovered_ciks, last_published_day
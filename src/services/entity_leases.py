@@ -0,0 +1,121 @@
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Dict, Optional
+from config import sync_settings
+from data_repositories.entity_lease_repo import EntityLeaseRepository
+from database import entity_leases_collection
+
+
+class EntityLeaseManager:
+    """
+    Holds the entity leases of this daemon, so that any number of daemons can
+    share the tracked entities and each entity is synced by one worker at a
+    time.
+
+    Held leases are renewed by a heartbeat thread every `heartbeat_seconds`. A
+    daemon that dies stops renewing them, and they can be taken over once they
+    expire after `lease_seconds`. A lease found taken over on a renewal is
+    dropped, and `is_held` tells the sync to stop writing for that entity. A
+    lease that could not be renewed for `lease_seconds`, say while MongoDB is
+    unreachable, is no longer held either, since another daemon may have taken
+    it over.
+    """
+
+    def __init__(
+        self,
+        lease_repo: EntityLeaseRepository,
+        owner: Optional[str] = None,
+        lease_seconds: float = sync_settings.lease_seconds,
+        heartbeat_seconds: float = sync_settings.lease_heartbeat_seconds,
+    ):
+        self.lease_repo = lease_repo
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        # CIK -> time.monotonic() before the lease was last acquired or renewed
+        self._renewed_at: Dict[str, float] = {}
+        self._acquiring: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+
+    def acquire(self, cik: str) -> bool:
+        """Acquires the lease on an entity, returns False if another worker syncs it."""
+        with self._lock:
+            # Workers of this daemon share its leases, only one of them gets the entity
+            if cik in self._renewed_at or cik in self._acquiring:
+                return False
+            self._acquiring.add(cik)
+        acquired = False
+        # Taken before the request, the lease lasts at least this long
+        requested_at = time.monotonic()
+        try:
+            acquired = self.lease_repo.acquire(cik, self.owner, self.lease_seconds)
+        finally:
+            with self._lock:
+                self._acquiring.discard(cik)
+                if acquired:
+                    self._renewed_at[cik] = requested_at
+        if acquired:
+            self._start_heartbeat()
+        return acquired
+
+    def release(self, cik: str):
+        with self._lock:
+            if cik not in self._renewed_at:
+                return
+            del self._renewed_at[cik]
+        self.lease_repo.release(cik, self.owner)
+
+    def is_held(self, cik: str) -> bool:
+        with self._lock:
+            renewed_at = self._renewed_at.get(cik)
+        return renewed_at is not None and time.monotonic() - renewed_at < self.lease_seconds
+
+    def heartbeat(self):
+        """Renews the held leases once and drops the ones that were taken over."""
+        with self._lock:
+            held = set(self._renewed_at)
+        requested_at = time.monotonic()
+        renewed = self.lease_repo.renew(held, self.owner, self.lease_seconds)
+        lost = held - renewed
+        if lost:
+            logging.warning(f"Leases on company CIKs {sorted(lost)} were taken over by another daemon.")
+        with self._lock:
+            for cik in held:
+                if cik in lost:
+                    self._renewed_at.pop(cik, None)
+                elif cik in self._renewed_at:
+                    # Not if it was released in the meantime
+                    self._renewed_at[cik] = requested_at
+
+    def _run_heartbeat(self):
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logging.error(f"Could not renew the entity leases of {self.owner}: {e}")
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+            self._stop.clear()
+            self._heartbeat_thread = threading.Thread(target=self._run_heartbeat, daemon=True)
+        self._heartbeat_thread.start()
+
+    def close(self):
+        """Stops the heartbeat and releases every held lease, for other daemons to take over right away."""
+        self._stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+            self._heartbeat_thread = None
+        with self._lock:
+            self._renewed_at.clear()
+        self.lease_repo.release_all(self.owner)
+
+
+entity_lease_manager = EntityLeaseManager(EntityLeaseRepository(entity_leases_collection))
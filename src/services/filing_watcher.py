@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import sec_edgar_settings as ses, sync_settings
+from data_repositories.public_entity_repo import PublicEntityRepository
+from data_repositories.sec_filing_repo import SEC_FilingRepository
+from data_repositories.filing_content_store import FilingContentStore
+from modeling.PublicEntity import PublicEntity
+from modeling.sec_edgar.client.ResponseCache import ResponseCache, current_feed_cache
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+from modeling.sec_edgar.current_feed.CurrentFilingsFeed import CurrentFilingEntry, CurrentFilingsFeed
+from services.sync_engine import SyncEngine
+from database import public_entity_collection, filings_collection, filing_contents_bucket
+
+
+class FilingWatcher:
+    """
+    Picks up filings of tracked entities within seconds of their acceptance, by
+    polling EDGAR's latest filings feed instead of waiting for the daily index.
+
+    The feed is revalidated with a conditional GET on every poll. Its entries
+    are matched against the tracked CIKs in memory, and only the entities of
+    matching entries are synced. A sync stores every filing of the entity after
+    its watermark, so the filings the feed listed come along with any other new
+    ones. The submissions of an entity can lag behind the feed, so a matched
+    filing stays pending, and its entity is synced again on the next polls,
+    until the filing is stored or `pending_seconds` have passed.
+
+    New filings go to the ingestion pipeline for their content, like those of
+    any other sync. `run` polls on a single event loop for the lifetime of the
+    watcher.
+    """
+
+    TRACKED_ENTITIES_REFRESH_SECONDS = 300.0
+    # The feed lists the last 100 filings, remembering more only costs memory
+    MAX_SEEN_ENTRIES = 10000
+
+    def __init__(
+        self,
+        feed_url: str = ses.current_filings_feed_url,
+        poll_seconds: float = sync_settings.watch_poll_seconds,
+        pending_seconds: float = sync_settings.watch_pending_seconds,
+        forms: Iterable[str] = sync_settings.forms,
+        client: Optional[SEC_Client] = None,
+        cache: Optional[ResponseCache] = current_feed_cache,
+    ):
+        self.feed_url = feed_url
+        self.poll_seconds = poll_seconds
+        self.pending_seconds = pending_seconds
+        self.forms = set(forms)
+        self.client = client or sec_client
+        self.cache = cache
+        self.public_entity_repo = PublicEntityRepository(public_entity_collection)
+        self.filing_repo = SEC_FilingRepository(
+            filings_collection, FilingContentStore(filing_contents_bucket)
+        )
+        self.sync_engine = SyncEngine(client=self.client)
+        self._tracked_entities: Dict[str, PublicEntity] = {}
+        self._tracked_entities_loaded_at: Optional[float] = None
+        self._seen_entries: "OrderedDict[str, None]" = OrderedDict()
+        # Accession number (without dashes) -> (CIK, when it was first matched)
+        self._pending: Dict[str, Tuple[str, float]] = {}
+
+    def refresh_tracked_entities(self, force: bool = False):
+        now = time.monotonic()
+        if (
+            not force
+            and self._tracked_entities_loaded_at is not None
+            and now - self._tracked_entities_loaded_at < self.TRACKED_ENTITIES_REFRESH_SECONDS
+        ):
+            return
+        self._tracked_entities = {
+            entity.cik: entity for entity in self.public_entity_repo.get_all_entities()
+        }
+        self._tracked_entities_loaded_at = now
+
+    def match_entries(self, entries: List[CurrentFilingEntry]) -> List[CurrentFilingEntry]:
+        """Returns the entries of tracked entities with a synced form that were not seen before."""
+        matched_entries = []
+        for entry in entries:
+            key = f"{entry.cik}/{entry.accession_number}"
+            if key in self._seen_entries:
+                continue
+            self._seen_entries[key] = None
+            if len(self._seen_entries) > self.MAX_SEEN_ENTRIES:
+                self._seen_entries.popitem(last=False)
+            if entry.cik in self._tracked_entities and entry.form in self.forms:
+                matched_entries.append(entry)
+        return matched_entries
+
+    async def poll(self) -> int:
+        """Polls the feed once and syncs the entities with pending filings. Returns the number of new filings."""
+        await asyncio.to_thread(self.refresh_tracked_entities)
+        now = time.monotonic()
+        feed = await asyncio.to_thread(
+            CurrentFilingsFeed.fetch, self.feed_url, client=self.client, cache=self.cache
+        )
+        if feed is not None:
+            for entry in self.match_entries(feed.entries):
+                logging.info(
+                    f"New {entry.form} filing {entry.accession_number} of company CIK {entry.cik} in the latest filings feed."
+                )
+                self._pending.setdefault(entry.accession_number.replace("-", ""), (entry.cik, now))
+        if not self._pending:
+            return 0
+
+        pending_ciks = {cik for cik, _ in self._pending.values()}
+        public_entities = [
+            self._tracked_entities[cik] for cik in pending_ciks if cik in self._tracked_entities
+        ]
+        stats = await self.sync_engine.run(public_entities)
+
+        stored_accession_numbers = await asyncio.to_thread(
+            self.filing_repo.get_stored_accession_numbers, list(self._pending)
+        )
+        for accession_number, (cik, matched_at) in list(self._pending.items()):
+            if accession_number in stored_accession_numbers or cik not in self._tracked_entities:
+                del self._pending[accession_number]
+            elif now - matched_at > self.pending_seconds:
+                # The daily index discovery picks it up later on
+                logging.warning(
+                    f"Filing {accession_number} of company CIK {cik} is not in its submissions after "
+                    f"{self.pending_seconds:.0f}s, leaving it to the daily sync."
+                )
+                del self._pending[accession_number]
+        return stats.filings
+
+    def poll_once(self) -> int:
+        """Polls the feed once, on an event loop of its own."""
+        return asyncio.run(self.poll())
+
+    async def watch(self):
+        logging.info(f"Watching {self.feed_url} every {self.poll_seconds}s.")
+        await asyncio.to_thread(self.refresh_tracked_entities, True)
+        while True:
+            started_at = time.monotonic()
+            try:
+                await self.poll()
+            except Exception as e:
+                logging.error(f"Error polling the latest filings feed: {e}")
+            await asyncio.sleep(max(0.0, self.poll_seconds - (time.monotonic() - started_at)))
+
+    def run(self):
+        try:
+            asyncio.run(self.watch())
+        finally:
+            self.sync_engine.lease_manager.close()
+
+
+if __name__ == "__main__":
+    from services.daemon import setup_logging
+
+    parser = argparse.ArgumentParser(
+        description="Sync filings of tracked entities as soon as they appear in EDGAR's latest filings feed"
+    )
+    parser.add_argument(
+        "--feed-url", default=ses.current_filings_feed_url, help="URL of the Atom feed to poll"
+    )
+    args = parser.parse_args()
+    setup_logging()
+    FilingWatcher(feed_url=args.feed_url).run()
@@ -0,0 +1,297 @@
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+from pydantic import BaseModel, Field
+from pymongo import ASCENDING, DESCENDING
+from config import pipeline_settings, sync_settings
+from data_repositories.pipeline_task_repo import PipelineTaskRepository
+from data_repositories.sec_filing_repo import METADATA_PROJECTION, SEC_FilingRepository
+from data_repositories.filing_content_store import FilingContentStore
+from modeling.PipelineTask import (
+    EXTRACT_STAGE,
+    FETCH_STAGE,
+    PARSE_STAGE,
+    STAGES,
+    STORE_STAGE,
+    DONE_STAGE,
+    PipelineTask,
+    next_stage,
+)
+from modeling.filing.SEC_Filing import SEC_Filing
+from modeling.parsers.SECFilingParser import SEC_Filing_Parser
+from modeling.parsers.SummaryCache import summary_cache
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+from services.parse_stage import parse_filing_content
+from database import pipeline_tasks_collection, filings_collection, filing_contents_bucket
+
+
+class PipelineStageStats(BaseModel):
+    processed: int = Field(default=0, description="Number of tasks the stage handed to the next one")
+    failed: int = Field(default=0, description="Number of failed attempts, dead-lettered ones included")
+    busy_seconds: float = Field(default=0.0, description="Time the workers of the stage spent on tasks")
+
+
+class IngestPipeline:
+    """
+    Ingests the content of filings in stages, each one a separate consumer of
+    the durable queue in `pipeline_tasks`:
+
+        fetch    downloads the primary document into the filing content store
+        parse    splits the document into items, on a pool of processes
+        extract  keeps the paragraphs no earlier filing of the entity contained
+        store    writes the parsed filing to the filings collection
+
+    Tasks are created from the metadata of filings, by the sync or by
+    `enqueue_unparsed_filings`. Every stage has its own number of workers, so
+    the slow one can be scaled on its own, and stages can be run in separate
+    processes. A stage pauses while too many tasks wait for the next one.
+    Output is handed over through the queue, so a crash only repeats the stage a
+    task was in.
+
+    Whether a paragraph is new depends on the filings extracted before, so the
+    filings of an entity are extracted in the order they were accepted: an
+    extract task is deferred while an earlier filing of the entity has yet to
+    be extracted. Paragraphs recorded by earlier runs still count as seen, so a
+    backfill of filings older than already extracted ones only keeps what those
+    did not contain.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[Dict[str, int]] = None,
+        lease_seconds: float = pipeline_settings.lease_seconds,
+        max_attempts: int = pipeline_settings.max_attempts,
+        retry_backoff_seconds: float = pipeline_settings.retry_backoff_seconds,
+        max_stage_backlog: int = pipeline_settings.max_stage_backlog,
+        poll_seconds: float = pipeline_settings.poll_seconds,
+        client: Optional[SEC_Client] = None,
+    ):
+        self.workers = {
+            FETCH_STAGE: pipeline_settings.fetch_workers,
+            PARSE_STAGE: pipeline_settings.parse_workers or os.cpu_count() or 1,
+            EXTRACT_STAGE: pipeline_settings.extract_workers,
+            STORE_STAGE: pipeline_settings.store_workers,
+        }
+        self.workers.update(workers or {})
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_stage_backlog = max_stage_backlog
+        self.poll_seconds = poll_seconds
+        self.client = client or sec_client
+        self.task_repo = PipelineTaskRepository(pipeline_tasks_collection)
+        self.content_store = FilingContentStore(filing_contents_bucket)
+        self.filing_repo = SEC_FilingRepository(filings_collection, self.content_store)
+        self.worker_id_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats: Dict[str, PipelineStageStats] = {stage: PipelineStageStats() for stage in STAGES}
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._handlers: Dict[str, Callable[[PipelineTask], dict]] = {
+            FETCH_STAGE: self.fetch,
+            PARSE_STAGE: self.parse,
+            EXTRACT_STAGE: self.extract,
+            STORE_STAGE: self.store,
+        }
+
+    def fetch(self, task: PipelineTask) -> dict:
+        # A document uploaded before a crash is not downloaded again
+        if not self.content_store.exists(task.task_id):
+            content_html_str = SEC_Filing.download_content(task.filing_metadata, client=self.client)
+            self.content_store.put(task.task_id, content_html_str)
+        return {}
+
+    def parse(self, task: PipelineTask) -> dict:
+        content_html_str = self.content_store.get(task.task_id)
+        if content_html_str is None:
+            raise RuntimeError(f"No content stored for filing {task.task_id}")
+        parse_args = (content_html_str, task.filing_metadata.form, task.filing_metadata.items)
+        if self._parse_pool is None:
+            items = parse_filing_content(*parse_args)
+        else:
+            items = self._parse_pool.submit(parse_filing_content, *parse_args).result()
+        return {"items": [item.model_dump() for item in items or []]}
+
+    def extract(self, task: PipelineTask) -> dict:
+        paragraphs = SEC_Filing_Parser.get_summary_paragraphs(task.items or [])
+        # Records the paragraphs as seen in this filing, so a retry keeps them
+        new_paragraphs = summary_cache.remove_seen_paragraphs(task.cik, task.task_id, paragraphs)
+        return {"new_paragraphs": new_paragraphs}
+
+    def store(self, task: PipelineTask) -> dict:
+        sec_filing = SEC_Filing(
+            filing_metadata=task.filing_metadata,
+            items=task.items or [],
+            is_parsed=True,
+            has_raw_content=True,
+            is_content_external=True,
+            new_paragraphs=task.new_paragraphs or [],
+        )
+        self.filing_repo.bulk_write_filings([sec_filing], upsert=True)
+        # The filing holds the output now, finished tasks stay small
+        return {"items": None, "new_paragraphs": None}
+
+    def _is_backlogged(self, stage: str) -> bool:
+        following_stage = next_stage(stage)
+        if following_stage == DONE_STAGE:
+            return False
+        return self.task_repo.count_waiting(following_stage) >= self.max_stage_backlog
+
+    def process_one(self, stage: str, worker_id: str) -> bool:
+        """Runs one task of a stage. Returns False if there was none to run."""
+        if self._is_backlogged(stage):
+            return False
+        task = self.task_repo.claim(stage, worker_id, self.lease_seconds)
+        if task is None:
+            return False
+        if stage == EXTRACT_STAGE and self.task_repo.has_earlier_unfinished(
+            task, STAGES[: STAGES.index(EXTRACT_STAGE) + 1]
+        ):
+            self.task_repo.defer(task, self.poll_seconds)
+            return True
+        start = time.perf_counter()
+        try:
+            output = self._handlers[stage](task)
+        except Exception as e:
+            self.task_repo.fail(
+                task, str(e) or type(e).__name__, self.max_attempts, self.retry_backoff_seconds
+            )
+            processed, failed = 0, 1
+        else:
+            self.task_repo.advance(task, output)
+            processed, failed = 1, 0
+        with self._stats_lock:
+            stage_stats = self.stats[stage]
+            stage_stats.processed += processed
+            stage_stats.failed += failed
+            stage_stats.busy_seconds += time.perf_counter() - start
+        return True
+
+    def _work(self, stage: str, worker_id: str, stop_when_idle: bool):
+        earlier_stages = STAGES[: STAGES.index(stage) + 1]
+        while not self._stop.is_set():
+            try:
+                if self.process_one(stage, worker_id):
+                    continue
+                if stop_when_idle and self.task_repo.count_unfinished(earlier_stages) == 0:
+                    return
+            except Exception as e:
+                logging.error(f"Worker {worker_id} failed: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def run(self, stages: List[str] = STAGES, stop_when_idle: bool = False):
+        """
+        Runs the workers of the given stages until `stop` is called, or, with
+        `stop_when_idle`, until no task is left for them.
+        """
+        self._stop.clear()
+        if PARSE_STAGE in stages:
+            self._parse_pool = ProcessPoolExecutor(max_workers=self.workers[PARSE_STAGE])
+        threads = [
+            threading.Thread(
+                target=self._work,
+                args=(stage, f"{self.worker_id_prefix}:{stage}:{index}", stop_when_idle),
+                daemon=True,
+            )
+            for stage in stages
+            for index in range(self.workers[stage])
+        ]
+        logging.info(
+            "Starting ingestion pipeline with "
+            + ", ".join(f"{self.workers[stage]} {stage} workers" for stage in stages)
+            + "."
+        )
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            self.stop()
+            for thread in threads:
+                thread.join()
+        finally:
+            if self._parse_pool is not None:
+                self._parse_pool.shutdown(cancel_futures=True)
+                self._parse_pool = None
+        for stage in stages:
+            stage_stats = self.stats[stage]
+            logging.info(
+                f"Stage {stage}: {stage_stats.processed} tasks processed, {stage_stats.failed} failed, "
+                f"{stage_stats.busy_seconds:.1f}s busy."
+            )
+
+    def stop(self):
+        self._stop.set()
+
+
+def enqueue_unparsed_filings(
+    forms: List[str] = sync_settings.forms, batch_size: int = 1000
+) -> int:
+    """
+    Enqueues every stored filing of the given forms that has not been parsed
+    yet, the filings of an entity oldest first.
+    """
+    filing_repo = SEC_FilingRepository(filings_collection)
+    task_repo = PipelineTaskRepository(pipeline_tasks_collection)
+    enqueued = 0
+    batch = []
+    for sec_filing in filing_repo.iter_filings(
+        {"is_parsed": False, "filing_metadata.form": {"$in": forms}},
+        METADATA_PROJECTION,
+        # Served by the index in reverse, the filings of an entity are enqueued oldest first
+        sort=[("filing_metadata.company_cik", DESCENDING), ("filing_metadata.filing_date", ASCENDING)],
+    ):
+        batch.append(sec_filing.filing_metadata)
+        if len(batch) >= batch_size:
+            enqueued += task_repo.enqueue(batch)
+            batch = []
+    enqueued += task_repo.enqueue(batch)
+    logging.info(f"Enqueued {enqueued} unparsed filings.")
+    return enqueued
+
+
+if __name__ == "__main__":
+    from services.daemon import setup_logging
+
+    def stage_workers(value: str):
+        stage, _, count = value.partition("=")
+        if stage not in STAGES or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"Expected <stage>=<count> with a stage of {STAGES}")
+        return stage, int(count)
+
+    parser = argparse.ArgumentParser(description="Run stages of the filing ingestion pipeline")
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run in this process"
+    )
+    parser.add_argument(
+        "--workers",
+        nargs="+",
+        type=stage_workers,
+        default=[],
+        help="Number of workers of a stage, e.g. parse=8",
+    )
+    parser.add_argument(
+        "--enqueue-unparsed", action="store_true", help="Enqueue the stored filings that are not parsed yet"
+    )
+    parser.add_argument(
+        "--requeue-dead", action="store_true", help="Retry the dead-lettered tasks of the given stages"
+    )
+    parser.add_argument(
+        "--drain", action="store_true", help="Stop once no task is left for the given stages"
+    )
+    args = parser.parse_args()
+    setup_logging()
+    ingest_pipeline = IngestPipeline(workers=dict(args.workers))
+    if args.enqueue_unparsed:
+        enqueue_unparsed_filings()
+    if args.requeue_dead:
+        for stage in args.stages:
+            ingest_pipeline.task_repo.requeue_dead(stage)
+    ingest_pipeline.run(args.stages, stop_when_idle=args.drain)
@@ -0,0 +1,9 @@
+from typing import List, Optional
+from modeling.parsers.SECFilingParser import Item, SEC_Filing_Parser
+
+
+def parse_filing_content(
+    content_html_str: str, form: Optional[str] = None, item_hints: Optional[List[str]] = None
+) -> List[Item]:
+    # Module level, so that it can be pickled and run in a worker process
+    return SEC_Filing_Parser.parse_filing_content(content_html_str, form, item_hints)
@@ -0,0 +1,354 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from pydantic import BaseModel, Field
+from config import scheduler_settings, sync_settings
+from data_repositories.public_entity_repo import PublicEntityRepository
+from data_repositories.sync_job_repo import SyncJobRepository
+from data_repositories.sync_state_repo import SyncStateRepository
+from data_repositories.discovery_state_repo import DiscoveryStateRepository
+from modeling.SyncJob import (
+    ADD_NEW_ENTITIES_JOB,
+    DAILY_INDEX_JOB,
+    PLAN_JOBS_JOB,
+    SYNC_ENTITY_JOB,
+    SyncJob,
+    entity_job_id,
+)
+from modeling.SyncState import SyncState
+from modeling.sec_edgar.client.SEC_Client import SEC_Client
+from modeling.sec_edgar.submissions.SubmissionsRequest import SubmissionsRequest
+from services.daily_index_discovery import DAILY_INDEX_SOURCE, discover_ciks_from_daily_indices
+from services.sync_engine import SyncEngine, run_in_thread
+from services.entity_leases import entity_lease_manager
+from services.update_db import add_new_entities
+from database import (
+    public_entity_collection,
+    sync_jobs_collection,
+    sync_state_collection,
+    discovery_state_collection,
+)
+
+# Due jobs with a higher priority are claimed first
+PLAN_JOBS_PRIORITY = 30
+DISCOVERY_PRIORITY = 20
+ACTIVE_ENTITY_PRIORITY = 10
+INACTIVE_ENTITY_PRIORITY = 0
+
+PLAN_JOBS_INTERVAL_SECONDS = 3600.0
+DISCOVERY_INTERVAL_SECONDS = 86400.0
+
+MAX_IDLE_SECONDS = 30.0
+
+
+class SchedulerStats(BaseModel):
+    queue_depth: int = Field(default=0, description="Number of due jobs waiting for a worker")
+    running: int = Field(default=0, description="Number of jobs with a live lease")
+    oldest_wait_seconds: float = Field(default=0.0, description="How long the most overdue job has been waiting")
+    completed: int = Field(default=0, description="Number of jobs run successfully by this scheduler")
+    failed: int = Field(default=0, description="Number of failed jobs, including the timed out ones")
+    timed_out: int = Field(default=0, description="Number of jobs cancelled after the job timeout")
+    total_wait_seconds: float = Field(default=0.0, description="Time that finished jobs spent due in the queue")
+    total_run_seconds: float = Field(default=0.0, description="Time that finished jobs spent running")
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        finished = self.completed + self.failed
+        return self.total_wait_seconds / finished if finished else 0.0
+
+    @property
+    def avg_run_seconds(self) -> float:
+        finished = self.completed + self.failed
+        return self.total_run_seconds / finished if finished else 0.0
+
+
+def is_active(sync_state: Optional[SyncState], active_since: date) -> bool:
+    if sync_state is None or sync_state.last_acceptance_date_time is None:
+        return False
+    return date.fromisoformat(sync_state.last_acceptance_date_time[:10]) >= active_since
+
+
+class JobScheduler:
+    """
+    Runs the work of the daemon as jobs on a persistent queue in MongoDB,
+    instead of one long run that is stuck behind its slowest entity.
+
+    Every tracked entity has its own recurring sync job. Entities that filed
+    recently are synced more often, and with a higher priority, than inactive
+    ones. Next to them, recurring jobs add new entities, read the daily index to
+    make the jobs of entities that filed due right away, and plan the jobs again
+    as entities come and go.
+
+    A pool of workers claims due jobs by priority. A job that runs longer than
+    the job timeout is cancelled and retried with exponential backoff, like a
+    failed one. It is cancelled where it waits, and only released once the
+    blocking call it waits for has returned; entity syncs also stop at the first
+    checkpoint after the timeout. Jobs keep their schedule across restarts: runs that were missed
+    while the daemon was down are caught up once, most overdue first.
+
+    Any number of daemons can share the queue, on different hosts. A worker
+    renews the lease of its running job with a heartbeat, so the jobs of a
+    daemon that died are taken over by the others once their lease expires. A
+    job whose lease was taken over is cancelled, so it never runs twice at once.
+    Entities themselves are synced under entity leases, see EntityLeaseManager.
+    """
+
+    def __init__(
+        self,
+        workers: int = scheduler_settings.workers,
+        job_timeout_seconds: float = scheduler_settings.job_timeout_seconds,
+        retry_backoff_seconds: float = scheduler_settings.retry_backoff_seconds,
+        client: Optional[SEC_Client] = None,
+    ):
+        self.workers = workers
+        self.job_timeout_seconds = job_timeout_seconds
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.job_repo = SyncJobRepository(sync_jobs_collection)
+        self.public_entity_repo = PublicEntityRepository(public_entity_collection)
+        self.sync_state_repo = SyncStateRepository(sync_state_collection)
+        self.discovery_state_repo = DiscoveryStateRepository(discovery_state_collection)
+        # Shared by all workers, so it caps the SEC requests in flight overall.
+        # It feeds new filings to the ingestion pipeline, which runs on its own.
+        self.sync_engine = SyncEngine(client=client)
+        self.worker_id_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._stats = SchedulerStats()
+        self._handlers: Dict[str, Callable[[SyncJob], Awaitable[None]]] = {
+            SYNC_ENTITY_JOB: self._sync_entity,
+            PLAN_JOBS_JOB: self._plan_jobs,
+            ADD_NEW_ENTITIES_JOB: self._add_new_entities,
+            DAILY_INDEX_JOB: self._discover_from_daily_index,
+        }
+
+    def plan_jobs(self) -> int:
+        """
+        Schedules the recurring jobs, with a sync job per tracked entity whose
+        priority and interval follow how active the entity is. Jobs of entities
+        that are no longer tracked are deleted. Returns the number of new jobs.
+        """
+        now = datetime.now(timezone.utc)
+        active_since = date.today() - timedelta(days=scheduler_settings.active_entity_days)
+        entities = self.public_entity_repo.get_all_entities()
+        sync_states = self.sync_state_repo.get_states()
+        jobs: List[SyncJob] = [
+            SyncJob(
+                job_id=PLAN_JOBS_JOB,
+                kind=PLAN_JOBS_JOB,
+                priority=PLAN_JOBS_PRIORITY,
+                interval_seconds=PLAN_JOBS_INTERVAL_SECONDS,
+                next_run_at=now + timedelta(seconds=PLAN_JOBS_INTERVAL_SECONDS),
+            ),
+            SyncJob(
+                job_id=ADD_NEW_ENTITIES_JOB,
+                kind=ADD_NEW_ENTITIES_JOB,
+                priority=DISCOVERY_PRIORITY,
+                interval_seconds=DISCOVERY_INTERVAL_SECONDS,
+                next_run_at=now,
+            ),
+            SyncJob(
+                job_id=DAILY_INDEX_JOB,
+                kind=DAILY_INDEX_JOB,
+                priority=DISCOVERY_PRIORITY,
+                interval_seconds=DISCOVERY_INTERVAL_SECONDS,
+                next_run_at=now,
+            ),
+        ]
+        for entity in entities:
+            active = is_active(sync_states.get(entity.cik), active_since)
+            jobs.append(
+                SyncJob(
+                    job_id=entity_job_id(entity.cik),
+                    kind=SYNC_ENTITY_JOB,
+                    cik=entity.cik,
+                    priority=ACTIVE_ENTITY_PRIORITY if active else INACTIVE_ENTITY_PRIORITY,
+                    interval_seconds=(
+                        scheduler_settings.active_entity_interval_seconds
+                        if active
+                        else scheduler_settings.inactive_entity_interval_seconds
+                    ),
+                    next_run_at=now,
+                )
+            )
+        new_jobs = self.job_repo.schedule_jobs(jobs)
+        untracked_job_ids = set(self.job_repo.get_jobs(SYNC_ENTITY_JOB)) - {
+            entity_job_id(entity.cik) for entity in entities
+        }
+        if untracked_job_ids:
+            self.job_repo.delete_jobs(list(untracked_job_ids))
+        return new_jobs
+
+    async def _sync_entity(self, job: SyncJob):
+        deadline = time.monotonic() + self.job_timeout_seconds
+        public_entity = await asyncio.to_thread(self.public_entity_repo.get_entity_by_cik, job.cik)
+        if public_entity is None:
+            # Deleted on the next planning of the jobs
+            return
+        try:
+            await self.sync_engine.sync_entity(public_entity, deadline=deadline)
+        except BaseException:
+            # Also on cancellation, a partly handled response must be fetched again
+            SubmissionsRequest.invalidate_cache(job.cik)
+            raise
+
+    async def _plan_jobs(self, job: SyncJob):
+        await run_in_thread(None, self.plan_jobs)
+
+    async def _add_new_entities(self, job: SyncJob):
+        await run_in_thread(None, add_new_entities)
+        await run_in_thread(None, self.plan_jobs)
+
+    def discover_from_daily_index(self) -> int:
+        """
+        Makes the sync jobs of the entities in the daily indices since the last
+        run due right away. Returns the number of jobs that were made due.
+        """
+        yesterday = date.today() - timedelta(days=1)
+        last_date = self.discovery_state_repo.get_last_date(DAILY_INDEX_SOURCE)
+        if last_date is None:
+            # The first run of every sync job is due right away anyway
+            self.discovery_state_repo.set_last_date(DAILY_INDEX_SOURCE, yesterday)
+            return 0
+        tracked_ciks = {entity.cik for entity in self.public_entity_repo.get_all_entities()}
+        ciks, last_published_day = discover_ciks_from_daily_indices(
+            tracked_ciks, since=last_date, until=yesterday, client=self.sync_engine.client
+        )
+        due_jobs = self.job_repo.run_now([entity_job_id(cik) for cik in ciks])
+        # The jobs are due on the queue now, a failed sync is retried from there
+        if last_published_day is not None:
+            self.discovery_state_repo.set_last_date(DAILY_INDEX_SOURCE, last_published_day)
+        logging.info(f"Made {due_jobs} sync jobs due from the daily indices.")
+        return due_jobs
+
+    async def _discover_from_daily_index(self, job: SyncJob):
+        await run_in_thread(None, self.discover_from_daily_index)
+
+    async def _heartbeat(self, job: SyncJob, job_run: asyncio.Future) -> bool:
+        """Renews the lease of a running job, and cancels the job once the lease was taken over."""
+        while True:
+            await asyncio.sleep(sync_settings.lease_heartbeat_seconds)
+            try:
+                renewed = await asyncio.to_thread(
+                    self.job_repo.extend_lease, job, sync_settings.lease_seconds
+                )
+            except Exception as e:
+                logging.error(f"Could not renew the lease of job {job.job_id}: {e}")
+                continue
+            if not renewed:
+                logging.warning(
+                    f"Lease of job {job.job_id} was taken over by another worker, cancelling it."
+                )
+                job_run.cancel()
+                return True
+
+    async def _run_job(self, job: SyncJob):
+        handler = self._handlers.get(job.kind)
+        start = time.perf_counter()
+        error = None
+        heartbeat = None
+        try:
+            if handler is None:
+                raise ValueError(f"Unknown job kind {job.kind}")
+            # A cancelled handler returns once its threads have, so the job is not
+            # released, or run by the worker that took it over, while any of its work still runs
+            job_run = asyncio.ensure_future(
+                asyncio.wait_for(handler(job), timeout=self.job_timeout_seconds)
+            )
+            heartbeat = asyncio.create_task(self._heartbeat(job, job_run))
+            await job_run
+        except asyncio.TimeoutError:
+            error = f"Timed out after {self.job_timeout_seconds:.0f}s"
+            self._stats.timed_out += 1
+        except asyncio.CancelledError:
+            if heartbeat is None or not heartbeat.done():
+                raise
+            # Cancelled by the heartbeat, the worker that took the job over releases it
+            self._stats.failed += 1
+            return
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+        job.last_duration_seconds = time.perf_counter() - start
+        self._stats.total_wait_seconds += job.last_wait_seconds or 0.0
+        self._stats.total_run_seconds += job.last_duration_seconds
+
+        now = datetime.now(timezone.utc)
+        if error is None:
+            await asyncio.to_thread(self.job_repo.complete_job, job, job.next_run_after(now))
+            self._stats.completed += 1
+            return
+        retry_delay = min(
+            self.retry_backoff_seconds * 2**job.attempts,
+            max(job.interval_seconds, self.retry_backoff_seconds),
+        )
+        await asyncio.to_thread(
+            self.job_repo.fail_job, job, error, now + timedelta(seconds=retry_delay)
+        )
+        self._stats.failed += 1
+        logging.error(f"Job {job.job_id} failed, retrying in {retry_delay:.0f}s: {error}")
+
+    async def _wait_for_due_job(self):
+        next_run_at = await asyncio.to_thread(self.job_repo.get_next_run_at)
+        delay = MAX_IDLE_SECONDS
+        if next_run_at is not None:
+            delay = (next_run_at - datetime.now(timezone.utc)).total_seconds()
+        # Expired leases are not in `next_run_at`, they are picked up within MAX_IDLE_SECONDS
+        await asyncio.sleep(min(max(delay, 1.0), MAX_IDLE_SECONDS))
+
+    async def _worker(self, worker_id: str):
+        lease_seconds = sync_settings.lease_seconds
+        while True:
+            try:
+                job = await asyncio.to_thread(self.job_repo.claim_due_job, worker_id, lease_seconds)
+            except Exception as e:
+                logging.error(f"Worker {worker_id} could not claim a job: {e}")
+                job = None
+            if job is None:
+                await self._wait_for_due_job()
+                continue
+            await self._run_job(job)
+
+    def stats(self) -> SchedulerStats:
+        stats = self._stats.model_copy()
+        stats.queue_depth = self.job_repo.count_due_jobs()
+        stats.running = self.job_repo.count_running_jobs()
+        next_run_at = self.job_repo.get_next_run_at()
+        if next_run_at is not None:
+            stats.oldest_wait_seconds = max(
+                0.0, (datetime.now(timezone.utc) - next_run_at).total_seconds()
+            )
+        return stats
+
+    async def _log_stats(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                stats = await asyncio.to_thread(self.stats)
+            except Exception as e:
+                logging.error(f"Could not read the job queue statistics: {e}")
+                continue
+            logging.info(
+                f"Job queue: {stats.queue_depth} due, {stats.running} running, "
+                f"oldest due for {stats.oldest_wait_seconds:.0f}s. "
+                f"Jobs: {stats.completed} completed, {stats.failed} failed ({stats.timed_out} timed out), "
+                f"{stats.avg_wait_seconds:.1f}s average wait, {stats.avg_run_seconds:.1f}s average run."
+            )
+
+    async def run_async(self):
+        await asyncio.to_thread(self.plan_jobs)
+        await asyncio.gather(
+            self._log_stats(scheduler_settings.stats_interval_seconds),
+            *(self._worker(f"{self.worker_id_prefix}:{index}") for index in range(self.workers)),
+        )
+
+    def run(self):
+        logging.info(f"Starting job scheduler {self.worker_id_prefix} with {self.workers} workers.")
+        try:
+            asyncio.run(self.run_async())
+        finally:
+            # Other daemons can take over the entities right away
+            entity_lease_manager.close()
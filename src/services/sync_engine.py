@@ -0,0 +1,259 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import date
+from typing import Callable, List, Optional
+from pydantic import BaseModel, Field
+from config import sync_settings
+from data_repositories.sec_filing_repo import SEC_FilingRepository
+from data_repositories.filing_content_store import FilingContentStore
+from data_repositories.sync_state_repo import SyncStateRepository
+from data_repositories.pipeline_task_repo import PipelineTaskRepository
+from modeling.sec_edgar.submissions.SubmissionsRequest import SubmissionsRequest
+from modeling.sec_edgar.submissions.SubmissionsResponse import SubmissionsResponse
+from modeling.sec_edgar.client.SEC_Client import SEC_Client, sec_client
+from modeling.PublicEntity import PublicEntity
+from modeling.SyncState import SyncState
+from modeling.filing.SEC_Filing import SEC_Filing
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+from services.entity_leases import EntityLeaseManager, entity_lease_manager
+from util import ImportantDates
+from database import (
+    filings_collection,
+    filing_contents_bucket,
+    sync_state_collection,
+    pipeline_tasks_collection,
+)
+
+
+async def run_in_thread(executor: Optional[Executor], func: Callable, *args, **kwargs):
+    """
+    Runs blocking work on a thread of the executor, or of the default one.
+    Unlike asyncio.to_thread, a cancelled caller only stops once the thread has
+    returned, since a thread cannot be stopped.
+    """
+    future = asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(func, *args, **kwargs)
+    )
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait([future])
+            except asyncio.CancelledError:
+                pass
+        if not future.cancelled():
+            # The caller is cancelled, an error of the thread goes nowhere
+            future.exception()
+        raise
+
+
+class SyncRunStats(BaseModel):
+    entities: int = Field(default=0, description="Number of entities that were synced")
+    failed_entities: int = Field(default=0, description="Number of entities that failed to sync")
+    filings: int = Field(default=0, description="Number of new filings that were stored")
+    elapsed_seconds: float = Field(default=0.0, description="Wall-clock duration of the run")
+
+    @property
+    def entities_per_second(self) -> float:
+        return self.entities / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def filings_per_second(self) -> float:
+        return self.filings / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def select_new_filing_metadatas(
+    submissions_response: SubmissionsResponse,
+    sync_state: Optional[SyncState],
+    forms: Optional[List[str]] = sync_settings.forms,
+) -> List[SEC_Filing_Metadata]:
+    """
+    Returns the filings of the given forms after the watermark of the sync
+    state, oldest first, so that every stored batch can be checkpointed.
+    """
+    filed_since = None
+    if sync_state is not None and sync_state.last_acceptance_date_time:
+        # A filing is never dated before the day it was accepted
+        filed_since = date.fromisoformat(sync_state.last_acceptance_date_time[:10])
+    new_filing_metadatas = [
+        filing_metadata
+        for filing_metadata in submissions_response.select_filing_metadatas(forms, filed_since)
+        if sync_state is None or sync_state.is_new(filing_metadata)
+    ]
+    return sorted(new_filing_metadatas, key=SyncState.watermark_of)
+
+
+def history_since(sync_state: Optional[SyncState]) -> date:
+    """Date from which older submissions pages are needed to sync an entity."""
+    if sync_state is not None and sync_state.last_acceptance_date_time:
+        return date.fromisoformat(sync_state.last_acceptance_date_time[:10])
+    return ImportantDates.MSTR_GENESIS_DATE.value
+
+
+def load_sync_state(
+    sync_state_repo: SyncStateRepository,
+    filing_repo: SEC_FilingRepository,
+    public_entity: PublicEntity,
+) -> Optional[SyncState]:
+    sync_state = sync_state_repo.get_state(public_entity.cik)
+    if sync_state is not None:
+        return sync_state
+    # No sync state yet: resume after the filings stored by earlier syncs
+    latest_filing_metadata = filing_repo.get_latest_filing_metadata_for(public_entity)
+    if latest_filing_metadata is None:
+        return None
+    sync_state_repo.checkpoint(public_entity.cik, latest_filing_metadata)
+    return SyncState(
+        cik=public_entity.cik,
+        last_accession_number=latest_filing_metadata.accession_number,
+        last_acceptance_date_time=latest_filing_metadata.acceptance_date_time,
+    )
+
+
+class SyncEngine:
+    """
+    Syncs SEC filings for many entities concurrently. Blocking SEC requests are
+    run on worker threads, with at most `max_concurrency` of them in flight.
+
+    New filings of an entity are stored in batches of `checkpoint_batch_size`,
+    oldest first, and the sync state of the entity is checkpointed after each
+    batch, so an interrupted run resumes after the last stored batch.
+
+    The sync only stores the metadata of filings. New filings are enqueued on
+    the ingestion pipeline, which fetches and parses their content.
+
+    An entity is only synced under its lease, so that daemons on several hosts
+    can share the tracked entities: an entity leased by another worker is
+    skipped, and a sync that lost its lease stops before its next write.
+
+    Blocking work runs on threads of the engine, not on the default executor
+    of the event loop. Cancelling a sync waits for its running threads, so that
+    nothing of it runs on once the sync has stopped and its lease is released.
+    A sync with a deadline stops at the first checkpoint after it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = sync_settings.max_concurrency,
+        client: Optional[SEC_Client] = None,
+        checkpoint_batch_size: int = sync_settings.checkpoint_batch_size,
+        task_repo: Optional[PipelineTaskRepository] = None,
+        lease_manager: EntityLeaseManager = entity_lease_manager,
+    ):
+        self.max_concurrency = max_concurrency
+        self.client = client or sec_client
+        self.checkpoint_batch_size = checkpoint_batch_size
+        self.filing_repo = SEC_FilingRepository(
+            filings_collection, FilingContentStore(filing_contents_bucket)
+        )
+        self.sync_state_repo = SyncStateRepository(sync_state_collection)
+        self.task_repo = task_repo or PipelineTaskRepository(pipeline_tasks_collection)
+        self.lease_manager = lease_manager
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Requests in flight, and the database work of as many entities
+        self._executor = ThreadPoolExecutor(
+            max_workers=2 * max_concurrency, thread_name_prefix="sync-engine"
+        )
+
+    async def _in_thread(self, func: Callable, *args, **kwargs):
+        return await run_in_thread(self._executor, func, *args, **kwargs)
+
+    async def _run_request(self, func: Callable, *args, **kwargs):
+        async with self._semaphore:
+            return await self._in_thread(func, *args, **kwargs)
+
+    async def sync_entity(self, public_entity: PublicEntity, deadline: Optional[float] = None) -> int:
+        """
+        Syncs the new filings of an entity, returns the number of stored ones.
+        Past the `deadline`, a time.monotonic() value, the sync raises a
+        TimeoutError at its next checkpoint.
+        """
+        cik = public_entity.cik
+        if self._semaphore is None:
+            # Syncing single entities outside of `run`, on a long-lived event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if not await self._in_thread(self.lease_manager.acquire, cik):
+            logging.info(f"Company CIK {cik} is synced by another worker, skipping it.")
+            return 0
+        try:
+            return await self._sync_leased_entity(public_entity, deadline)
+        finally:
+            await self._in_thread(self.lease_manager.release, cik)
+
+    async def _sync_leased_entity(self, public_entity: PublicEntity, deadline: Optional[float]) -> int:
+        cik = public_entity.cik
+        sync_state = await self._in_thread(
+            load_sync_state, self.sync_state_repo, self.filing_repo, public_entity
+        )
+        in_progress = sync_state is not None and sync_state.in_progress
+        # An interrupted sync has to go through the cached submissions again
+        submission_req = await self._run_request(
+            SubmissionsRequest.from_cik,
+            cik,
+            client=self.client,
+            skip_unmodified=not in_progress,
+            include_history=True,
+            history_since=history_since(sync_state),
+        )
+        if submission_req.not_modified:
+            logging.info(f"No new SEC filings for company CIK {cik}.")
+            return 0
+        new_filing_metadatas = select_new_filing_metadatas(
+            submission_req.resp_content, sync_state
+        )
+        logging.info(f"Found {len(new_filing_metadatas)} new SEC filings for company CIK {cik}.")
+        if new_filing_metadatas and not in_progress:
+            await self._in_thread(self.sync_state_repo.mark_started, cik)
+        inserted = 0
+        for start in range(0, len(new_filing_metadatas), self.checkpoint_batch_size):
+            if deadline is not None and time.monotonic() > deadline:
+                # The next sync resumes after the last checkpoint
+                raise TimeoutError(
+                    f"Sync of company CIK {cik} ran past its deadline after {inserted} new filings."
+                )
+            batch = new_filing_metadatas[start : start + self.checkpoint_batch_size]
+            if not self.lease_manager.is_held(cik):
+                raise RuntimeError(f"Lost the lease on company CIK {cik}, another worker syncs it now.")
+            write_result = await self._in_thread(
+                self.filing_repo.add_filings,
+                [SEC_Filing(filing_metadata=filing_metadata) for filing_metadata in batch],
+            )
+            # Enqueued before the checkpoint, so a crash in between enqueues them on the next sync
+            await self._in_thread(self.task_repo.enqueue, batch)
+            await self._in_thread(self.sync_state_repo.checkpoint, cik, batch[-1])
+            inserted += write_result.inserted
+        if new_filing_metadatas or in_progress:
+            await self._in_thread(self.sync_state_repo.mark_completed, cik)
+        logging.info(f"Synced SEC filings for company CIK {cik}.")
+        return inserted
+
+    async def _sync_entity_safe(self, public_entity: PublicEntity, stats: SyncRunStats):
+        try:
+            new_filings = await self.sync_entity(public_entity)
+            stats.filings += new_filings
+            stats.entities += 1
+        except Exception as e:
+            SubmissionsRequest.invalidate_cache(public_entity.cik)
+            stats.failed_entities += 1
+            logging.error(
+                f"Error updating SEC filings for company CIK {public_entity.cik}: {e}"
+            )
+
+    async def run(self, public_entities: List[PublicEntity]) -> SyncRunStats:
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        stats = SyncRunStats()
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(self._sync_entity_safe(entity, stats) for entity in public_entities)
+        )
+        stats.elapsed_seconds = time.perf_counter() - start
+        logging.info(
+            f"Synced {stats.entities} entities ({stats.entities_per_second:.2f} entities/s) "
+            f"and {stats.filings} filings ({stats.filings_per_second:.2f} filings/s) "
+            f"in {stats.elapsed_seconds:.1f}s, {stats.failed_entities} entities failed."
+        )
+        return stats
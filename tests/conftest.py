@@ -0,0 +1,47 @@
+import os
+import sys
+import tempfile
+import mongomock
+import mongomock.gridfs
+import pymongo
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+# Settings are read from the environment on import, local state goes to a scratch directory
+SCRATCH_DIR = tempfile.mkdtemp(prefix="saylor-treasury-tests-")
+for name, value in {
+    "MONGODB_URI": "mongodb://localhost:27017",
+    "MONGODB_DB_NAME": "test",
+    "MONGODB_COLLECTION_ENTITIES": "public_entities",
+    "MONGODB_COLLECTION_8K_FILINGS": "8k_filings",
+    "MONGODB_COLLECTION_BTC_PURCHASES": "btc_purchases",
+    "SEC_USER_AGENT": "saylor-treasury-tests",
+    "SEC_USER_AGENT_EMAIL": "tests@example.com",
+    "SEC_RATE_LIMIT_STATE_PATH": os.path.join(SCRATCH_DIR, "rate_limit_state"),
+    "SEC_HTTP_CACHE_DIR": os.path.join(SCRATCH_DIR, "http_cache"),
+    "FILING_ARCHIVE_DIR": os.path.join(SCRATCH_DIR, "filing_archive"),
+    "SUMMARY_CACHE_PATH": os.path.join(SCRATCH_DIR, "summary_cache.sqlite3"),
+}.items():
+    os.environ[name] = value
+
+# The database module connects on import, the tests run it against mongomock
+pymongo.MongoClient = mongomock.MongoClient
+# Lets GridFS accept mongomock databases, so the filing content bucket can be created
+mongomock.gridfs.enable_gridfs_integration()
+# mongomock has no query planner, every query passes the index check of the database module
+mongomock.collection.Cursor.explain = lambda self: {
+    "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+}
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+@pytest.fixture(autouse=True)
+def empty_collections():
+    """Every test starts with empty collections, their indexes are kept."""
+    import database
+
+    for coll_name in database.COLLECTION_INDEXES:
+        database.db[coll_name].delete_many({})
+    yield
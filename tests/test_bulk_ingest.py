@@ -0,0 +1,88 @@
+import os
+import pytest
+from conftest import FIXTURES_DIR
+from data_repositories.public_entity_repo import PublicEntityRepository
+from data_repositories.sec_filing_repo import SEC_FilingRepository
+from data_repositories.sync_state_repo import SyncStateRepository
+from modeling.PublicEntity import PublicEntity
+from services.bulk_ingest import ingest_submissions_zip, iter_submissions_zip
+from database import (
+    public_entity_collection,
+    filings_collection,
+    sync_state_collection,
+    pipeline_tasks_collection,
+)
+
+SUBMISSIONS_ZIP = os.path.join(FIXTURES_DIR, "submissions.zip")
+MSTR = PublicEntity(name="MicroStrategy Inc", ticker="MSTR", cik="0001050446")
+
+
+@pytest.fixture
+def public_entity_repo():
+    repo = PublicEntityRepository(public_entity_collection)
+    repo.add_entity(MSTR)
+    return repo
+
+
+def stored_accession_numbers(cik: str):
+    filing_repo = SEC_FilingRepository(filings_collection)
+    return sorted(
+        filing.filing_metadata.accession_number
+        for filing in filing_repo.iter_filings({"filing_metadata.company_cik": cik})
+    )
+
+
+def test_merges_history_page_into_submissions():
+    submissions_response, public_entity = next(iter_submissions_zip(SUBMISSIONS_ZIP, ciks={MSTR.cik}))
+
+    assert public_entity == MSTR
+    assert submissions_response.history_files == []
+    assert len(submissions_response.filings) == 5
+
+
+def test_ingests_synced_forms_of_tracked_entities(public_entity_repo):
+    stats = ingest_submissions_zip(SUBMISSIONS_ZIP)
+
+    assert stats.entities == 1
+    assert stats.filings == 4
+    assert stats.untracked_entities == 0
+    # The 10-Q is skipped, the two 8-Ks of the history page are stored
+    assert stored_accession_numbers(MSTR.cik) == [
+        "000095017024119780",
+        "000095017024140117",
+        "000156459020037751",
+        "000156459020043171",
+    ]
+    assert stored_accession_numbers("0000999001") == []
+    sync_state = SyncStateRepository(sync_state_collection).get_state(MSTR.cik)
+    assert sync_state.last_accession_number == "000095017024140117"
+
+
+def test_enqueues_stored_filings_on_the_pipeline(public_entity_repo):
+    ingest_submissions_zip(SUBMISSIONS_ZIP)
+
+    task_ids = sorted(task["task_id"] for task in pipeline_tasks_collection.find())
+    assert task_ids == stored_accession_numbers(MSTR.cik)
+
+
+def test_rerun_writes_nothing(public_entity_repo):
+    ingest_submissions_zip(SUBMISSIONS_ZIP)
+
+    stats = ingest_submissions_zip(SUBMISSIONS_ZIP)
+
+    assert stats.entities == 1
+    assert stats.filings == 0
+    assert filings_collection.count_documents({}) == 4
+    assert pipeline_tasks_collection.count_documents({}) == 4
+
+
+def test_all_entities_are_stored_but_not_tracked(public_entity_repo):
+    stats = ingest_submissions_zip(SUBMISSIONS_ZIP, tracked_only=False)
+
+    assert stats.entities == 3
+    assert stats.filings == 5
+    assert stats.untracked_entities == 1
+    assert stored_accession_numbers("0000999001") == ["000099900124000002"]
+    # The untracked entity lists the ticker of MSTR, the tracked entities stay as they were
+    assert public_entity_repo.get_all_entities() == [MSTR]
+    assert public_entity_repo.get_entity_by_ticker("MSTR") == MSTR
@@ -0,0 +1,60 @@
+from datetime import date
+import pytest
+import requests
+from modeling.sec_edgar.daily_index.DailyIndex import DailyIndex
+from services.daily_index_discovery import discover_ciks_from_daily_indices
+
+MASTER_INDEX = b"""Description:           Daily Index of EDGAR Dissemination Feed by Company Name
+Last Data Received:    December 16, 2024
+
+CIK|Company Name|Form Type|Date Filed|File Name
+--------------------------------------------------------------------------------
+1050446|MicroStrategy Inc|8-K|20241216|edgar/data/1050446/0000950170-24-140117.txt
+1050446|MicroStrategy Inc|4|20241216|edgar/data/1050446/0001050446-24-000181.txt
+999001|Old Ticker Holdings|8-K|20241216|edgar/data/999001/0000999001-24-000003.txt
+"""
+
+
+class StubClient:
+    """Answers every request for an index with the status code of its day."""
+
+    def __init__(self, status_codes):
+        self.status_codes = status_codes
+
+    def get(self, url: str) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = self.status_codes.get(url, 200)
+        response._content = MASTER_INDEX if response.status_code == 200 else b""
+        return response
+
+
+def test_parses_master_index():
+    daily_index = DailyIndex.fetch(date(2024, 12, 16), client=StubClient({}))
+
+    assert [entry.cik for entry in daily_index.entries] == ["0001050446", "0001050446", "0000999001"]
+    assert daily_index.entries[0].date_filed == "2024-12-16"
+    assert daily_index.entries[0].accession_number == "0000950170-24-140117"
+
+
+def test_missing_index_is_skipped():
+    holiday = date(2024, 12, 25)
+    client = StubClient({DailyIndex.get_url(holiday): 404})
+
+    assert DailyIndex.fetch(holiday, client=client) is None
+    ciks, last_published_day = discover_ciks_from_daily_indices(
+        {"0001050446"}, since=date(2024, 12, 24), until=date(2024, 12, 26), client=client
+    )
+    assert ciks == {"0001050446"}
+    assert last_published_day == date(2024, 12, 26)
+
+
+def test_forbidden_index_raises():
+    throttled_day = date(2024, 12, 16)
+    client = StubClient({DailyIndex.get_url(throttled_day): 403})
+
+    # A throttled day must not be skipped, or discovery would move past its filings
+    with pytest.raises(requests.HTTPError):
+        discover_ciks_from_daily_indices(
+            {"0001050446"}, since=date(2024, 12, 13), until=date(2024, 12, 17), client=client
+        )
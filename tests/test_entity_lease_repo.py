@@ -0,0 +1,110 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from data_repositories.entity_lease_repo import EntityLeaseRepository
+from services.entity_leases import EntityLeaseManager
+from database import entity_leases_collection
+
+MSTR_CIK = "0001050446"
+OTHER_CIK = "0000999001"
+
+
+@pytest.fixture
+def lease_repo():
+    return EntityLeaseRepository(entity_leases_collection)
+
+
+def expire(cik: str):
+    entity_leases_collection.update_one(
+        {"cik": cik}, {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+    )
+
+
+def owners(lease_repo: EntityLeaseRepository) -> dict:
+    return {lease.cik: lease.owner for lease in lease_repo.get_leases()}
+
+
+def test_lease_held_by_a_live_owner_cannot_be_acquired(lease_repo):
+    assert lease_repo.acquire(MSTR_CIK, "host-a", 60)
+
+    assert not lease_repo.acquire(MSTR_CIK, "host-b", 60)
+    # Its owner acquires it again, which renews it
+    assert lease_repo.acquire(MSTR_CIK, "host-a", 60)
+    assert owners(lease_repo) == {MSTR_CIK: "host-a"}
+
+
+def test_expired_and_released_leases_are_taken_over(lease_repo):
+    lease_repo.acquire(MSTR_CIK, "host-a", 60)
+    lease_repo.acquire(OTHER_CIK, "host-a", 60)
+
+    expire(MSTR_CIK)
+    assert lease_repo.acquire(MSTR_CIK, "host-b", 60)
+    assert lease_repo.release(OTHER_CIK, "host-a")
+    assert lease_repo.acquire(OTHER_CIK, "host-b", 60)
+
+    assert owners(lease_repo) == {MSTR_CIK: "host-b", OTHER_CIK: "host-b"}
+    # The former owner neither renews nor releases them
+    assert lease_repo.renew([MSTR_CIK, OTHER_CIK], "host-a", 60) == set()
+    assert not lease_repo.release(MSTR_CIK, "host-a")
+
+
+def test_renew_keeps_expired_leases_nobody_took_over(lease_repo):
+    lease_repo.acquire(MSTR_CIK, "host-a", 60)
+    lease_repo.acquire(OTHER_CIK, "host-a", 60)
+    expire(MSTR_CIK)
+
+    assert lease_repo.renew([MSTR_CIK, OTHER_CIK], "host-a", 60) == {MSTR_CIK, OTHER_CIK}
+    assert lease_repo.renew([], "host-a", 60) == set()
+    lease = next(lease for lease in lease_repo.get_leases() if lease.cik == MSTR_CIK)
+    assert lease.lease_until > datetime.now(timezone.utc)
+    assert not lease_repo.acquire(MSTR_CIK, "host-b", 60)
+
+
+def test_release_all_frees_the_leases_of_an_owner(lease_repo):
+    lease_repo.acquire(MSTR_CIK, "host-a", 60)
+    lease_repo.acquire(OTHER_CIK, "host-b", 60)
+
+    assert lease_repo.release_all("host-a") == 1
+
+    assert owners(lease_repo) == {MSTR_CIK: None, OTHER_CIK: "host-b"}
+
+
+def test_manager_leases_an_entity_to_one_worker_and_drops_lost_leases(lease_repo):
+    lease_manager = EntityLeaseManager(lease_repo, owner="host-a", lease_seconds=60, heartbeat_seconds=3600)
+    try:
+        assert lease_manager.acquire(MSTR_CIK)
+        # Another worker of the same daemon does not get the entity
+        assert not lease_manager.acquire(MSTR_CIK)
+        assert lease_manager.is_held(MSTR_CIK)
+
+        expire(MSTR_CIK)
+        assert lease_repo.acquire(MSTR_CIK, "host-b", 60)
+        lease_manager.heartbeat()
+        assert not lease_manager.is_held(MSTR_CIK)
+
+        assert lease_manager.acquire(OTHER_CIK)
+    finally:
+        lease_manager.close()
+    assert owners(lease_repo) == {MSTR_CIK: "host-b", OTHER_CIK: None}
+
+
+class UnreachableLeaseRepository(EntityLeaseRepository):
+    def renew(self, ciks, owner, lease_seconds):
+        raise ConnectionError("MongoDB is unreachable")
+
+
+def test_manager_stops_holding_leases_it_could_not_renew():
+    lease_manager = EntityLeaseManager(
+        UnreachableLeaseRepository(entity_leases_collection),
+        owner="host-a",
+        lease_seconds=0.2,
+        heartbeat_seconds=0.05,
+    )
+    try:
+        assert lease_manager.acquire(MSTR_CIK)
+        assert lease_manager.is_held(MSTR_CIK)
+        time.sleep(0.3)
+        # The lease expired in the meantime, another daemon may hold it now
+        assert not lease_manager.is_held(MSTR_CIK)
+    finally:
+        lease_manager.close()
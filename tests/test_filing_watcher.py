@@ -0,0 +1,107 @@
+import functools
+import http.server
+import json
+import os
+import shutil
+import threading
+import time
+import pytest
+from conftest import FIXTURES_DIR
+from config import sec_edgar_settings
+from data_repositories.public_entity_repo import PublicEntityRepository
+from modeling.PublicEntity import PublicEntity
+from modeling.sec_edgar.client.ResponseCache import ResponseCache
+from services.filing_watcher import FilingWatcher
+from database import public_entity_collection, filings_collection
+
+MSTR = PublicEntity(name="MicroStrategy Inc", ticker="MSTR", cik="0001050446")
+FEED_ACCESSION_NUMBER = "0000950170-24-140117"
+
+
+class QuietRequestHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FeedStandIn:
+    """Serves the latest filings feed and the submissions of entities from a local directory."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.revision = 0
+        os.makedirs(os.path.join(root_dir, "submissions"))
+        shutil.copy(os.path.join(FIXTURES_DIR, "current_filings.atom"), os.path.join(root_dir, "feed.atom"))
+        handler = functools.partial(QuietRequestHandler, directory=root_dir)
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def set_submissions(self, cik: str, accession_numbers):
+        count = len(accession_numbers)
+        path = os.path.join(self.root_dir, "submissions", f"CIK{cik}.json")
+        recent = {
+            "accessionNumber": accession_numbers,
+            "filingDate": ["2024-12-16"] * count,
+            "acceptanceDateTime": ["2024-12-16T13:02:11.000Z"] * count,
+            "form": ["8-K"] * count,
+            "items": ["7.01,8.01"] * count,
+            "primaryDocument": ["mstr-20241216.htm"] * count,
+        }
+        with open(path, "w") as f:
+            json.dump({"cik": str(int(cik)), "name": MSTR.name, "filings": {"recent": recent, "files": []}}, f)
+        # The server revalidates by modification time, which has to move on every change
+        self.revision += 1
+        modified_at = time.time() + self.revision
+        os.utime(path, (modified_at, modified_at))
+
+
+@pytest.fixture
+def feed_stand_in(tmp_path, monkeypatch):
+    stand_in = FeedStandIn(str(tmp_path / "www"))
+    monkeypatch.setattr(
+        sec_edgar_settings, "base_entity_submissions_url", f"{stand_in.url}/submissions/"
+    )
+    PublicEntityRepository(public_entity_collection).add_entity(MSTR)
+    yield stand_in
+    stand_in.server.shutdown()
+
+
+def stored_accession_numbers():
+    return sorted(filing["filing_metadata"]["accession_number"] for filing in filings_collection.find())
+
+
+def test_syncs_tracked_filing_once_submissions_list_it(feed_stand_in, tmp_path):
+    watcher = FilingWatcher(
+        feed_url=f"{feed_stand_in.url}/feed.atom", cache=ResponseCache(str(tmp_path / "feed_cache"))
+    )
+    # The submissions lag behind the feed
+    feed_stand_in.set_submissions(MSTR.cik, [])
+
+    assert watcher.poll_once() == 0
+    # Only the 8-K of the tracked entity is matched, not its Form 4 or the 8-K of an untracked entity
+    assert list(watcher._pending) == [FEED_ACCESSION_NUMBER.replace("-", "")]
+    assert stored_accession_numbers() == []
+
+    feed_stand_in.set_submissions(MSTR.cik, [FEED_ACCESSION_NUMBER])
+
+    # The feed is unchanged, the pending filing is synced nonetheless
+    assert watcher.poll_once() == 1
+    assert watcher._pending == {}
+    assert stored_accession_numbers() == [FEED_ACCESSION_NUMBER.replace("-", "")]
+
+    # Entries that were seen before are not matched again
+    assert watcher.poll_once() == 0
+    assert watcher._pending == {}
+
+
+def test_leaves_filing_to_daily_sync_after_pending_seconds(feed_stand_in):
+    watcher = FilingWatcher(feed_url=f"{feed_stand_in.url}/feed.atom", pending_seconds=0.0, cache=None)
+    feed_stand_in.set_submissions(MSTR.cik, [])
+
+    watcher.poll_once()
+    assert len(watcher._pending) == 1
+
+    time.sleep(0.01)
+    watcher.poll_once()
+    assert watcher._pending == {}
+    assert stored_accession_numbers() == []
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from modeling.PipelineTask import EXTRACT_STAGE, PARSE_STAGE, STORE_STAGE, TASK_PENDING
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+from services.ingest_pipeline import IngestPipeline
+from database import pipeline_tasks_collection
+
+CIK = "0000999101"
+BOILERPLATE = "Forward-looking statements are subject to risks and uncertainties."
+
+
+def filing_metadata(accession_number: str, acceptance_date_time: str) -> SEC_Filing_Metadata:
+    fields = {name: None for name in SEC_Filing_Metadata.model_fields}
+    fields.update(
+        company_cik=CIK,
+        accession_number=accession_number,
+        filing_date=acceptance_date_time[:10],
+        acceptance_date_time=acceptance_date_time,
+        form="8-K",
+        items=["8.01"],
+        primary_document="filing.htm",
+    )
+    return SEC_Filing_Metadata(**fields)
+
+
+def move_to(task_id: str, stage: str, paragraphs: list):
+    pipeline_tasks_collection.update_one(
+        {"task_id": task_id},
+        {
+            "$set": {
+                "stage": stage,
+                "status": TASK_PENDING,
+                "available_at": datetime.now(timezone.utc),
+                "items": [{"code": None, "subtitles": [], "summary": paragraphs}],
+            }
+        },
+    )
+
+
+def test_extracts_the_filings_of_an_entity_oldest_first():
+    ingest_pipeline = IngestPipeline(poll_seconds=60.0)
+    older = filing_metadata("000099910124000001", "2024-12-16T13:02:11.000Z")
+    newer = filing_metadata("000099910124000002", "2024-12-23T13:01:40.000Z")
+    ingest_pipeline.task_repo.enqueue([newer, older])
+    move_to(older.accession_number, PARSE_STAGE, [BOILERPLATE, "Older news."])
+    move_to(newer.accession_number, EXTRACT_STAGE, [BOILERPLATE, "Newer news."])
+
+    # The older filing is still being parsed, the newer one waits for it
+    assert ingest_pipeline.process_one(EXTRACT_STAGE, "worker")
+    deferred_task = ingest_pipeline.task_repo.get_task(newer.accession_number)
+    assert deferred_task.stage == EXTRACT_STAGE
+    assert deferred_task.status == TASK_PENDING
+    assert deferred_task.attempts == 0
+    assert deferred_task.available_at > datetime.now(timezone.utc)
+    assert not ingest_pipeline.process_one(EXTRACT_STAGE, "worker")
+
+    move_to(older.accession_number, EXTRACT_STAGE, [BOILERPLATE, "Older news."])
+    assert ingest_pipeline.process_one(EXTRACT_STAGE, "worker")
+    pipeline_tasks_collection.update_one(
+        {"task_id": newer.accession_number}, {"$set": {"available_at": datetime.now(timezone.utc)}}
+    )
+    assert ingest_pipeline.process_one(EXTRACT_STAGE, "worker")
+
+    older_task = ingest_pipeline.task_repo.get_task(older.accession_number)
+    newer_task = ingest_pipeline.task_repo.get_task(newer.accession_number)
+    assert older_task.stage == newer_task.stage == STORE_STAGE
+    assert older_task.new_paragraphs == [BOILERPLATE, "Older news."]
+    assert newer_task.new_paragraphs == ["Newer news."]
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from data_repositories.pipeline_task_repo import PipelineTaskRepository
+from modeling.PipelineTask import (
+    DONE_STAGE,
+    EXTRACT_STAGE,
+    FETCH_STAGE,
+    PARSE_STAGE,
+    STAGES,
+    STORE_STAGE,
+    TASK_DEAD,
+    TASK_DONE,
+    TASK_LEASED,
+    TASK_PENDING,
+)
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+from database import pipeline_tasks_collection
+
+CIK = "0001050446"
+
+
+def filing_metadata(accession_number: str, acceptance_date_time: str) -> SEC_Filing_Metadata:
+    fields = {name: None for name in SEC_Filing_Metadata.model_fields}
+    fields.update(
+        company_cik=CIK,
+        accession_number=accession_number,
+        filing_date=acceptance_date_time[:10],
+        acceptance_date_time=acceptance_date_time,
+        form="8-K",
+        primary_document="mstr.htm",
+    )
+    return SEC_Filing_Metadata(**fields)
+
+
+OLDER = filing_metadata("000095017024140117", "2024-12-16T13:02:11.000Z")
+NEWER = filing_metadata("000095017024141505", "2024-12-23T13:01:40.000Z")
+
+
+@pytest.fixture
+def task_repo():
+    return PipelineTaskRepository(pipeline_tasks_collection)
+
+
+def set_fields(task_id: str, **fields):
+    pipeline_tasks_collection.update_one({"task_id": task_id}, {"$set": fields})
+
+
+def test_enqueue_adds_each_filing_once(task_repo):
+    assert task_repo.enqueue([OLDER, NEWER]) == 2
+    task_repo.claim(FETCH_STAGE, "worker", 60)
+
+    assert task_repo.enqueue([OLDER, NEWER]) == 0
+    assert task_repo.enqueue([]) == 0
+    # Enqueuing again leaves the tasks where they are
+    assert task_repo.count_by_stage() == {FETCH_STAGE: {TASK_LEASED: 1, TASK_PENDING: 1}}
+
+
+def test_claims_the_longest_available_task(task_repo):
+    task_repo.enqueue([OLDER, NEWER])
+    now = datetime.now(timezone.utc)
+    set_fields(OLDER.accession_number, available_at=now - timedelta(seconds=10))
+    set_fields(NEWER.accession_number, available_at=now - timedelta(seconds=20))
+
+    task = task_repo.claim(FETCH_STAGE, "worker", 60)
+
+    assert task.task_id == NEWER.accession_number
+    assert task.status == TASK_LEASED
+    assert task.locked_by == "worker"
+    assert task_repo.claim(FETCH_STAGE, "other", 60).task_id == OLDER.accession_number
+    assert task_repo.claim(FETCH_STAGE, "other", 60) is None
+    assert task_repo.claim(PARSE_STAGE, "other", 60) is None
+
+
+def test_expired_lease_is_claimed_again(task_repo):
+    task_repo.enqueue([OLDER])
+    task = task_repo.claim(FETCH_STAGE, "worker", 60)
+    set_fields(task.task_id, locked_until=datetime.now(timezone.utc) - timedelta(seconds=1))
+
+    taken_over = task_repo.claim(FETCH_STAGE, "other", 60)
+
+    assert taken_over.task_id == task.task_id
+    assert taken_over.locked_by == "other"
+    # The worker whose lease expired can no longer hand the task on
+    assert not task_repo.advance(task)
+    assert task_repo.advance(taken_over)
+    assert task_repo.get_task(task.task_id).stage == PARSE_STAGE
+
+
+def test_advance_hands_the_output_to_each_stage_in_turn(task_repo):
+    task_repo.enqueue([OLDER])
+    outputs = {
+        FETCH_STAGE: {},
+        PARSE_STAGE: {"items": [{"code": None, "subtitles": [], "summary": ["News."]}]},
+        EXTRACT_STAGE: {"new_paragraphs": ["News."]},
+    }
+    for stage in STAGES:
+        task = task_repo.claim(stage, "worker", 60)
+        assert task.stage == stage
+        assert task_repo.advance(task, outputs.get(stage, {"items": None, "new_paragraphs": None}))
+        if stage == PARSE_STAGE:
+            assert task_repo.get_task(task.task_id).items[0].summary == ["News."]
+
+    task = task_repo.get_task(OLDER.accession_number)
+    assert task.stage == DONE_STAGE
+    assert task.status == TASK_DONE
+    assert task.locked_by is None
+    assert task.items is None
+
+
+def test_failed_attempts_back_off_and_are_dead_lettered(task_repo):
+    task_repo.enqueue([OLDER])
+
+    task = task_repo.claim(FETCH_STAGE, "worker", 60)
+    assert task_repo.fail(task, "HTTP 503", max_attempts=2, retry_backoff_seconds=30)
+    retried = task_repo.get_task(task.task_id)
+    assert retried.status == TASK_PENDING
+    assert retried.attempts == 1
+    assert retried.last_error == "HTTP 503"
+    assert retried.available_at > datetime.now(timezone.utc) + timedelta(seconds=20)
+    assert task_repo.claim(FETCH_STAGE, "worker", 60) is None
+
+    set_fields(task.task_id, available_at=datetime.now(timezone.utc))
+    task = task_repo.claim(FETCH_STAGE, "worker", 60)
+    assert task_repo.fail(task, "HTTP 503", max_attempts=2, retry_backoff_seconds=30)
+    assert task_repo.get_task(task.task_id).status == TASK_DEAD
+    assert task_repo.count_unfinished([FETCH_STAGE]) == 0
+
+    assert task_repo.requeue_dead(PARSE_STAGE) == 0
+    assert task_repo.requeue_dead(FETCH_STAGE) == 1
+    requeued = task_repo.claim(FETCH_STAGE, "worker", 60)
+    assert requeued.attempts == 0
+
+
+def test_defer_does_not_count_an_attempt(task_repo):
+    task_repo.enqueue([OLDER])
+    task = task_repo.claim(FETCH_STAGE, "worker", 60)
+
+    assert task_repo.defer(task, 60)
+
+    deferred = task_repo.get_task(task.task_id)
+    assert deferred.status == TASK_PENDING
+    assert deferred.attempts == 0
+    assert deferred.locked_by is None
+    assert task_repo.claim(FETCH_STAGE, "worker", 60) is None
+
+
+def test_earlier_unfinished_tasks_of_the_entity(task_repo):
+    same_time = filing_metadata("000095017024141506", NEWER.acceptance_date_time)
+    task_repo.enqueue([OLDER, NEWER, same_time])
+    extract_stages = [FETCH_STAGE, PARSE_STAGE, EXTRACT_STAGE]
+    older_task, newer_task, same_time_task = (
+        task_repo.get_task(metadata.accession_number) for metadata in (OLDER, NEWER, same_time)
+    )
+
+    assert not task_repo.has_earlier_unfinished(older_task, extract_stages)
+    assert task_repo.has_earlier_unfinished(newer_task, extract_stages)
+
+    # Dead-lettered tasks and tasks past the stages do not count
+    set_fields(OLDER.accession_number, status=TASK_DEAD)
+    assert not task_repo.has_earlier_unfinished(newer_task, extract_stages)
+    set_fields(OLDER.accession_number, status=TASK_PENDING, stage=STORE_STAGE)
+    assert not task_repo.has_earlier_unfinished(newer_task, extract_stages)
+
+    # Filings accepted at the same time are ordered by accession number
+    assert task_repo.has_earlier_unfinished(same_time_task, extract_stages)
+    set_fields(NEWER.accession_number, stage=STORE_STAGE)
+    assert not task_repo.has_earlier_unfinished(same_time_task, extract_stages)
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+from config import sync_settings
+from data_repositories.sync_job_repo import SyncJobRepository
+from modeling.SyncJob import JOB_RUNNING, SyncJob
+from services.scheduler import JobScheduler
+from services.sync_engine import run_in_thread
+from database import sync_jobs_collection
+
+
+def test_job_whose_lease_was_taken_over_is_cancelled(monkeypatch):
+    monkeypatch.setattr(sync_settings, "lease_heartbeat_seconds", 0.05)
+    scheduler = JobScheduler(workers=1)
+    job_repo = SyncJobRepository(sync_jobs_collection)
+    job_repo.schedule_jobs(
+        [SyncJob(job_id="slow", kind="slow", interval_seconds=60, next_run_at=datetime.now(timezone.utc))]
+    )
+    job = job_repo.claim_due_job("worker", lease_seconds=60)
+    work_finished = threading.Event()
+
+    def slow_work():
+        time.sleep(0.3)
+        work_finished.set()
+
+    async def slow_job(job: SyncJob):
+        await run_in_thread(None, slow_work)
+        # Not reached, the job is cancelled while the work runs
+        sync_jobs_collection.update_one({"job_id": job.job_id}, {"$set": {"last_error": "ran on"}})
+
+    scheduler._handlers["slow"] = slow_job
+    # Another worker takes the job over, as if the lease had expired
+    sync_jobs_collection.update_one({"job_id": "slow"}, {"$set": {"locked_by": "other"}})
+
+    asyncio.run(scheduler._run_job(job))
+
+    # The job returned once its work had, and left the job to the other worker
+    assert work_finished.is_set()
+    taken_over = job_repo.get_job("slow")
+    assert taken_over.status == JOB_RUNNING
+    assert taken_over.locked_by == "other"
+    assert taken_over.last_error is None
+    assert scheduler.stats().failed == 1
@@ -0,0 +1,51 @@
+from pymongo import UpdateOne
+from data_repositories.sec_filing_repo import SEC_FilingRepository
+from modeling.filing.SEC_Filing import SEC_Filing
+from modeling.filing.SEC_Filing_Metadata import SEC_Filing_Metadata
+from database import filings_collection
+
+CIK = "0001050446"
+
+
+def sec_filing(accession_number: str, **fields) -> SEC_Filing:
+    metadata_fields = {name: None for name in SEC_Filing_Metadata.model_fields}
+    metadata_fields.update(
+        company_cik=CIK,
+        accession_number=accession_number,
+        filing_date="2024-12-16",
+        acceptance_date_time="2024-12-16T13:02:11.000Z",
+        form="8-K",
+        primary_document="mstr.htm",
+    )
+    return SEC_Filing(filing_metadata=SEC_Filing_Metadata(**metadata_fields), **fields)
+
+
+def test_updates_only_set_the_changed_fields():
+    filing_repo = SEC_FilingRepository(filings_collection)
+    filing_repo.add_filings([sec_filing("000095017024140117"), sec_filing("000095017024141505")])
+    parsed_fields = {"is_parsed": True, "new_paragraphs": ["News."]}
+    stored_documents = filing_repo._get_stored_documents([sec_filing("000095017024140117")])
+
+    operation, _ = filing_repo._write_operation(
+        sec_filing("000095017024140117", **parsed_fields), False, stored_documents["000095017024140117"]
+    )
+    unchanged_operation, _ = filing_repo._write_operation(
+        sec_filing("000095017024140117"), False, stored_documents["000095017024140117"]
+    )
+
+    assert operation == UpdateOne(
+        {"filing_metadata.accession_number": "000095017024140117"}, {"$set": parsed_fields}, upsert=False
+    )
+    assert unchanged_operation is None
+
+    write_result = filing_repo.bulk_write_filings(
+        [sec_filing("000095017024140117", **parsed_fields), sec_filing("000095017024141505")],
+        upsert=False,
+    )
+
+    assert (write_result.inserted, write_result.updated, write_result.unchanged) == (0, 1, 1)
+    stored_filing = next(
+        filing_repo.iter_filings({"filing_metadata.accession_number": "000095017024140117"})
+    )
+    assert stored_filing.is_parsed
+    assert stored_filing.new_paragraphs == ["News."]
@@ -0,0 +1,20 @@
+import os
+from modeling.parsers.SummaryCache import SummaryCache
+
+CIK = "0001050446"
+
+
+def test_looks_up_many_paragraphs_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(SummaryCache, "QUERY_BATCH_SIZE", 3)
+    summary_cache = SummaryCache(os.path.join(tmp_path, "summary_cache.sqlite3"))
+    paragraphs = [f"Paragraph {index}." for index in range(10)]
+
+    assert summary_cache.remove_seen_paragraphs(CIK, "000000000000000001", paragraphs[:7]) == paragraphs[:7]
+    # Only the paragraphs no earlier filing contained are new, whichever batch they are in
+    assert summary_cache.remove_seen_paragraphs(CIK, "000000000000000002", paragraphs) == paragraphs[7:]
+    # The filing that first contained them keeps them
+    assert summary_cache.remove_seen_paragraphs(CIK, "000000000000000001", paragraphs[:7]) == paragraphs[:7]
+
+    summary_cache.put_summaries("model", {str(index): f"Summary {index}." for index in range(7)})
+    summaries = summary_cache.get_summaries("model", [str(index) for index in range(10)])
+    assert summaries == {str(index): f"Summary {index}." for index in range(7)}
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+import pytest
+import requests
+from data_repositories.sec_filing_repo import SEC_FilingRepository
+from data_repositories.sync_state_repo import SyncStateRepository
+from modeling.PublicEntity import PublicEntity
+from modeling.sec_edgar.submissions.FilingColumns import FilingColumns
+from modeling.sec_edgar.submissions.SubmissionsRequest import SubmissionsRequest
+from modeling.sec_edgar.submissions.SubmissionsResponse import SubmissionsResponse
+from services.entity_leases import entity_lease_manager
+from services.sync_engine import SyncEngine
+from database import filings_collection, sync_state_collection, pipeline_tasks_collection
+
+MSTR = PublicEntity(name="MicroStrategy Inc", ticker="MSTR", cik="0001050446")
+ACCESSION_NUMBERS = ["0000950170-24-140117", "0000950170-24-141505", "0000950170-24-142944"]
+
+
+def submissions_request(cik: str, **kwargs) -> SubmissionsRequest:
+    count = len(ACCESSION_NUMBERS)
+    filings = FilingColumns(
+        {
+            "accessionNumber": ACCESSION_NUMBERS,
+            "filingDate": ["2024-12-16", "2024-12-23", "2024-12-30"],
+            "acceptanceDateTime": [
+                "2024-12-16T13:02:11.000Z",
+                "2024-12-23T13:01:40.000Z",
+                "2024-12-30T13:03:02.000Z",
+            ],
+            "form": ["8-K"] * count,
+            "items": ["7.01,8.01"] * count,
+            "primaryDocument": ["mstr.htm"] * count,
+        }
+    )
+    return SubmissionsRequest(
+        url="", cik=cik, resp_content=SubmissionsResponse(cik=cik, entity_name=MSTR.name, filings=filings)
+    )
+
+
+def slow_writes(seconds: float, written: threading.Event = None):
+    add_filings = SEC_FilingRepository.add_filings
+
+    def slow_add_filings(self, filings):
+        time.sleep(seconds)
+        result = add_filings(self, filings)
+        if written is not None:
+            written.set()
+        return result
+
+    return slow_add_filings
+
+
+@pytest.fixture
+def sync_engine(monkeypatch):
+    monkeypatch.setattr(SubmissionsRequest, "from_cik", staticmethod(submissions_request))
+    return SyncEngine(checkpoint_batch_size=1)
+
+
+def test_stops_at_first_checkpoint_after_deadline(sync_engine, monkeypatch):
+    monkeypatch.setattr(SEC_FilingRepository, "add_filings", slow_writes(0.2))
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(sync_engine.sync_entity(MSTR, deadline=time.monotonic() + 0.3))
+
+    # Two batches were stored and checkpointed before the deadline was noticed
+    assert filings_collection.count_documents({}) == 2
+    assert pipeline_tasks_collection.count_documents({}) == 2
+    sync_state = SyncStateRepository(sync_state_collection).get_state(MSTR.cik)
+    assert sync_state.last_accession_number == ACCESSION_NUMBERS[1].replace("-", "")
+    assert sync_state.in_progress
+    assert not entity_lease_manager.is_held(MSTR.cik)
+
+
+def test_cancelled_sync_waits_for_its_thread(sync_engine, monkeypatch):
+    write_finished = threading.Event()
+    monkeypatch.setattr(SEC_FilingRepository, "add_filings", slow_writes(0.5, write_finished))
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(sync_engine.sync_entity(MSTR), timeout=0.1))
+
+    # The sync only gave up its lease once the write it was cancelled in had returned,
+    # and stopped before enqueuing or checkpointing the batch
+    assert write_finished.is_set()
+    assert not entity_lease_manager.is_held(MSTR.cik)
+    assert filings_collection.count_documents({}) == 1
+    assert pipeline_tasks_collection.count_documents({}) == 0
+    assert SyncStateRepository(sync_state_collection).get_state(MSTR.cik).last_accession_number is None
+
+
+def test_enqueues_new_filings_on_the_pipeline(sync_engine):
+    assert asyncio.run(sync_engine.sync_entity(MSTR)) == 3
+
+    task_ids = sorted(task["task_id"] for task in pipeline_tasks_collection.find())
+    assert task_ids == sorted(number.replace("-", "") for number in ACCESSION_NUMBERS)
+    sync_state = SyncStateRepository(sync_state_collection).get_state(MSTR.cik)
+    assert not sync_state.in_progress
+
+
+class UnavailableClient:
+    """Answers every request with a 503, as the client does once its retries are used up."""
+
+    def get(self, url: str) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = 503
+        return response
+
+    def get_conditional(self, url: str, cache) -> requests.Response:
+        return self.get(url)
+
+
+def test_unavailable_submissions_fail_the_sync():
+    sync_engine = SyncEngine(client=UnavailableClient())
+
+    with pytest.raises(requests.HTTPError):
+        asyncio.run(sync_engine.sync_entity(MSTR))
+    stats = asyncio.run(sync_engine.run([MSTR]))
+
+    assert stats.failed_entities == 1
+    assert stats.entities == 0
+    assert not entity_lease_manager.is_held(MSTR.cik)
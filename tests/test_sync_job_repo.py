@@ -0,0 +1,115 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from data_repositories.sync_job_repo import SyncJobRepository
+from modeling.SyncJob import JOB_RUNNING, JOB_SCHEDULED, SYNC_ENTITY_JOB, SyncJob, entity_job_id
+from database import sync_jobs_collection
+
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture
+def job_repo():
+    return SyncJobRepository(sync_jobs_collection)
+
+
+def sync_job(cik: str, next_run_at: datetime, priority: int = 0) -> SyncJob:
+    return SyncJob(
+        job_id=entity_job_id(cik),
+        kind=SYNC_ENTITY_JOB,
+        cik=cik,
+        priority=priority,
+        interval_seconds=HOUR.total_seconds(),
+        next_run_at=next_run_at,
+    )
+
+
+def test_claims_by_priority_then_most_overdue(job_repo):
+    now = datetime.now(timezone.utc)
+    job_repo.schedule_jobs(
+        [
+            sync_job("0000000001", now - 2 * HOUR, priority=0),
+            sync_job("0000000002", now - HOUR, priority=10),
+            sync_job("0000000003", now - 2 * HOUR, priority=10),
+            sync_job("0000000004", now + HOUR, priority=20),
+        ]
+    )
+
+    claimed = [job_repo.claim_due_job("worker", 60.0) for _ in range(4)]
+
+    assert [job.cik if job else None for job in claimed] == ["0000000003", "0000000002", "0000000001", None]
+    assert claimed[0].status == JOB_RUNNING
+    assert claimed[0].locked_by == "worker"
+    assert claimed[0].last_wait_seconds == pytest.approx(2 * HOUR.total_seconds(), abs=5)
+
+
+def test_expired_lease_is_claimed_again(job_repo):
+    job_repo.schedule_jobs([sync_job("0000000001", datetime.now(timezone.utc))])
+    dead_worker_job = job_repo.claim_due_job("dead-worker", 0.05)
+
+    assert job_repo.claim_due_job("worker", 60.0) is None
+    time.sleep(0.1)
+    job = job_repo.claim_due_job("worker", 60.0)
+
+    assert job.locked_by == "worker"
+    # The worker that lost the lease can neither renew nor release the job
+    assert not job_repo.extend_lease(dead_worker_job, 60.0)
+    assert not job_repo.complete_job(dead_worker_job, datetime.now(timezone.utc) + HOUR)
+    assert job_repo.get_job(job.job_id).locked_by == "worker"
+    assert job_repo.extend_lease(job, 60.0)
+
+
+def test_complete_job_schedules_next_run(job_repo):
+    job_repo.schedule_jobs([sync_job("0000000001", datetime.now(timezone.utc))])
+    job = job_repo.claim_due_job("worker", 60.0)
+    next_run_at = datetime.now(timezone.utc) + HOUR
+
+    assert job_repo.complete_job(job, next_run_at)
+
+    stored_job = job_repo.get_job(job.job_id)
+    assert stored_job.status == JOB_SCHEDULED
+    assert stored_job.locked_by is None
+    assert stored_job.next_run_at == pytest.approx(next_run_at, abs=timedelta(milliseconds=1))
+    assert job_repo.claim_due_job("worker", 60.0) is None
+
+
+def test_fail_job_counts_attempts_until_completed(job_repo):
+    job_repo.schedule_jobs([sync_job("0000000001", datetime.now(timezone.utc))])
+
+    for attempt in range(1, 3):
+        job = job_repo.claim_due_job("worker", 60.0)
+        assert job_repo.fail_job(job, "SEC returned 503", datetime.now(timezone.utc))
+        stored_job = job_repo.get_job(job.job_id)
+        assert stored_job.attempts == attempt
+        assert stored_job.last_error == "SEC returned 503"
+
+    job = job_repo.claim_due_job("worker", 60.0)
+    job_repo.complete_job(job, datetime.now(timezone.utc) + HOUR)
+    stored_job = job_repo.get_job(job.job_id)
+    assert stored_job.attempts == 0
+    assert stored_job.last_error is None
+
+
+def test_run_now_makes_scheduled_job_due(job_repo):
+    job_repo.schedule_jobs([sync_job("0000000001", datetime.now(timezone.utc) + HOUR)])
+
+    assert job_repo.run_now([entity_job_id("0000000001")]) == 1
+
+    job = job_repo.claim_due_job("worker", 60.0)
+    assert job is not None
+    assert not job.rerun_requested
+
+
+def test_run_now_reruns_running_job_once_it_completes(job_repo):
+    job_repo.schedule_jobs([sync_job("0000000001", datetime.now(timezone.utc))])
+    job = job_repo.claim_due_job("worker", 60.0)
+
+    job_repo.run_now([job.job_id])
+    job_repo.complete_job(job, datetime.now(timezone.utc) + HOUR)
+
+    # Due right away instead of an interval later
+    rerun_job = job_repo.claim_due_job("worker", 60.0)
+    assert rerun_job is not None
+    assert not rerun_job.rerun_requested
+    job_repo.complete_job(rerun_job, datetime.now(timezone.utc) + HOUR)
+    assert job_repo.claim_due_job("worker", 60.0) is None